@@ -0,0 +1,157 @@
+"""
+Headless batch report generation.
+
+Run from src/:
+    python batch_report.py recordings/ [more dirs or .ecgs files] [--out reports] [--workers N]
+    python batch_report.py --since 2026-10-01 --min-qtc 500 [--patient NAME] [--arrhythmia LABEL]
+
+Sessions come from the given directories/files, or from a session catalog
+query when no paths are given. Every session is analysed (heart rate over
+the whole recording, intervals on a 10 s Lead II strip), its strip is
+rendered with Agg and the generate_ecg_html_report HTML is printed to PDF,
+all in a pool of worker processes running Qt offscreen. Per-file timing
+and total throughput are printed; --json saves them.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+_app = None
+
+
+def _init_worker(template=None, log_queue=None):
+    """Each worker process gets its own offscreen QApplication for QTextDocument printing."""
+    global _app
+    if log_queue is not None:
+        # The parent owns logs/ecg.log; several processes rotating it would lose lines
+        from utils import logs
+        logs.configure_worker(log_queue)
+    os.environ["QT_QPA_PLATFORM"] = "offscreen"
+    from PyQt5.QtWidgets import QApplication
+    _app = QApplication.instance() or QApplication([])
+    # Import the analysis/report stack up front so per-file timings exclude it
+    import ecg.report_render, ecg.pan_tompkins, ecg.ecg_pqrst, ecg.ecg_report_generator  # noqa: F401
+    # and compile the report template once per worker
+    from ecg.report_templates import get_template, load_rules, DEFAULT_TEMPLATE
+    get_template(template or DEFAULT_TEMPLATE)
+    load_rules()
+
+
+def report_one(session_path, out_dir, template=None, use_cache=True):
+    """Worker: analyse one session and write <session>.pdf/.html into out_dir."""
+    from ecg.report_render import job_from_session, build_report
+    t0 = time.perf_counter()
+    name = os.path.splitext(os.path.basename(session_path))[0]
+    pdf_path = os.path.join(out_dir, name + ".pdf")
+    job, metrics, labels = job_from_session(session_path, pdf_path, html_path=os.path.join(out_dir, name + ".html"),
+                                          template=template, use_cache=use_cache)
+    t1 = time.perf_counter()
+    build_report(job)
+    t2 = time.perf_counter()
+    return {
+        "session": session_path,
+        "pdf": pdf_path,
+        "metrics": metrics,
+        "arrhythmias": labels,
+        "analyse_s": round(t1 - t0, 3),
+        "render_s": round(t2 - t1, 3),
+        "total_s": round(t2 - t0, 3),
+    }
+
+
+def collect_sessions(paths):
+    from ecg.session_store import SESSION_EXT
+    sessions = []
+    for path in paths:
+        if os.path.isdir(path):
+            sessions += sorted(os.path.join(path, n) for n in os.listdir(path) if n.endswith(SESSION_EXT))
+        elif os.path.exists(path):
+            sessions.append(path)
+        else:
+            print(f"Skipping {path}: not found")
+    return sessions
+
+
+def query_sessions(args):
+    from ecg.catalog import SessionCatalog, catalog_path
+
+    def day(text):
+        return time.mktime(datetime.datetime.strptime(text, "%Y-%m-%d").timetuple()) if text else None
+    catalog = SessionCatalog(args.catalog or catalog_path())
+    rows = catalog.find_sessions(patient_id=args.patient, start=day(args.since), end=day(args.until),
+                                 min_qtc=args.min_qtc, arrhythmia=args.arrhythmia, newest_first=False)
+    catalog.close()
+    return [row["path"] for row in rows if os.path.exists(row["path"])]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate ECG reports for many sessions in parallel")
+    parser.add_argument("paths", nargs="*", help="session files or directories of them")
+    parser.add_argument("--out", default="reports", help="output directory for PDF/HTML reports")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument("--catalog", help="catalog database (default recordings/catalog.db)")
+    parser.add_argument("--patient", help="catalog query: patient id")
+    parser.add_argument("--since", help="catalog query: sessions starting on/after YYYY-MM-DD")
+    parser.add_argument("--until", help="catalog query: sessions starting before YYYY-MM-DD")
+    parser.add_argument("--min-qtc", type=float, help="catalog query: QTc above this (ms)")
+    parser.add_argument("--arrhythmia", help="catalog query: sessions with this arrhythmia label")
+    parser.add_argument("--template", help="report layout: file in ecg/templates/ or a path (default report.html)")
+    parser.add_argument("--no-cache", action="store_true", help="re-render strips instead of using the asset cache")
+    parser.add_argument("--update-catalog", action="store_true", help="store the computed metrics in the catalog")
+    parser.add_argument("--json", help="write per-file results to this JSON file")
+    args = parser.parse_args(argv)
+
+    sessions = collect_sessions(args.paths) if args.paths else query_sessions(args)
+    if not sessions:
+        print("No sessions to report on")
+        return 1
+    os.makedirs(args.out, exist_ok=True)
+    workers = max(1, min(args.workers, len(sessions)))
+    print(f"{len(sessions)} session(s), {workers} worker(s)")
+
+    results, failed = [], []
+    t0 = time.perf_counter()
+    template = os.path.abspath(args.template) if args.template and os.path.exists(args.template) else args.template
+    from utils.logs import worker_queue
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(template, worker_queue())) as pool:
+        futures = {pool.submit(report_one, path, args.out, template, not args.no_cache): path for path in sessions}
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                r = future.result()
+            except Exception as e:
+                failed.append(path)
+                print(f"FAILED {path}: {e}")
+                continue
+            results.append(r)
+            print(f"{os.path.basename(path):<40} analyse {r['analyse_s']:6.2f} s  render {r['render_s']:6.2f} s"
+                  f"  -> {r['pdf']}")
+    elapsed = time.perf_counter() - t0
+
+    if args.update_catalog and results:
+        from ecg.catalog import SessionCatalog, catalog_path
+        catalog = SessionCatalog(args.catalog or catalog_path())
+        for r in results:
+            try:
+                catalog.add_session_file(r["session"], r["metrics"])
+            except Exception as e:
+                print(f"Could not catalog {r['session']}:", e)
+        catalog.close()
+
+    cpu = sum(r["total_s"] for r in results)
+    print(f"{len(results)} report(s) in {elapsed:.2f} s: {len(results) / max(elapsed, 1e-9):.2f} reports/s, "
+          f"{cpu / max(len(results), 1):.2f} s per report, {cpu / max(elapsed, 1e-9):.1f}x parallel speedup"
+          + (f", {len(failed)} failed" if failed else ""))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"elapsed_s": elapsed, "workers": workers, "failed": failed, "results": results}, f, indent=2)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
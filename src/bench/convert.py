@@ -0,0 +1,132 @@
+"""
+Throughput benchmark for the EDF+ and WFDB converters.
+
+Run from src/:
+    python -m bench.convert [--hours 24] [--session recordings/x.ecgs] [--workdir /tmp/x]
+                            [--memory] [--json out.json]
+
+Without --session a synthetic 12-lead, 500 Hz session of the requested
+length is written first (a 24 h one is ~1 GB raw). Each converter then
+exports the session and imports the result back into a new session; the
+report gives wall time, MB/s of int16 sample data, how many times faster
+than real time. With --memory the peak heap allocation of every step is
+reported too (tracemalloc, which numpy reports to; RSS is useless here
+because memory-mapped session pages count towards it). Tracing slows the
+steps down, so timings from a --memory run are not comparable.
+"""
+import os
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import tracemalloc
+import numpy as np
+from ecg.session_store import SessionReader, SessionWriter
+from ecg.session_index import SessionIndex, index_path, open_session, EVENT_ARRHYTHMIA
+from ecg.synthetic import SyntheticECG
+from ecg.edf import export_edf, import_edf
+from ecg.wfdb import export_wfdb, import_wfdb
+
+BLOCK_SECONDS = 60  # synthetic data is generated a minute at a time
+
+
+def write_synthetic_session(path, hours, fs=500, seed=0):
+    """Write a synthetic session plus an index with beats and a few rhythm episodes."""
+    gen = SyntheticECG(fs=fs, seed=seed)
+    writer = SessionWriter(path, gen.leads, fs=fs, gain=gen.gain, start_time=time.time() - hours * 3600)
+    total = int(hours * 3600 * fs)
+    block = BLOCK_SECONDS * fs
+    for start in range(0, total, block):
+        writer.append_block(gen.generate(min(block, total - start)))
+    writer.close()
+    events = [{"start": int(b), "end": int(b), "kind": "beat", "label": "N"} for b in gen.r_peaks(0, total)]
+    hour = 3600 * fs
+    for h in range(int(hours) or 1):
+        events.append({"start": h * hour + 60 * fs, "end": h * hour + 90 * fs, "kind": EVENT_ARRHYTHMIA,
+                       "label": "AFIB"})
+    SessionIndex(writer.chunk_table(), fs, events).save(index_path(path))
+    return path
+
+
+def timed(fn, args, kwargs, memory=False):
+    if memory:
+        tracemalloc.start()
+    t0 = time.perf_counter()
+    try:
+        fn(*args, **kwargs)
+        return time.perf_counter() - t0, (tracemalloc.get_traced_memory()[1] / 1e6 if memory else None)
+    finally:
+        if memory:
+            tracemalloc.stop()
+
+
+def bench(session_path, workdir, memory=False):
+    reader, index = open_session(session_path)
+    raw_mb = reader.n_samples * len(reader.leads) * 2 / 1e6
+    duration = reader.n_samples / reader.fs
+    edf_path = os.path.join(workdir, "bench.edf")
+    record = os.path.join(workdir, "bench")
+    jobs = [
+        ("edf+ export", export_edf, (reader, edf_path), {"index": index}),
+        ("edf+ import", import_edf, (edf_path, os.path.join(workdir, "from_edf.ecgs")), {}),
+        ("wfdb export", export_wfdb, (reader, record), {"index": index}),
+        ("wfdb import", import_wfdb, (record, os.path.join(workdir, "from_wfdb.ecgs")), {}),
+    ]
+    results = []
+    for name, fn, args, kwargs in jobs:
+        seconds, peak = timed(fn, args, kwargs, memory)
+        results.append({
+            "step": name,
+            "seconds": round(seconds, 2),
+            "mb_s": round(raw_mb / max(seconds, 1e-9), 1),
+            "x_realtime": round(duration / max(seconds, 1e-9), 1),
+            "peak_heap_mb": round(peak, 1) if memory else None,
+        })
+    same = True
+    for name in ("from_edf.ecgs", "from_wfdb.ecgs"):
+        check = SessionReader(os.path.join(workdir, name))
+        # EDF pads the last record to a whole second
+        n = min(check.n_samples, reader.n_samples)
+        same = same and n == reader.n_samples and all(
+            np.array_equal(block, check.read(start, start + block.shape[1]))
+            for start, block in reader.iter_blocks(60 * int(reader.fs)))
+        check.close()
+    reader.close()
+    return results, raw_mb, duration, same
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark EDF+/WFDB conversion throughput")
+    parser.add_argument("--hours", type=float, default=24, help="length of the synthetic session")
+    parser.add_argument("--session", help="convert this .ecgs file instead of a synthetic one")
+    parser.add_argument("--workdir", help="directory for the converted files (default: a temp dir, removed)")
+    parser.add_argument("--memory", action="store_true", help="also report peak heap use per step")
+    parser.add_argument("--json", help="write results to this JSON file")
+    args = parser.parse_args(argv)
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="ecg-convert-")
+    os.makedirs(workdir, exist_ok=True)
+    try:
+        session = args.session
+        if not session:
+            session = os.path.join(workdir, "synthetic.ecgs")
+            t0 = time.perf_counter()
+            write_synthetic_session(session, args.hours)
+            print(f"wrote {args.hours:g} h synthetic session in {time.perf_counter() - t0:.1f} s")
+        results, raw_mb, duration, same = bench(session, workdir, args.memory)
+        print(f"{raw_mb:.0f} MB of samples, {duration / 3600:.2f} h; round trips lossless: {same}")
+        print(f"{'step':<14}{'seconds':>9}{'MB/s':>9}{'x realtime':>12}{'heap MB':>9}")
+        for r in results:
+            heap = f"{r['peak_heap_mb']:>9.1f}" if r["peak_heap_mb"] is not None else f"{'-':>9}"
+            print(f"{r['step']:<14}{r['seconds']:>9.2f}{r['mb_s']:>9.1f}{r['x_realtime']:>12.1f}{heap}")
+        if args.json:
+            with open(args.json, "w") as f:
+                json.dump({"raw_mb": raw_mb, "duration_s": duration, "lossless": same, "results": results}, f, indent=2)
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,330 @@
+"""
+Speed and accuracy benchmark for the signal-processing code.
+
+Run from src/:
+    python -m bench.dsp [--lengths 10,60,600] [--rates 250,500,1000] [--noise 0.02,0.1,0.3]
+                        [--detectors pan_tompkins,snap,pqrst,live_window,arrhythmia] [--repeat 3]
+                        [--session recordings/x.ecgs ...] [--lead II] [--session-seconds 600]
+                        [--json out.json] [--baseline old.json --tolerance 0.25]
+
+Every detector runs on Lead II of synthetic recordings (ecg/synthetic.py)
+for each combination of length (s), sample rate (Hz) and white-noise level
+(mV), and on the --session files:
+
+  pan_tompkins  pan_tompkins() R-peaks
+  snap          pan_tompkins() moved onto the signal maximum (snap_to_peak), as the report does
+  pqrst         detect_pqrst() on the snapped peaks + pqrst_intervals(), the report's measurements
+  live_window   the 12-lead page's detailed Lead II view: detect_pqrst() + last_beat_intervals()
+                on consecutive 1 s windows, one call per window
+  arrhythmia    detect_arrhythmia() on 10 s windows of bradycardic, normal and tachycardic
+                synthetic rhythms (one recording per rate and noise level, the longest length)
+
+Speed is samples per second and median latency per call over --repeat
+runs; peak heap use (tracemalloc) comes from one extra, untimed run.
+
+Accuracy is scored against the generator's ground truth. R-peaks are
+matched within 150 ms (0.5 s at either end of the recording is ignored) to
+give sensitivity (Se) and positive predictive value (PPV). Interval error is
+the mean absolute error of HR (bpm) and PR, QRS and QT (ms) against the
+true values; live_window errors are averaged over windows. For arrhythmia it
+is the fraction of windows given the expected label. Sessions are scored
+against the beat events in their index when there are any (those written by
+bench.convert are ground truth); otherwise only speed is reported.
+
+--baseline compares with an earlier --json file; the exit status is 1 if
+Se, PPV or label accuracy dropped by more than 0.01, an interval error grew
+by more than 2 ms (2 bpm for HR), or throughput fell by more than
+--tolerance (fraction).
+"""
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+import numpy as np
+from ecg.pan_tompkins import pan_tompkins
+from ecg.ecg_pqrst import snap_to_peak, detect_pqrst, pqrst_intervals, last_beat_intervals
+from ecg.synthetic import SyntheticECG
+from ecg.arrhythmia import detect_arrhythmia
+
+DETECTORS = ["pan_tompkins", "snap", "pqrst", "live_window", "arrhythmia"]
+INTERVALS = ["HR", "PR", "QRS", "QT"]
+MATCH_WINDOW = 0.15  # s between a detected and a true R-peak to count as a hit
+EDGE = 0.5  # s ignored at either end of a recording when scoring beats
+ARRHYTHMIA_WINDOW = 10  # s
+# Synthetic rhythms for detect_arrhythmia: name -> (heart rate, expected label).
+# The generator always draws P waves, so irregular rhythms (AFib) are not covered.
+RHYTHMS = {
+    "bradycardia": (48, "Sinus Bradycardia"),
+    "normal": (72, "None Detected"),
+    "tachycardia": (120, "Sinus Tachycardia"),
+}
+SE_DROP = 0.01
+MAE_GROWTH = 2.0
+
+
+# --- Detectors: each takes (signal, fs) and returns (calls, R-peaks, {interval: [values]}) ---
+def run_pan_tompkins(sig, fs):
+    return 1, np.asarray(pan_tompkins(sig, fs)), {}
+
+
+def run_snap(sig, fs):
+    return 1, np.asarray(snap_to_peak(sig, pan_tompkins(sig, fs), fs)), {}
+
+
+def run_pqrst(sig, fs):
+    peaks = detect_pqrst(sig, fs, r_peaks=snap_to_peak(sig, pan_tompkins(sig, fs), fs))
+    measured = pqrst_intervals(peaks, fs)
+    return 1, np.asarray(peaks["R"]), {k: [measured[k]] for k in INTERVALS}
+
+
+def run_live_window(sig, fs):
+    r_peaks, values = [], {k: [] for k in INTERVALS}
+    calls = 0
+    for start in range(0, len(sig) - fs + 1, fs):
+        window = sig[start:start + fs]
+        window = window - np.mean(window)  # the view plots and analyses the centred buffer
+        peaks = detect_pqrst(window, fs=fs)
+        measured = last_beat_intervals(peaks, fs=fs)
+        calls += 1
+        r_peaks.extend(start + r for r in peaks["R"])
+        for k in INTERVALS:
+            if measured[k] is not None:
+                values[k].append(measured[k])
+    return calls, np.asarray(r_peaks, dtype=int), values
+
+
+RUNNERS = {
+    "pan_tompkins": run_pan_tompkins,
+    "snap": run_snap,
+    "pqrst": run_pqrst,
+    "live_window": run_live_window,
+}
+
+
+# --- Scoring ---
+def match_beats(ref, det, fs, n):
+    """(Se, PPV) of det against ref, matching within MATCH_WINDOW and ignoring EDGE at both ends."""
+    lo, hi = int(EDGE * fs), n - int(EDGE * fs)
+    ref = np.sort(np.asarray(ref)[(ref >= lo) & (ref < hi)])
+    det = np.sort(np.asarray(det)[(det >= lo) & (det < hi)]) if len(det) else np.zeros(0, dtype=int)
+    tol = MATCH_WINDOW * fs
+    hits = i = j = 0
+    while i < len(ref) and j < len(det):  # both sorted: pair each true beat with the nearest unused detection
+        if abs(det[j] - ref[i]) <= tol:
+            hits += 1
+            i += 1
+            j += 1
+        elif det[j] < ref[i]:
+            j += 1
+        else:
+            i += 1
+    se = hits / len(ref) if len(ref) else None
+    ppv = hits / len(det) if len(det) else (None if not len(ref) else 0.0)
+    return se, ppv
+
+
+def interval_errors(values, truth):
+    """Mean absolute error per measured interval; None where a detector found nothing to measure."""
+    errors = {}
+    for k in INTERVALS:
+        if k not in values or truth.get(k) is None:
+            continue
+        measured = [v for v in values.get(k, []) if v is not None and np.isfinite(v)]
+        errors[k] = round(float(np.mean(np.abs(np.asarray(measured) - truth[k]))), 2) if measured else None
+    return errors
+
+
+def synthetic_case(seconds, fs, noise, heart_rate=72, seed=0):
+    """Lead II signal plus its true R-peaks and intervals."""
+    gen = SyntheticECG(fs=fs, leads=["II"], heart_rate=heart_rate, noise=noise, seed=seed)
+    n = int(seconds * fs)
+    sig = gen.generate(n)[0]
+    ref = gen.r_peaks(0, n)
+    truth = dict(gen.intervals())
+    truth["HR"] = 60.0 * fs / np.mean(np.diff(ref)) if len(ref) > 1 else None
+    return sig, ref, truth
+
+
+def session_case(path, lead, seconds):
+    """Lead signal of a stored session, with index beat events as reference when present."""
+    from ecg.session_index import open_session
+    reader, index = open_session(path)
+    n = reader.n_samples if seconds is None else min(reader.n_samples, int(seconds * reader.fs))
+    sig = reader.read(0, n, leads=[lead])[0].astype(float)
+    ref = np.array(sorted(ev["start"] for ev in index.events_between(0, n, "beat")), dtype=int)
+    truth = {"HR": 60.0 * reader.fs / np.mean(np.diff(ref))} if len(ref) > 1 else {}
+    return sig, reader.fs, (ref if len(ref) else None), truth
+
+
+# --- Measurement ---
+def measure(fn, args, repeat):
+    """Median wall time of repeat calls, peak heap of one extra traced call, and the last result."""
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn(*args)
+        times.append(time.perf_counter() - t0)
+    tracemalloc.start()
+    try:
+        fn(*args)
+        peak = tracemalloc.get_traced_memory()[1] / 1e6
+    finally:
+        tracemalloc.stop()
+    return float(np.median(times)), peak, result
+
+
+def bench_detector(detector, source, sig, fs, ref, truth, repeat, noise=None):
+    elapsed, peak, (calls, r_peaks, values) = measure(RUNNERS[detector], (sig, fs), repeat)
+    result = {
+        "detector": detector, "source": source, "fs": fs, "noise": noise,
+        "seconds": round(len(sig) / fs, 1), "calls": calls,
+        "samples_per_s": round(len(sig) / elapsed) if elapsed > 0 else None,
+        "ms_per_call": round(elapsed * 1000 / max(calls, 1), 3),
+        "peak_heap_mb": round(peak, 2),
+        "se": None, "ppv": None, "mae": {},
+    }
+    if ref is not None:
+        se, ppv = match_beats(ref, r_peaks, fs, len(sig))
+        result["se"] = round(se, 4) if se is not None else None
+        result["ppv"] = round(ppv, 4) if ppv is not None else None
+    if truth:
+        result["mae"] = interval_errors(values, truth)
+    return result
+
+
+def arrhythmia_windows(sig, fs):
+    """detect_arrhythmia() arguments for every ARRHYTHMIA_WINDOW of sig, measured like the report does."""
+    windows = []
+    step = ARRHYTHMIA_WINDOW * fs
+    for start in range(0, len(sig) - step + 1, step):
+        window = sig[start:start + step]
+        peaks = detect_pqrst(window, fs, r_peaks=snap_to_peak(window, pan_tompkins(window, fs), fs))
+        measured = pqrst_intervals(peaks, fs)
+        rr = np.diff(peaks["R"]) / fs if len(peaks["R"]) > 1 else None
+        windows.append((measured["HR"], measured["QRS"], rr, measured["PR"], peaks["P"], peaks["R"], window))
+    return windows
+
+
+def bench_arrhythmia(rhythm, seconds, fs, noise, repeat):
+    heart_rate, expected = RHYTHMS[rhythm]
+    sig, _, _ = synthetic_case(max(seconds, ARRHYTHMIA_WINDOW), fs, noise, heart_rate=heart_rate)
+    windows = arrhythmia_windows(sig, fs)
+
+    def run():
+        return [detect_arrhythmia(*args) for args in windows]
+    elapsed, peak, labels = measure(run, (), repeat)
+    return {
+        "detector": "arrhythmia", "source": rhythm, "fs": fs, "noise": noise,
+        "seconds": round(len(sig) / fs, 1), "calls": len(windows),
+        "samples_per_s": round(len(sig) / elapsed) if elapsed > 0 else None,
+        "ms_per_call": round(elapsed * 1000 / max(len(windows), 1), 3),
+        "peak_heap_mb": round(peak, 2),
+        "expected": expected,
+        "accuracy": round(labels.count(expected) / len(labels), 4) if labels else None,
+        "labels": {label: labels.count(label) for label in sorted(set(labels))},
+    }
+
+
+def case_key(r):
+    return r["detector"], r["source"], r["fs"], r["noise"], r["seconds"]
+
+
+def compare(results, baseline, tolerance):
+    """Messages for every result that got less accurate or slower than in a baseline results file."""
+    with open(baseline) as f:
+        old = {case_key(r): r for r in json.load(f)["results"]}
+    problems = []
+    for r in results:
+        before = old.get(case_key(r))
+        if before is None:
+            continue
+        name = "{} {} {} Hz noise {} {} s".format(*case_key(r))
+        for metric in ("se", "ppv", "accuracy"):
+            if before.get(metric) is not None and r.get(metric) is not None and r[metric] < before[metric] - SE_DROP:
+                problems.append(f"{name}: {metric} {before[metric]:.4f} -> {r[metric]:.4f}")
+        for k, err in r.get("mae", {}).items():
+            was = before.get("mae", {}).get(k)
+            if was is not None and (err is None or err > was + MAE_GROWTH):
+                problems.append(f"{name}: {k} error {was} -> {err}")
+        if before.get("samples_per_s") and r.get("samples_per_s") \
+                and r["samples_per_s"] < before["samples_per_s"] * (1 - tolerance):
+            problems.append(f"{name}: {before['samples_per_s']} -> {r['samples_per_s']} samples/s")
+    return problems
+
+
+def fmt(value, spec):
+    return format(value, spec) if value is not None else "-".rjust(len(format(0, spec)))
+
+
+def print_table(results):
+    print(f"{'detector':<13}{'source':<14}{'fs':>6}{'noise':>7}{'secs':>7}{'Msamp/s':>9}{'ms/call':>10}"
+          f"{'heap MB':>9}{'Se':>8}{'PPV':>8}  interval MAE (HR bpm, ms) / labels")
+    for r in results:
+        if r["detector"] == "arrhythmia":
+            detail = f"{fmt(r['accuracy'], '.2f')} '{r['expected']}'  {r['labels']}"
+            se = ppv = None
+        else:
+            detail = " ".join(f"{k} {fmt(v, '.1f').strip()}" for k, v in r["mae"].items())
+            se, ppv = r["se"], r["ppv"]
+        msps = r["samples_per_s"] / 1e6 if r["samples_per_s"] else None
+        print(f"{r['detector']:<13}{r['source']:<14}{r['fs']:>6}{fmt(r['noise'], '7.2f')}{r['seconds']:>7.0f}"
+              f"{fmt(msps, '9.2f')}{r['ms_per_call']:>10.3f}{r['peak_heap_mb']:>9.1f}"
+              f"{fmt(se, '8.3f')}{fmt(ppv, '8.3f')}  {detail}")
+
+
+def floats(text):
+    return [float(v) for v in text.split(",") if v.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark speed and accuracy of the ECG detectors")
+    parser.add_argument("--lengths", default="10,60,600", help="synthetic recording lengths in seconds")
+    parser.add_argument("--rates", default="250,500,1000", help="sample rates in Hz")
+    parser.add_argument("--noise", default="0.02,0.1,0.3", help="white noise levels in mV")
+    parser.add_argument("--detectors", default=",".join(DETECTORS), help=f"subset of {', '.join(DETECTORS)}")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per case (median is reported)")
+    parser.add_argument("--session", action="append", default=[], help="stored .ecgs session (repeatable)")
+    parser.add_argument("--lead", default="II", help="lead to analyse in sessions")
+    parser.add_argument("--session-seconds", type=float, default=600, help="analyse at most this much of a session")
+    parser.add_argument("--json", help="write results to this JSON file")
+    parser.add_argument("--baseline", help="earlier --json results to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed throughput drop vs baseline")
+    args = parser.parse_args(argv)
+    detectors = [d.strip() for d in args.detectors.split(",") if d.strip()]
+    for d in detectors:
+        if d not in DETECTORS:
+            parser.error(f"unknown detector {d!r}")
+    lengths, rates, noises = floats(args.lengths), [int(v) for v in floats(args.rates)], floats(args.noise)
+
+    results = []
+    for fs in rates:
+        for noise in noises:
+            for seconds in lengths:
+                sig, ref, truth = synthetic_case(seconds, fs, noise)
+                for d in detectors:
+                    if d in RUNNERS:
+                        results.append(bench_detector(d, "synthetic", sig, fs, ref, truth, args.repeat, noise))
+            if "arrhythmia" in detectors:
+                for rhythm in RHYTHMS:
+                    results.append(bench_arrhythmia(rhythm, max(lengths), fs, noise, args.repeat))
+    for path in args.session:
+        sig, fs, ref, truth = session_case(path, args.lead, args.session_seconds)
+        for d in detectors:
+            if d in RUNNERS:
+                results.append(bench_detector(d, path, sig, fs, ref, truth, args.repeat))
+
+    print_table(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"repeat": args.repeat, "results": results}, f, indent=2)
+    if args.baseline:
+        problems = compare(results, args.baseline, args.tolerance)
+        for problem in problems:
+            print(f"REGRESSION {problem}")
+        if problems:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
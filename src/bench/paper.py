@@ -0,0 +1,80 @@
+"""
+Benchmark for the paper-format PDF renderer.
+
+Run from src/:
+    python -m bench.paper [--minutes 10] [--session recordings/x.ecgs] [--workdir /tmp/x]
+                          [--memory] [--json out.json]
+
+Without --session a synthetic 12-lead, 500 Hz session of the requested
+length is written first. Both layouts (3×4 + rhythm, 12×1) are printed
+for the whole session; the report gives pages, wall time, pages/s, PDF
+size and, with --memory, peak heap use (which should not grow with the
+length of the recording, since pages are read one at a time).
+"""
+import os
+import json
+import shutil
+import argparse
+import tempfile
+from bench.convert import write_synthetic_session, timed
+from ecg.session_store import SessionReader
+from ecg.paper_pdf import LAYOUTS, render_paper_pdf
+
+
+def bench(session_path, workdir, memory=False):
+    reader = SessionReader(session_path)
+    results = []
+    try:
+        for layout in LAYOUTS:
+            path = os.path.join(workdir, f"paper_{layout}.pdf")
+            pages = []
+            seconds, peak = timed(lambda: pages.append(render_paper_pdf(reader, path, layout=layout)), (), {}, memory)
+            results.append({
+                "layout": layout,
+                "pages": pages[0],
+                "seconds": round(seconds, 2),
+                "pages_s": round(pages[0] / max(seconds, 1e-9), 1),
+                "pdf_mb": round(os.path.getsize(path) / 1e6, 1),
+                "peak_heap_mb": round(peak, 1) if memory else None,
+            })
+        return results, reader.n_samples / reader.fs
+    finally:
+        reader.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark paper-format PDF printing")
+    parser.add_argument("--minutes", type=float, default=10, help="length of the synthetic session")
+    parser.add_argument("--session", help="print this .ecgs file instead of a synthetic one")
+    parser.add_argument("--workdir", help="directory for the PDFs (default: a temp dir, removed)")
+    parser.add_argument("--memory", action="store_true", help="also report peak heap use per layout")
+    parser.add_argument("--json", help="write results to this JSON file")
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtWidgets import QApplication
+    _ = QApplication.instance() or QApplication([])  # text drawing needs a QGuiApplication
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="ecg-paper-")
+    os.makedirs(workdir, exist_ok=True)
+    try:
+        session = args.session
+        if not session:
+            session = os.path.join(workdir, "synthetic.ecgs")
+            write_synthetic_session(session, args.minutes / 60)
+        results, duration = bench(session, workdir, args.memory)
+        print(f"{duration / 60:.1f} min of 12-lead ECG")
+        print(f"{'layout':<8}{'pages':>7}{'seconds':>9}{'pages/s':>9}{'PDF MB':>8}{'heap MB':>9}")
+        for r in results:
+            heap = f"{r['peak_heap_mb']:>9.1f}" if r["peak_heap_mb"] is not None else f"{'-':>9}"
+            print(f"{r['layout']:<8}{r['pages']:>7}{r['seconds']:>9.2f}{r['pages_s']:>9.1f}{r['pdf_mb']:>8.1f}{heap}")
+        if args.json:
+            with open(args.json, "w") as f:
+                json.dump({"duration_s": duration, "results": results}, f, indent=2)
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
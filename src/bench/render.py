@@ -0,0 +1,283 @@
+"""
+Frame-time benchmark for the live GUI update loops.
+
+Run from src/:
+    python -m bench.render [--views test_page,12to1,sequential,lead12_black] [--seconds 10]
+                           [--rate 500] [--fps N] [--warmup 10] [--memory]
+                           [--json out.json] [--baseline old.json --tolerance 0.25]
+
+Each view is built offscreen (QT_QPA_PLATFORM=offscreen) and driven the
+way its own QTimer would drive it, but from this loop so every frame can
+be timed: synthetic samples arrive at --rate per second, then the view's
+update method runs and pending Qt events (layout, paint) are processed.
+A frame's latency covers both. Frames are paced at the view's own timer
+rate unless --fps is given; a view that cannot keep up shows it as an
+achieved FPS below the target.
+
+  test_page     ECGTestPage.update_plot, reading a SimulatedSerial device
+                (ecg/synthetic.py) that sends --rate frames per second
+  12to1         ECGTestPage.update_12to1_graph (12:1 graph window)
+  sequential    LeadSequentialView.update_plot
+  lead12_black  Lead12BlackPage.update_data
+
+The report gives latency percentiles, target and achieved FPS, CPU time,
+RSS growth, and for test_page how many device frames were left unread and
+the sample-to-pixel latency of each pipeline stage (utils/latency_trace.py).
+With --memory the Python heap growth over the run is added (tracemalloc;
+this slows frames down, so its timings are not comparable). Anything the
+views print is captured and counted instead of shown.
+
+--baseline compares frame-time p90 with an earlier --json file; the exit
+status is 1 if a view got slower by more than --tolerance (fraction).
+"""
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import contextlib
+import tracemalloc
+import numpy as np
+
+VIEWS = ["test_page", "12to1", "sequential", "lead12_black"]
+
+_alive = []  # views closed after their run stay referenced: Qt may still call back into them
+
+
+def rss_mb():
+    """Current resident set size in MB (peak RSS where that is all the OS reports), or None."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1e6 if sys.platform == "darwin" else peak / 1e3
+    except ImportError:
+        return None
+
+
+class Feed:
+    """Appends synthetic samples to a lead -> list buffer as time passes, like the acquisition loop does."""
+    def __init__(self, data, leads, rate, buffer_size):
+        from ecg.synthetic import SyntheticECG
+        self.gen = SyntheticECG(fs=rate, leads=leads)
+        self.data = data
+        self.leads = leads
+        self.rate = rate
+        self.buffer_size = buffer_size
+        self.samples = 0
+        self._t0 = time.perf_counter()
+
+    def __call__(self):
+        due = int((time.perf_counter() - self._t0) * self.rate) - self.samples
+        if due <= 0:
+            return
+        block = np.rint(self.gen.generate(due)).astype(int)
+        for lead, values in zip(self.leads, block):
+            buf = self.data.setdefault(lead, [])
+            buf.extend(values.tolist())
+            del buf[:-self.buffer_size]
+        self.samples += due
+
+
+# --- Views: each setup returns (update, feed, fps, info, close) ---
+def setup_test_page(rate):
+    from ecg.synthetic import SimulatedSerial
+    from ecg.twelve_lead_test import ECGTestPage, SerialECGReader
+    from utils import latency_trace
+    latency_trace.enable(path=None)
+    page = ECGTestPage("12 Lead ECG Test", None)
+    page.resize(1200, 800)
+    page.show()
+    ser = SimulatedSerial(rate=rate)
+    page.serial_reader = SerialECGReader(None, None, ser=ser)
+    ser.reset_input_buffer()
+
+    def info():
+        return {"device_frames_read": ser.lines_read, "device_frames_unread": ser.in_waiting,
+                "device_frames_dropped": ser.frames_dropped,
+                "latency_ms": latency_trace.stats()}
+    return page.update_plot, None, 1000 / 50, info, page.close
+
+
+def setup_12to1(rate):
+    from ecg.twelve_lead_test import ECGTestPage
+    page = ECGTestPage("12 Lead ECG Test", None)
+    page.show_12to1_graph()
+    page._12to1_timer.stop()
+    feed = Feed(page.data, page.leads, rate, page.buffer_size)
+
+    def close():
+        page._12to1_win.close()
+        page.close()
+    return page.update_12to1_graph, feed, 1000 / 100, None, close
+
+
+def setup_sequential(rate):
+    from ecg.lead_sequential_view import LeadSequentialView
+    from ecg.session_store import STANDARD_LEADS
+    data = {lead: [] for lead in STANDARD_LEADS}
+    view = LeadSequentialView(STANDARD_LEADS, data, buffer_size=500)
+    view.timer.stop()
+    view.show()
+    return view.update_plot, Feed(data, STANDARD_LEADS, rate, 500), 1000 / 100, None, view.close
+
+
+def setup_lead12_black(rate):
+    from ecg.recording import Lead12BlackPage
+    from ecg.synthetic import SyntheticECG
+    page = Lead12BlackPage()
+    page.timer.stop()
+    # The page animates a window sliding over its own buffers (in mV)
+    gen = SyntheticECG(fs=rate, leads=page.lead_names)
+    signal = gen.generate(len(page.ecg_buffers[0])) / gen.gain
+    page.ecg_buffers = [row.copy() for row in signal]
+    page.resize(800, 1200)
+    page.show()
+    return page.update_data, None, 1000 / 30, None, page.close
+
+
+SETUPS = {
+    "test_page": setup_test_page,
+    "12to1": setup_12to1,
+    "sequential": setup_sequential,
+    "lead12_black": setup_lead12_black,
+}
+
+
+def drive(app, view, seconds, rate, fps=None, warmup=10, memory=False):
+    """Build a view, run it for seconds and return its result dict."""
+    update, feed, native_fps, info, close = SETUPS[view](rate)
+    _alive.append(close)
+    fps = fps or native_fps
+    period = 1.0 / fps
+    out = io.StringIO()
+    frame_ms = []
+    app.processEvents()
+    with contextlib.redirect_stdout(out):
+        for _ in range(warmup):
+            if feed:
+                feed()
+            update()
+            app.processEvents()
+        if memory:
+            tracemalloc.start()
+        rss0 = rss_mb()
+        cpu0, t0 = time.process_time(), time.perf_counter()
+        next_frame = t0
+        while time.perf_counter() - t0 < seconds:
+            if feed:
+                feed()
+            start = time.perf_counter()
+            update()
+            app.processEvents()
+            end = time.perf_counter()
+            frame_ms.append((end - start) * 1000)
+            next_frame += period
+            if next_frame > end:
+                time.sleep(next_frame - end)
+            else:
+                next_frame = end  # behind: don't try to catch up with a burst
+        wall = time.perf_counter() - t0
+        cpu = time.process_time() - cpu0
+        rss1 = rss_mb()
+        heap = tracemalloc.get_traced_memory()[0] / 1e6 if memory else None
+        if memory:
+            tracemalloc.stop()
+        extra = info() if info else {}
+        close()
+        app.processEvents()
+    ms = np.array(frame_ms)
+    result = {
+        "view": view,
+        "frames": len(ms),
+        "seconds": round(wall, 2),
+        "target_fps": round(fps, 1),
+        "achieved_fps": round(len(ms) / wall, 1),
+        "frame_ms": {name: round(float(np.percentile(ms, q)), 2) for name, q in
+                     (("p50", 50), ("p90", 90), ("p99", 99), ("max", 100))},
+        "cpu_s": round(cpu, 2),
+        "cpu_pct": round(100 * cpu / wall, 1),
+        "rss_growth_mb": round(rss1 - rss0, 1) if rss0 is not None and rss1 is not None else None,
+        "heap_growth_mb": round(heap, 2) if memory else None,
+        "stdout_lines": out.getvalue().count("\n"),
+    }
+    result.update(extra)
+    return result
+
+
+def compare(results, baseline, tolerance):
+    """Views whose frame-time p90 grew by more than tolerance against a baseline results file."""
+    with open(baseline) as f:
+        old = {r["view"]: r for r in json.load(f)["results"]}
+    slower = []
+    for r in results:
+        if r["view"] in old:
+            before, after = old[r["view"]]["frame_ms"]["p90"], r["frame_ms"]["p90"]
+            if before > 0 and after > before * (1 + tolerance):
+                slower.append((r["view"], before, after))
+    return slower
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the live GUI update loops offscreen")
+    parser.add_argument("--views", default=",".join(VIEWS), help=f"comma-separated subset of {', '.join(VIEWS)}")
+    parser.add_argument("--seconds", type=float, default=10, help="duration per view")
+    parser.add_argument("--rate", type=int, default=500, help="synthetic samples per second")
+    parser.add_argument("--fps", type=float, help="frame rate to drive every view at (default: each view's own timer)")
+    parser.add_argument("--warmup", type=int, default=10, help="untimed frames before measuring")
+    parser.add_argument("--memory", action="store_true", help="also report Python heap growth (slower)")
+    parser.add_argument("--json", help="write results to this JSON file")
+    parser.add_argument("--baseline", help="earlier --json results to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed p90 frame-time growth vs baseline")
+    args = parser.parse_args(argv)
+    views = [v.strip() for v in args.views.split(",") if v.strip()]
+    for view in views:
+        if view not in SETUPS:
+            parser.error(f"unknown view {view!r}")
+
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PyQt5.QtWidgets import QApplication
+    app = QApplication.instance() or QApplication([])
+    # The views write live files (lead_ii_live.json, ...) to the working directory
+    cwd, workdir = os.getcwd(), tempfile.mkdtemp(prefix="ecg-render-")
+    os.chdir(workdir)
+    try:
+        results = [drive(app, view, args.seconds, args.rate, args.fps, args.warmup, args.memory) for view in views]
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"{'view':<14}{'fps':>12}{'p50 ms':>8}{'p90 ms':>8}{'p99 ms':>8}{'max ms':>8}{'cpu %':>7}{'rss MB':>8}{'prints':>8}")
+    for r in results:
+        fps = f"{r['achieved_fps']:.1f}/{r['target_fps']:.0f}"
+        rss = f"{r['rss_growth_mb']:>+8.1f}" if r["rss_growth_mb"] is not None else f"{'-':>8}"
+        t = r["frame_ms"]
+        print(f"{r['view']:<14}{fps:>12}{t['p50']:>8.1f}{t['p90']:>8.1f}{t['p99']:>8.1f}{t['max']:>8.1f}"
+              f"{r['cpu_pct']:>7.0f}{rss}{r['stdout_lines']:>8}")
+        if r["heap_growth_mb"] is not None:
+            print(f"{'':<14}heap growth {r['heap_growth_mb']:+.2f} MB")
+        if "device_frames_unread" in r:
+            print(f"{'':<14}device frames read {r['device_frames_read']}, left unread {r['device_frames_unread']},"
+                  f" lost to overruns {r['device_frames_dropped']} ({args.rate}/s offered)")
+        for stage, s in r.get("latency_ms", {}).items():
+            print(f"{'':<14}latency {stage:<9} p50 {s['p50']:>9.1f}  p95 {s['p95']:>9.1f}  p99 {s['p99']:>9.1f} ms")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"rate": args.rate, "seconds": args.seconds, "results": results}, f, indent=2)
+    if args.baseline:
+        slower = compare(results, args.baseline, args.tolerance)
+        for view, before, after in slower:
+            print(f"REGRESSION {view}: p90 {before:.1f} ms -> {after:.1f} ms")
+        if slower:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
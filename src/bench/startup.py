@@ -0,0 +1,93 @@
+"""
+Startup time against the budget in main.STARTUP_BUDGET.
+
+Run from src/:
+    python -m bench.startup [--runs 3] [--json out.json] [--trace trace.json]
+
+Every run is a fresh interpreter (cold imports) with Qt offscreen, going
+through the same steps as main(): import main, splash, recordings
+housekeeping and the login dialog (splash_to_login); importing and
+showing the Dashboard (login_to_dashboard); and, for information, the
+first switch to the 12-lead test page, which is built on demand. The
+median of the runs is compared with the budget; the exit status is 1 if
+a phase is over it. --trace saves the first run's startup trace (Chrome
+trace JSON, see utils/startup_trace.py) for comparing builds.
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+PROBE = r"""
+import json, time
+t0 = time.perf_counter()
+import main
+from PyQt5.QtWidgets import QApplication
+t_import = time.perf_counter()
+app = QApplication([])
+splash = main.SplashScreen()
+splash.show()
+app.processEvents()
+t_splash = time.perf_counter()
+login = main.LoginRegisterDialog()
+login.show()
+splash.finish(login)
+app.processEvents()
+t_login = time.perf_counter()
+recordings = main.RecordingsWorker()
+recordings.start()
+login.hide()
+from dashboard.dashboard import Dashboard
+dashboard = Dashboard(username="bench")
+dashboard.show()
+app.processEvents()
+t_dashboard = time.perf_counter()
+dashboard.go_to_lead_test()
+app.processEvents()
+t_test = time.perf_counter()
+recordings.wait()
+print(json.dumps({
+    "import_main": t_import - t0,
+    "splash_to_login": t_login - t_splash,
+    "login_to_dashboard": t_dashboard - t_login,
+    "first_test_page": t_test - t_dashboard,
+}))
+"""
+
+
+def run_once(trace=None):
+    env = dict(os.environ, QT_QPA_PLATFORM=os.environ.get("QT_QPA_PLATFORM", "offscreen"))
+    if trace:
+        env["ECG_STARTUP_TRACE"] = os.path.abspath(trace)
+    out = subprocess.run([sys.executable, "-c", PROBE], capture_output=True, text=True, env=env, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure startup phases against the startup budget")
+    parser.add_argument("--runs", type=int, default=3, help="fresh-process runs (median is reported)")
+    parser.add_argument("--json", help="write results to this JSON file")
+    parser.add_argument("--trace", help="save the first run's startup trace to this file")
+    args = parser.parse_args(argv)
+
+    from main import STARTUP_BUDGET
+    runs = [run_once(args.trace if i == 0 else None) for i in range(max(1, args.runs))]
+    results, ok = {}, True
+    print(f"{'phase':<22}{'median s':>10}{'budget s':>10}")
+    for phase in runs[0]:
+        median = statistics.median(r[phase] for r in runs)
+        budget = STARTUP_BUDGET.get(phase)
+        over = budget is not None and median > budget
+        ok = ok and not over
+        results[phase] = {"median_s": round(median, 3), "budget_s": budget, "runs": [round(r[phase], 3) for r in runs]}
+        print(f"{phase:<22}{median:>10.2f}{budget if budget is not None else '-':>10}" + ("  OVER" if over else ""))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
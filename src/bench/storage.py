@@ -0,0 +1,101 @@
+"""
+Compression benchmark for the session store codecs.
+
+Run from src/:
+    python -m bench.storage [--minutes 10] [--session recordings/x.ecgs ...] [--json out.json]
+
+For every codec / delta order it reports the compression ratio and the
+encode / decode throughput in MB/s of raw int16 data, on a synthetic
+12-lead recording and on any recorded sessions given on the command line.
+"""
+import argparse
+import json
+import time
+import numpy as np
+from ecg.session_store import (
+    SessionReader, encode_chunk, decode_chunk, to_int16, DEFAULT_CHUNK_SAMPLES
+)
+from ecg.synthetic import SyntheticECG
+
+CONFIGS = [
+    ("raw", 0),
+    ("zlib", 1),
+    ("zlib", 2),
+    ("lzma", 1),
+    ("lzma", 2),
+]
+
+
+def synthetic_chunks(minutes, fs=500, chunk_samples=DEFAULT_CHUNK_SAMPLES, seed=0):
+    gen = SyntheticECG(fs=fs, seed=seed)
+    n_chunks = max(1, int(minutes * 60 * fs) // chunk_samples)
+    return [to_int16(gen.generate(chunk_samples)) for _ in range(n_chunks)]
+
+
+def session_chunks(path):
+    reader = SessionReader(path)
+    chunks = []
+    for i in range(reader.n_chunks):
+        data = np.zeros((len(reader.leads), reader.chunk_samples), dtype=np.int16)
+        valid = reader.chunk(i)
+        data[:, :valid.shape[1]] = valid
+        chunks.append(data)
+    reader.close()
+    return chunks
+
+
+def bench_codec(chunks, codec, delta_order):
+    n_leads, chunk_samples = chunks[0].shape
+    raw_bytes = sum(c.nbytes for c in chunks)
+    t0 = time.perf_counter()
+    payloads = [encode_chunk(c, codec, delta_order) for c in chunks]
+    t1 = time.perf_counter()
+    decoded = [decode_chunk(p, n_leads, chunk_samples, codec, delta_order) for p in payloads]
+    t2 = time.perf_counter()
+    if not all(np.array_equal(a, b) for a, b in zip(chunks, decoded)):
+        raise AssertionError(f"{codec} (delta {delta_order}) is not lossless")
+    packed = sum(len(p) for p in payloads)
+    mb = raw_bytes / 1e6
+    return {
+        "codec": codec,
+        "delta_order": delta_order,
+        "raw_mb": round(mb, 3),
+        "ratio": round(raw_bytes / packed, 3),
+        "encode_mb_s": round(mb / max(t1 - t0, 1e-9), 1),
+        "decode_mb_s": round(mb / max(t2 - t1, 1e-9), 1),
+    }
+
+
+def run(datasets):
+    results = []
+    for name, chunks in datasets:
+        for codec, order in CONFIGS:
+            row = bench_codec(chunks, codec, order)
+            row["dataset"] = name
+            results.append(row)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark session store compression")
+    parser.add_argument("--minutes", type=float, default=10, help="length of the synthetic recording")
+    parser.add_argument("--session", action="append", default=[], help="recorded .ecgs file to include")
+    parser.add_argument("--json", help="write results to this JSON file")
+    args = parser.parse_args(argv)
+
+    datasets = [(f"synthetic-{args.minutes:g}min", synthetic_chunks(args.minutes))]
+    for path in args.session:
+        datasets.append((path, session_chunks(path)))
+
+    results = run(datasets)
+    print(f"{'dataset':<28}{'codec':<8}{'delta':>6}{'ratio':>8}{'enc MB/s':>10}{'dec MB/s':>10}")
+    for r in results:
+        print(f"{r['dataset']:<28}{r['codec']:<8}{r['delta_order']:>6}{r['ratio']:>8.2f}"
+              f"{r['encode_mb_s']:>10.1f}{r['decode_mb_s']:>10.1f}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
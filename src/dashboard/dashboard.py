@@ -2,16 +2,22 @@ from PyQt5.QtWidgets import (
     QApplication, QWidget, QLabel, QVBoxLayout, QHBoxLayout, QPushButton, QFrame, QGridLayout, QCalendarWidget, QTextEdit,
     QDialog, QLineEdit, QComboBox, QFormLayout, QMessageBox, QSizePolicy, QStackedWidget
 )
-from PyQt5.QtGui import QFont, QPixmap, QMovie
-from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtGui import QFont, QMovie
+from PyQt5.QtCore import Qt
 import sys
 import numpy as np
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
 from matplotlib.animation import FuncAnimation
-import math
 import os
 import json
+import datetime
+from utils import startup_trace
+from utils.heartbeat_widget import BeatingHeart
+from dashboard.theme import ThemeManager
+from utils.logs import get_logger
+
+log = get_logger("dashboard")
 
 class MplCanvas(FigureCanvas):
     def __init__(self, width=4, height=2, dpi=100):
@@ -59,12 +65,15 @@ class SignInDialog(QDialog):
         return self.role_combo.currentText(), self.name_edit.text()
 
 class Dashboard(QWidget):
+    @startup_trace.traced
     def __init__(self, username=None, role=None):
         super().__init__()
         self.username = username
         self.role = role
         self.medical_mode = False
         self.dark_mode = False
+        self.setObjectName("Dashboard")  # theme rules are scoped to this window
+        self.theme = ThemeManager(scope="#Dashboard", parent=self)
         self.setWindowTitle("ECG Monitor Dashboard")
         self.setGeometry(100, 100, 1300, 900)
         self.setWindowFlags(self.windowFlags() | Qt.WindowMinimizeButtonHint | Qt.WindowMaximizeButtonHint | Qt.WindowCloseButtonHint)
@@ -94,10 +103,11 @@ class Dashboard(QWidget):
         self.status_dot.setFixedSize(18, 18)
         self.status_dot.setStyleSheet("border-radius: 9px; background: gray; border: 2px solid #fff;")
         header.addWidget(self.status_dot)
-        self.update_internet_status()
-        self.status_timer = QTimer(self)
-        self.status_timer.timeout.connect(self.update_internet_status)
-        self.status_timer.start(3000)
+        # Reachability is probed asynchronously (QTcpSocket) with backoff while offline
+        from utils.connectivity import ConnectivityProbe
+        self.connectivity = ConnectivityProbe(parent=self)
+        self.connectivity.checked.connect(self.update_internet_status)
+        self.connectivity.start()
         self.medical_btn = QPushButton("Medical Mode")
         self.medical_btn.setCheckable(True)
         self.medical_btn.setStyleSheet("background: #00b894; color: white; border-radius: 10px; padding: 4px 18px;")
@@ -142,18 +152,15 @@ class Dashboard(QWidget):
         grid.setSpacing(20)
         # --- Heart Rate Card ---
         heart_card = QFrame()
-        heart_card.setStyleSheet("background: white; border-radius: 16px;")
+        heart_card.setProperty("card", True)
         heart_layout = QVBoxLayout(heart_card)
         heart_label = QLabel("Live Heart Rate Overview")
         heart_label.setFont(QFont("Arial", 14, QFont.Bold))
-        heart_img = QLabel()
         # Use a portable path for the heart image asset
         heart_img_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "assets", "her.png")
-        self.heart_pixmap = QPixmap(heart_img_path)
         self.heart_base_size = 220
+        heart_img = BeatingHeart(heart_img_path, base_size=self.heart_base_size)
         heart_img.setFixedSize(self.heart_base_size + 20, self.heart_base_size + 20)
-        heart_img.setAlignment(Qt.AlignCenter)
-        heart_img.setPixmap(self.heart_pixmap.scaled(self.heart_base_size, self.heart_base_size, Qt.KeepAspectRatio, Qt.SmoothTransformation))
         heart_layout.addWidget(heart_label)
         heart_layout.addWidget(heart_img)
         heart_layout.addWidget(QLabel("Stress Level: Low"))
@@ -161,13 +168,9 @@ class Dashboard(QWidget):
         grid.addWidget(heart_card, 0, 0, 2, 1)
         # --- Heartbeat Animation ---
         self.heart_img = heart_img
-        self.heartbeat_phase = 0
-        self.heartbeat_timer = QTimer(self)
-        self.heartbeat_timer.timeout.connect(self.animate_heartbeat)
-        self.heartbeat_timer.start(30)  # ~33 FPS
         # --- Patient Body Analysis Cards ---
         analysis_card = QFrame()
-        analysis_card.setStyleSheet("background: white; border-radius: 16px;")
+        analysis_card.setProperty("card", True)
         analysis_layout = QHBoxLayout(analysis_card)
         for title, value, unit in [
             ("Glucose Level", "127", "mg/dl"),
@@ -185,13 +188,12 @@ class Dashboard(QWidget):
         grid.addWidget(analysis_card, 0, 1, 1, 2)
         # --- ECG Recording (Animated Chart) ---
         ecg_card = QFrame()
-        ecg_card.setStyle
+        ecg_card.setProperty("card", True)
         ecg_layout = QVBoxLayout(ecg_card)
         ecg_label = QLabel("ECG Recording")
         ecg_label.setFont(QFont("Arial", 12, QFont.Bold))
         ecg_layout.addWidget(ecg_label)
         self.ecg_canvas = MplCanvas(width=4, height=2)
-        self.ecg_canvas.axes.set_facecolor("#eee")
         self.ecg_canvas.axes.set_xticks([])
         self.ecg_canvas.axes.set_yticks([])
         self.ecg_canvas.axes.set_title("Lead II", fontsize=10)
@@ -199,7 +201,7 @@ class Dashboard(QWidget):
         grid.addWidget(ecg_card, 1, 1)
         # --- Total Visitors (Pie Chart) ---
         visitors_card = QFrame()
-        visitors_card.setStyleSheet("background: white; border-radius: 16px;")
+        visitors_card.setProperty("card", True)
         visitors_layout = QVBoxLayout(visitors_card)
         visitors_label = QLabel("Total Visitors")
         visitors_label.setFont(QFont("Arial", 12, QFont.Bold))
@@ -212,46 +214,29 @@ class Dashboard(QWidget):
             pie_data, labels=pie_labels, autopct='%1.0f%%', colors=pie_colors, startangle=90
         )
         pie_canvas.axes.set_aspect('equal')
+        self.theme.register_canvas(pie_canvas)
         visitors_layout.addWidget(pie_canvas)
         grid.addWidget(visitors_card, 1, 2)
         # --- Schedule Card ---
         schedule_card = QFrame()
-        schedule_card.setStyleSheet("background: white; border-radius: 16px;")
+        schedule_card.setProperty("card", True)
         schedule_layout = QVBoxLayout(schedule_card)
         schedule_label = QLabel("Schedule")
         schedule_label.setFont(QFont("Arial", 12, QFont.Bold))
         schedule_layout.addWidget(schedule_label)
         cal = QCalendarWidget()
         cal.setFixedHeight(120)
-        # Highlight last ECG usage date in red
-        from PyQt5.QtGui import QTextCharFormat, QColor
-        last_ecg_file = 'last_ecg_date.json'
-        import datetime
-        today = datetime.date.today()
-        # Try to load last ECG date from file
-        last_ecg_date = None
-        if os.path.exists(last_ecg_file):
-            with open(last_ecg_file, 'r') as f:
-                try:
-                    data = json.load(f)
-                    last_ecg_date = data.get('last_ecg_date')
-                except Exception:
-                    last_ecg_date = None
-        if last_ecg_date:
-            try:
-                y, m, d = map(int, last_ecg_date.split('-'))
-                last_date = Qt.QDate(y, m, d)
-                fmt = QTextCharFormat()
-                fmt.setBackground(QColor('red'))
-                fmt.setForeground(QColor('white'))
-                cal.setDateTextFormat(last_date, fmt)
-            except Exception:
-                pass
+        # Days with a recorded ECG are highlighted from the session catalog;
+        # the last one in red. Re-queried when the month changes.
+        self.calendar = cal
+        self._calendar_marked = []
+        cal.currentPageChanged.connect(self.refresh_calendar)
+        self.refresh_calendar(cal.yearShown(), cal.monthShown())
         schedule_layout.addWidget(cal)
         grid.addWidget(schedule_card, 2, 0)
         # --- Issue Found Card ---
         issue_card = QFrame()
-        issue_card.setStyleSheet("background: white; border-radius: 16px;")
+        issue_card.setProperty("card", True)
         issue_layout = QVBoxLayout(issue_card)
         issue_label = QLabel("Issue Found")
         issue_label.setFont(QFont("Arial", 12, QFont.Bold))
@@ -286,13 +271,13 @@ class Dashboard(QWidget):
         issues_box = QTextEdit()
         issues_box.setReadOnly(True)
         issues_box.setText(issues_text)
-        issues_box.setStyleSheet("background: #f7f7f7; border: none; font-size: 12px;")
+        issues_box.setProperty("notes", True)
         issues_box.setMinimumHeight(180)
         issue_layout.addWidget(issues_box)
         grid.addWidget(issue_card, 2, 1, 1, 2)
         # --- ECG Monitor Metrics Cards ---
         metrics_card = QFrame()
-        metrics_card.setStyleSheet("background: white; border-radius: 16px;")
+        metrics_card.setProperty("card", True)
         metrics_layout = QHBoxLayout(metrics_card)
         # Store metric labels for live update
         self.metric_labels = {}
@@ -320,27 +305,83 @@ class Dashboard(QWidget):
         self.generate_report_btn = QPushButton("Generate Report")
         self.generate_report_btn.setStyleSheet("background: #ff6600; color: white; border-radius: 10px; padding: 8px 24px; font-size: 16px; font-weight: bold;")
         self.generate_report_btn.clicked.connect(self.generate_pdf_report)
-        dashboard_layout.addWidget(self.generate_report_btn, alignment=Qt.AlignRight)
+        # Reports are built by a background job queue; progress shows here
+        self.report_queue = None
+        report_row = QHBoxLayout()
+        report_row.addStretch()
+        self.report_status = QLabel("")
+        report_row.addWidget(self.report_status)
+        self.cancel_report_btn = QPushButton("Cancel")
+        self.cancel_report_btn.setStyleSheet("background: #e74c3c; color: white; border-radius: 10px; padding: 8px 18px;")
+        self.cancel_report_btn.clicked.connect(lambda: self.report_queue and self.report_queue.cancel())
+        self.cancel_report_btn.hide()
+        report_row.addWidget(self.cancel_report_btn)
+        report_row.addWidget(self.generate_report_btn)
+        dashboard_layout.addLayout(report_row)
         
         # --- ECG Animation Setup ---
         self.ecg_x = np.linspace(0, 2, 500)
         self.ecg_y = 1000 + 200 * np.sin(2 * np.pi * 2 * self.ecg_x) + 50 * np.random.randn(500)
         self.ecg_line, = self.ecg_canvas.axes.plot(self.ecg_x, self.ecg_y, color="#ff6600")
         self.anim = FuncAnimation(self.ecg_canvas.figure, self.update_ecg, interval=50, blit=True)
+        self.theme.register_canvas(self.ecg_canvas, chart=True)
         # Add dashboard_page to stack
         self.page_stack.addWidget(self.dashboard_page)
-        # --- ECG Test Page ---
-        from ecg.twelve_lead_test import ECGTestPage
-        self.ecg_test_page = ECGTestPage("12 Lead ECG Test", self.page_stack)
-        self.ecg_test_page.dashboard_callback = self.update_ecg_metrics
-        self.page_stack.addWidget(self.ecg_test_page)
+        # --- ECG Test Page: built on first navigation (see ecg_test_page) ---
+        self._ecg_test_page = None
         # --- Main layout ---
         main_layout = QVBoxLayout(self)
         main_layout.addWidget(self.page_stack)
         self.setLayout(main_layout)
         self.page_stack.setCurrentWidget(self.dashboard_page)
+        self.page_stack.currentChanged.connect(self.on_page_changed)
+        startup_trace.first_paint(self)
+    @property
+    def ecg_test_page(self):
+        """The 12-lead test page (12 figures and the serial stack), created the first time it is needed."""
+        if self._ecg_test_page is None:
+            from ecg.twelve_lead_test import ECGTestPage
+            page = ECGTestPage("12 Lead ECG Test", self.page_stack)
+            page.dashboard_callback = self.update_ecg_metrics
+            page.beat_callback = self.heart_img.sync_to_beat
+            page.patient_id = self.username or ""
+            self.page_stack.addWidget(page)
+            startup_trace.first_paint(page)
+            self._ecg_test_page = page
+        return self._ecg_test_page
+    def on_page_changed(self, index):
+        if self.page_stack.widget(index) is self.dashboard_page:
+            # A test may have just been recorded
+            self.refresh_calendar(self.calendar.yearShown(), self.calendar.monthShown())
+            self.anim.event_source.start()
+        else:
+            # No point animating the dashboard ECG while another page covers it
+            self.anim.event_source.stop()
+    def refresh_calendar(self, year, month):
+        from PyQt5.QtGui import QTextCharFormat, QColor
+        from PyQt5.QtCore import QDate
+        from ecg.catalog import default_catalog, month_range
+        try:
+            catalog = default_catalog()
+            start, end = month_range(year, month)
+            dates = catalog.session_dates(start, end, patient_id=self.username or None)
+            last = catalog.last_session(patient_id=self.username or None)
+        except Exception as e:
+            log.warning("Could not query session catalog: %s", e)
+            return
+        for qdate in self._calendar_marked:
+            self.calendar.setDateTextFormat(qdate, QTextCharFormat())
+        self._calendar_marked = []
+        last_day = datetime.date.fromtimestamp(last["start_time"]) if last else None
+        for day in set(dates) | ({last_day} if last_day else set()):
+            fmt = QTextCharFormat()
+            fmt.setBackground(QColor('red' if day == last_day else '#ffd8b0'))
+            if day == last_day:
+                fmt.setForeground(QColor('white'))
+            qdate = QDate(day.year, day.month, day.day)
+            self.calendar.setDateTextFormat(qdate, fmt)
+            self._calendar_marked.append(qdate)
     def update_ecg(self, frame):
-        import os, json
         lead_ii_file = 'lead_ii_live.json'
         if os.path.exists(lead_ii_file):
             try:
@@ -355,7 +396,7 @@ class Dashboard(QWidget):
                     self.ecg_line.set_ydata(arr[-len(self.ecg_x):])
                     return [self.ecg_line]
             except Exception as e:
-                print("Error reading lead_ii_live.json:", e)
+                log.warning("Error reading lead_ii_live.json: %s", e)
         # Fallback: mock wave
         self.ecg_y = np.roll(self.ecg_y, -1)
         self.ecg_y[-1] = 1000 + 200 * np.sin(2 * np.pi * 2 * self.ecg_x[-1] + frame/10) + 50 * np.random.randn()
@@ -363,6 +404,8 @@ class Dashboard(QWidget):
         return [self.ecg_line]
     
     def update_ecg_metrics(self, intervals):
+        if 'HR' in intervals and intervals['HR'] is not None:
+            self.metric_labels['heart_rate'].setText(f"{intervals['HR']:.0f} bpm")
         if 'PR' in intervals and intervals['PR'] is not None:
             self.metric_labels['pr_interval'].setText(f"{intervals['PR']:.1f} ms")
         if 'QRS' in intervals and intervals['QRS'] is not None:
@@ -375,11 +418,15 @@ class Dashboard(QWidget):
             self.metric_labels['st_segment'].setText(f"{intervals['ST']:.1f} ms")
             
     def generate_pdf_report(self):
-        from PyQt5.QtWidgets import QFileDialog, QMessageBox
-        import datetime
-        from ecg.ecg_report_generator import generate_ecg_html_report
+        from PyQt5.QtWidgets import QFileDialog
+        from ecg.report_render import ReportJob, ReportQueue
+
+        # Ask user where to save PDF
+        path, _ = QFileDialog.getSaveFileName(self, "Save ECG Report as PDF", "", "PDF Files (*.pdf)")
+        if not path:
+            return
 
-        # Gather details from dashboard
+        # Gather details from dashboard: the report is a snapshot of what it shows now
         HR = self.metric_labels['heart_rate'].text().split()[0] if 'heart_rate' in self.metric_labels else "--"
         PR = self.metric_labels['pr_interval'].text().split()[0] if 'pr_interval' in self.metric_labels else "--"
         QRS = self.metric_labels['qrs_duration'].text().split()[0] if 'qrs_duration' in self.metric_labels else "--"
@@ -387,96 +434,42 @@ class Dashboard(QWidget):
         QTc = self.metric_labels['qtc_interval'].text().split()[0] if 'qtc_interval' in self.metric_labels else "--"
         QRS_axis = self.metric_labels['qrs_axis'].text() if 'qrs_axis' in self.metric_labels else "--"
         ST = self.metric_labels['st_segment'].text().split()[0] if 'st_segment' in self.metric_labels else "--"
-
-        # Patient details (replace with actual data if available)
-        first_name = getattr(self, "username", "Unknown")
-        last_name = ""
-        age = ""
-        height = ""
-        gender = ""
-        weight = ""
-        test_name = "12 Lead ECG"
-        date_time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
-        abnormal_report = 'N'
-        text = obstext = qrstext = ""
-        uId = testId = dataId = "NA"
-
-        # --- Save Lead II graph as image ---
-        lead2_img_path = "lead2_graph_temp.png"
-        try:
-            # Set a larger figure size for PDF export
-            fig = self.ecg_canvas.figure
-            orig_size = fig.get_size_inches()
-            fig.set_size_inches(8, 3.5)  # Wider and taller for PDF
-            fig.savefig(lead2_img_path, bbox_inches='tight', dpi=250)
-            fig.set_size_inches(*orig_size)  # Restore original size
-        except Exception as e:
-            print("Error saving Lead II graph image:", e)
-            lead2_img_path = None
-
-        # --- Generate HTML report with graph image ---
-        html = generate_ecg_html_report(
-            HR=HR,
-            PR=float(PR) if PR.replace('.', '', 1).isdigit() else 0,
-            QRS=float(QRS) if QRS.replace('.', '', 1).isdigit() else 0,
-            QT=float(QT) if QT.replace('.', '', 1).isdigit() else 0,
-            QTc=float(QTc) if QTc.replace('.', '', 1).isdigit() else 0,
-            ST=float(ST) if ST.replace('.', '', 1).isdigit() else 0,
-            test_name=test_name,
-            date_time=date_time,
-            first_name=first_name,
-            last_name=last_name,
-            age=age,
-            height=height,
-            gender=gender,
-            weight=weight,
-            abnormal_report=abnormal_report,
-            text=text,
-            obstext=obstext,
-            qrstext=qrstext,
-            uId=uId,
-            testId=testId,
-            dataId=dataId,
-            lead2_img_path=lead2_img_path, # Path to Lead II graph image
-            # Add QRS axis if available
-            QRS_axis=QRS_axis
+        # Only copies go to the job: the Lead II strip is re-rendered offscreen
+        # with Agg instead of resizing and saving the live dashboard figure
+        job = ReportJob(
+            path,
+            metrics={'HR': HR, 'PR': PR, 'QRS': QRS, 'QT': QT, 'QTc': QTc, 'ST': ST, 'QRS_axis': QRS_axis},
+            patient={'first_name': getattr(self, "username", "Unknown")},  # replace with actual data if available
+            strip=self.ecg_line.get_ydata(),
+            test_name="12 Lead ECG",  # dated now, like the values and trace
         )
-        
-        # Save HTML report
-        with open("ecg_report.html", "w") as f:
-            f.write(html)
+        if self.report_queue is None:
+            self.report_queue = ReportQueue(self)
+            self.report_queue.job_progress.connect(self.on_report_progress)
+            self.report_queue.job_done.connect(lambda job_id, p: self.on_report_finished(f"Report saved: {os.path.basename(p)}", p))
+            self.report_queue.job_failed.connect(lambda job_id, msg: self.on_report_finished("Report failed", msg))
+            self.report_queue.job_cancelled.connect(lambda job_id: self.on_report_finished("Report cancelled"))
+        self.report_queue.submit(job)
+        self.on_report_progress(job.id, 0)
 
-        # Ask user where to save PDF
-        path, _ = QFileDialog.getSaveFileName(self, "Save ECG Report as PDF", "", "PDF Files (*.pdf)")
-        if not path:
-            return
+    def on_report_progress(self, job_id, percent):
+        queued = self.report_queue.pending - 1  # minus the running one
+        self.report_status.setText(f"Generating report... {percent}%" + (f" ({queued} queued)" if queued > 0 else ""))
+        self.cancel_report_btn.show()
 
-        # Convert HTML to PDF using Qt's QTextDocument (no extra dependencies)
-        from PyQt5.QtGui import QTextDocument
-        from PyQt5.QtPrintSupport import QPrinter
-        doc = QTextDocument()
-        doc.setHtml(html)
-        printer = QPrinter(QPrinter.HighResolution)
-        printer.setOutputFormat(QPrinter.PdfFormat)
-        printer.setOutputFileName(path)
-        doc.print_(printer)
-        QMessageBox.information(self, "Report Generated", f"ECG report saved as PDF:\n{path}")
+    def on_report_finished(self, status, detail=""):
+        self.report_status.setText(status)
+        self.report_status.setToolTip(detail)
+        if self.report_queue.pending == 0:
+            self.cancel_report_btn.hide()
+
+    def closeEvent(self, event):
+        self.connectivity.stop()
+        self.theme.apply("light")  # don't hand our theme rules to the next session's ThemeManager as its base
+        if self.report_queue is not None:
+            self.report_queue.shutdown()
+        super().closeEvent(event)
 
-        # Clean up temp image
-        if lead2_img_path and os.path.exists(lead2_img_path):
-            try:
-                os.remove(lead2_img_path)
-            except Exception:
-                pass
-    
-    def animate_heartbeat(self):
-        # Heartbeat effect: scale up and down in a sine wave pattern
-        beat = 1 + 0.13 * math.sin(self.heartbeat_phase) + 0.07 * math.sin(2 * self.heartbeat_phase)
-        size = int(self.heart_base_size * beat)
-        self.heart_img.setPixmap(self.heart_pixmap.scaled(size, size, Qt.KeepAspectRatio, Qt.SmoothTransformation))
-        self.heartbeat_phase += 0.18  # Controls speed of beat
-        if self.heartbeat_phase > 2 * math.pi:
-            self.heartbeat_phase -= 2 * math.pi
     def handle_sign(self):
         if self.sign_btn.text() == "Sign In":
             dialog = SignInDialog(self)
@@ -497,73 +490,38 @@ class Dashboard(QWidget):
         self.page_stack.setCurrentWidget(self.ecg_test_page)
     def go_to_dashboard(self):
         self.page_stack.setCurrentWidget(self.dashboard_page)
-    def update_internet_status(self):
-        import socket
-        try:
-            socket.create_connection(("8.8.8.8", 53), timeout=2)
+    def update_internet_status(self, online, connect_ms=-1.0):
+        probe = self.connectivity
+        if online:
             self.status_dot.setStyleSheet("border-radius: 9px; background: #00e676; border: 2px solid #fff;")
-            self.status_dot.setToolTip("Connected to Internet")
-        except Exception:
+            self.status_dot.setToolTip(f"Connected to Internet ({connect_ms:.0f} ms to {probe.host}:{probe.port})")
+        else:
             self.status_dot.setStyleSheet("border-radius: 9px; background: #e74c3c; border: 2px solid #fff;")
-            self.status_dot.setToolTip("No Internet Connection")
+            self.status_dot.setToolTip(f"No Internet Connection (next check in {probe.next_interval_ms // 1000} s)")
+    def current_theme(self):
+        return "dark" if self.dark_mode else "medical" if self.medical_mode else "light"
     def toggle_medical_mode(self):
         self.medical_mode = not self.medical_mode
         if self.medical_mode:
             # Medical color coding: blue/green/white
-            self.setStyleSheet("QWidget { background: #e3f6fd; } QFrame { background: #f8fdff; border-radius: 16px; } QLabel { color: #006266; }")
             self.medical_btn.setText("Normal Mode")
             self.medical_btn.setStyleSheet("background: #0984e3; color: white; border-radius: 10px; padding: 4px 18px;")
         else:
-            self.setStyleSheet("")
             self.medical_btn.setText("Medical Mode")
             self.medical_btn.setStyleSheet("background: #00b894; color: white; border-radius: 10px; padding: 4px 18px;")
+        self.theme.apply(self.current_theme())
     def toggle_dark_mode(self):
         self.dark_mode = not self.dark_mode
         if self.dark_mode:
-            self.setStyleSheet("""
-                QWidget { background: #181818; color: #fff; }
-                QFrame { background: #232323 !important; border-radius: 16px; color: #fff; border: 2px solid #fff; }
-                QLabel { color: #fff; }
-                QPushButton { background: #333; color: #ff6600; border-radius: 10px; }
-                QPushButton:checked { background: #ff6600; color: #fff; }
-                QCalendarWidget QWidget { background: #232323; color: #fff; }
-                QCalendarWidget QAbstractItemView { background: #232323; color: #fff; selection-background-color: #444; selection-color: #ff6600; }
-                QTextEdit { background: #232323; color: #fff; border-radius: 12px; border: 2px solid #fff; }
-            """)
             self.dark_btn.setText("Light Mode")
-            # Set matplotlib canvas backgrounds to dark
-            self.ecg_canvas.axes.set_facecolor("#232323")
-            self.ecg_canvas.figure.set_facecolor("#232323")
-            for child in self.findChildren(QFrame):
-                child.setStyleSheet("background: #232323; border-radius: 16px; color: #fff; border: 2px solid #fff;")
-                for canvas in child.findChildren(MplCanvas):
-                    canvas.axes.set_facecolor("#232323")
-                    canvas.figure.set_facecolor("#232323")
-                    canvas.draw()
-                for cal in child.findChildren(QCalendarWidget):
-                    cal.setStyleSheet("background: #232323; color: #fff; border-radius: 12px; border: 2px solid #fff;")
-                for txt in child.findChildren(QTextEdit):
-                    txt.setStyleSheet("background: #232323; color: #fff; border-radius: 12px; border: 2px solid #fff;")
             # Remove all margins and spacing for a seamless dark look
             self.layout().setContentsMargins(0, 0, 0, 0)
             self.layout().setSpacing(10)
         else:
-            self.setStyleSheet("")
             self.dark_btn.setText("Dark Mode")
-            self.ecg_canvas.axes.set_facecolor("#eee")
-            self.ecg_canvas.figure.set_facecolor("#fff")
-            for child in self.findChildren(QFrame):
-                child.setStyleSheet("")
-                for canvas in child.findChildren(MplCanvas):
-                    canvas.axes.set_facecolor("#fff")
-                    canvas.figure.set_facecolor("#fff")
-                    canvas.draw()
-                for cal in child.findChildren(QCalendarWidget):
-                    cal.setStyleSheet("")
-                for txt in child.findChildren(QTextEdit):
-                    txt.setStyleSheet("")
             self.layout().setContentsMargins(20, 20, 20, 20)
             self.layout().setSpacing(20)
+        self.theme.apply(self.current_theme())
     def center_on_screen(self):
         qr = self.frameGeometry()
         cp = QApplication.desktop().availableGeometry().center()
@@ -0,0 +1,135 @@
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtCore import QObject, QEvent
+
+# --- Themes ---
+# A theme is one stylesheet for the whole application plus the colours for
+# matplotlib canvases. Switching theme is a single QApplication.setStyleSheet
+# (one restyle pass instead of one per widget) and a facecolor change on each
+# registered canvas, which is then redrawn with draw_idle() on the next pass
+# of the event loop, or when it is next shown if it is hidden right now.
+#
+# Widgets that the themes restyle must not carry their own inline stylesheet
+# (it would win over the application one); mark them with a dynamic property
+# instead, e.g. card.setProperty("card", True) -> QFrame[card="true"].
+#
+# The rules are written for any widget ("QWidget { ... }"); ThemeManager's
+# scope prefixes every selector with the themed window's object name, so
+# other top-level windows (login, 12-lead detail views) keep their own look.
+
+CARD_RULES = """
+    QFrame[card="true"] {{ background: {card}; border-radius: 16px; {card_extra} }}
+    QTextEdit[notes="true"] {{ background: {notes}; border: none; font-size: 12px; {notes_extra} }}
+"""
+
+STYLESHEETS = {
+    "light": CARD_RULES.format(card="white", card_extra="", notes="#f7f7f7", notes_extra=""),
+    "medical": """
+        QWidget { background: #e3f6fd; }
+        QFrame { background: #f8fdff; border-radius: 16px; }
+        QLabel { color: #006266; }
+    """ + CARD_RULES.format(card="#f8fdff", card_extra="", notes="#f8fdff", notes_extra=""),
+    "dark": """
+        QWidget { background: #181818; color: #fff; }
+        QFrame { background: #232323; border-radius: 16px; color: #fff; border: 2px solid #fff; }
+        QLabel { color: #fff; }
+        QPushButton { background: #333; color: #ff6600; border-radius: 10px; }
+        QPushButton:checked { background: #ff6600; color: #fff; }
+        QCalendarWidget QWidget { background: #232323; color: #fff; }
+        QCalendarWidget QAbstractItemView { background: #232323; color: #fff; selection-background-color: #444; selection-color: #ff6600; }
+        QTextEdit { background: #232323; color: #fff; border-radius: 12px; border: 2px solid #fff; }
+    """ + CARD_RULES.format(card="#232323", card_extra="color: #fff; border: 2px solid #fff;",
+                            notes="#232323", notes_extra="color: #fff; border-radius: 12px; border: 2px solid #fff;"),
+}
+
+# Matplotlib colours per theme, named like the rcParams they stand in for.
+# "chart.facecolor" is the plot area of live signal charts.
+CANVAS_COLORS = {
+    "light": {"figure.facecolor": "#fff", "axes.facecolor": "#fff", "chart.facecolor": "#eee", "text.color": "#000"},
+    "medical": {"figure.facecolor": "#f8fdff", "axes.facecolor": "#f8fdff", "chart.facecolor": "#e3f6fd",
+                "text.color": "#006266"},
+    "dark": {"figure.facecolor": "#232323", "axes.facecolor": "#232323", "chart.facecolor": "#232323",
+             "text.color": "#fff"},
+}
+
+
+def scoped(stylesheet, scope):
+    """
+    Limit stylesheet rules to the widget matching scope (e.g. "#Dashboard")
+    and its descendants: "QLabel" becomes "#Dashboard QLabel", and a bare
+    "QWidget" also matches the scope widget itself.
+    """
+    rules = []
+    for rule in stylesheet.split("}"):
+        if "{" not in rule:
+            continue
+        selectors, body = rule.split("{", 1)
+        names = []
+        for selector in selectors.split(","):
+            selector = selector.strip()
+            if selector == "QWidget":
+                names.append(selector + scope)
+            names.append(f"{scope} {selector}")
+        rules.append(f"{', '.join(names)} {{{body}}}")
+    return "\n".join(rules)
+
+
+class ThemeManager(QObject):
+    """
+    Applies a theme to the application and to registered matplotlib canvases.
+    Args:
+        theme: Initial theme name (a key of STYLESHEETS)
+        scope: Selector the rules are limited to, e.g. "#Dashboard" (None: every window)
+    """
+    def __init__(self, theme="light", scope=None, parent=None):
+        super().__init__(parent)
+        app = QApplication.instance()
+        self._base = app.styleSheet() if app else ""  # whatever the app set before us stays in front
+        self.scope = scope
+        self._canvases = []  # (canvas, is_chart)
+        self._dirty = set()
+        self.theme = None
+        self.apply(theme)
+
+    def register_canvas(self, canvas, chart=False):
+        """
+        Have canvas follow the theme.
+        Args:
+            chart: True for live signal charts (use chart.facecolor for the plot area)
+        """
+        self._canvases.append((canvas, chart))
+        canvas.installEventFilter(self)
+        self._style_canvas(canvas, chart)
+
+    def _style_canvas(self, canvas, chart):
+        colors = CANVAS_COLORS[self.theme]
+        fig = canvas.figure
+        fig.set_facecolor(colors["figure.facecolor"])
+        for ax in fig.axes:
+            ax.set_facecolor(colors["chart.facecolor" if chart else "axes.facecolor"])
+            ax.title.set_color(colors["text.color"])
+            for text in ax.texts:
+                text.set_color(colors["text.color"])
+
+    def apply(self, theme):
+        """Switch theme: one application stylesheet, then mark canvases for redraw."""
+        if theme not in STYLESHEETS:
+            raise ValueError(f"Unknown theme {theme!r}, expected one of {', '.join(STYLESHEETS)}")
+        if theme == self.theme:
+            return
+        self.theme = theme
+        app = QApplication.instance()
+        if app:
+            rules = STYLESHEETS[theme]
+            app.setStyleSheet(self._base + (scoped(rules, self.scope) if self.scope else rules))
+        for canvas, chart in self._canvases:
+            self._style_canvas(canvas, chart)
+            if canvas.isVisible():
+                canvas.draw_idle()
+            else:
+                self._dirty.add(canvas)
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Show and obj in self._dirty:
+            self._dirty.discard(obj)
+            obj.draw_idle()
+        return False
@@ -0,0 +1,441 @@
+import os
+import json
+import queue
+import socket
+import tempfile
+import threading
+import collections
+import numpy as np
+from ecg.session_store import DEFAULT_FS, DEFAULT_GAIN, STANDARD_LEADS, DEVICE_CHANNELS
+from ecg.session_recording import ECGRecording
+from ecg.measurement_log import MeasurementLog
+from ecg.pan_tompkins import pan_tompkins
+from ecg.ecg_pqrst import detect_pqrst, pqrst_intervals, snap_to_peak
+from ecg.arrhythmia import detect_arrhythmia
+from utils import perf_metrics, logs
+
+# --- Acquisition service ---
+# The acquisition side of the 12-lead page without Qt, for running in its
+# own process (ecg_service.py): one thread owns the serial device, derives
+# the 12 leads from the board's 8 channels, streams them to a session file
+# (ECGRecording) and analyses the last few seconds of Lead II once a second,
+# the way reports are measured. Everything it produces is published to local clients
+# over a Unix stream socket, so monitoring and recording go on with no GUI
+# attached and viewers can come and go without touching the session.
+#
+# Protocol: newline-delimited JSON objects, service -> client only.
+#   {"type": "hello", "leads": [...], "fs": 500, "gain": ..., "session": path, "sample": n}
+#       on connect; sample is the index of the next frame
+#   {"type": "samples", "start": n, "data": [[lead 0 values], [lead 1 values], ...]}
+#       a batch of frames (one list per lead, in hello's lead order);
+#       start jumps ahead when this client fell behind and batches were dropped
+#   {"type": "metrics", "sample": n, "metrics": {"HR": ..., "PR": ..., ...}, "rhythm": label,
+#    "beat_age": seconds since the newest R peak (or null)}
+#   {"type": "bye"} when the service stops
+# Each client has a bounded queue: a client that does not keep up loses
+# batches, the acquisition thread never waits for it.
+#
+# ECG_SERVICE_SOCKET sets the socket path (default <tmp>/ecg-acquisition.sock).
+
+SOCKET_ENV = "ECG_SERVICE_SOCKET"
+DEFAULT_SOCKET = os.path.join(tempfile.gettempdir(), "ecg-acquisition.sock")
+BATCH_FRAMES = 20  # frames per samples message (40 ms at 500 Hz)
+ANALYSIS_WINDOW = 5  # s of Lead II analysed, enough for several RR intervals
+CLIENT_QUEUE = 250  # messages buffered per client (~10 s of samples)
+SEND_TIMEOUT = 5.0  # s a client may block a send before it is dropped
+
+log = logs.get_logger("acquisition_service")
+
+SAMPLES_RECEIVED = perf_metrics.counter("ecg_samples_received_total", "Device frames stored in the lead buffers")
+SAMPLES_DROPPED = perf_metrics.counter("ecg_samples_dropped_total", "Device frames read but not stored")
+PARSE_ERRORS = perf_metrics.counter("ecg_parse_errors_total", "Device lines that were not 8 integers")
+SERIAL_BYTES = perf_metrics.counter("ecg_serial_bytes_total", "Bytes read from the device")
+ANALYSIS_SECONDS = perf_metrics.summary("ecg_analysis_seconds", "Lead II fiducials, metrics and arrhythmia check per batch")
+CLIENTS = perf_metrics.gauge("ecg_service_clients", "Clients attached to the acquisition service")
+MESSAGES_DROPPED = perf_metrics.counter("ecg_service_messages_dropped_total",
+                                        "Service messages dropped because a client fell behind")
+
+
+def service_socket():
+    """Socket path from ECG_SERVICE_SOCKET, or the default one."""
+    return os.environ.get(SOCKET_ENV) or DEFAULT_SOCKET
+
+
+def service_running(socket_path=None):
+    """True if an acquisition service accepts connections on socket_path."""
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(socket_path or service_socket())
+    except OSError:
+        return False
+    finally:
+        probe.close()
+    return True
+
+
+def parse_frame(line):
+    """
+    Channel values of one device line (DEVICE_CHANNELS order).
+    Raises:
+        ValueError: if the line is not len(DEVICE_CHANNELS) integers
+    """
+    values = [int(x) for x in line.split()]
+    if len(values) != len(DEVICE_CHANNELS):
+        raise ValueError(f"expected {len(DEVICE_CHANNELS)} values, got {len(values)}")
+    return values
+
+
+def derive_leads(values):
+    """
+    All 12 leads of one frame: the 8 measured channels plus III, aVR, aVL
+    and aVF derived from I and II.
+    Returns:
+        dict: lead name -> value
+    """
+    lead_data = dict(zip(DEVICE_CHANNELS, values))
+    lead1, lead2 = lead_data["I"], lead_data["II"]
+    lead3 = lead2 - lead1
+    lead_data["III"] = lead3
+    lead_data["aVR"] = - (lead1 + lead2) / 2
+    lead_data["aVL"] = (lead1 - lead3) / 2
+    lead_data["aVF"] = (lead2 + lead3) / 2
+    return lead_data
+
+
+def measure_lead_ii(signal, fs=DEFAULT_FS):
+    """
+    Median intervals and rhythm of a few seconds of Lead II, measured like
+    the report (Pan-Tompkins R peaks, detect_pqrst, pqrst_intervals).
+    Returns:
+        (metrics dict in ms/bpm, rhythm label, detect_pqrst peaks)
+    """
+    signal = np.asarray(signal, dtype=float)
+    signal = signal - signal.mean()
+    peaks = detect_pqrst(signal, fs=fs, r_peaks=snap_to_peak(signal, pan_tompkins(signal, fs=fs), fs=fs))
+    measured = pqrst_intervals(peaks, fs=fs)
+    rr = np.diff(peaks["R"]) / fs if len(peaks["R"]) > 1 else None
+    rhythm = detect_arrhythmia(measured["HR"], measured["QRS"], rr)
+    metrics = {k: measured[k] for k in ("HR", "PR", "QRS", "QT", "QTc", "ST")}
+    metrics["QRS_axis"] = "--"
+    return metrics, rhythm, peaks
+
+
+def _encode(message):
+    return (json.dumps(message, default=float) + "\n").encode()
+
+
+class _Client:
+    """One attached viewer: a bounded queue of encoded messages and the thread sending them."""
+    def __init__(self, sock, on_close):
+        self.sock = sock
+        self.sock.settimeout(SEND_TIMEOUT)
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=CLIENT_QUEUE)
+        self._on_close = on_close
+        threading.Thread(target=self._run, name="service-client", daemon=True).start()
+
+    def send(self, data):
+        try:
+            self._queue.put_nowait(data)
+        except queue.Full:
+            self.dropped += 1
+            MESSAGES_DROPPED.inc()
+
+    def close(self):
+        """Send what is queued, then hang up."""
+        try:
+            self._queue.put(None, timeout=SEND_TIMEOUT)
+        except queue.Full:  # not reading: hang up now
+            self.sock.close()
+
+    def _run(self):
+        try:
+            while True:
+                data = self._queue.get()
+                if data is None:
+                    break
+                self.sock.sendall(data)
+        except OSError as e:
+            log.info("Dropping service client: %s", e)
+        finally:
+            try:
+                self.sock.close()
+            except OSError:
+                pass
+            self._on_close(self)
+
+
+class AcquisitionService:
+    """
+    Reads a device, records and analyses it, and publishes everything on a Unix socket.
+    Args:
+        ser: An open serial.Serial (or ecg.synthetic.SimulatedSerial)
+        socket_path: Where clients connect
+        fs: Sampling rate of the device
+        patient_id: Stored in the session header
+        record: Stream the acquisition to a session file
+        recording: ECGRecording to use (a default one if None)
+        measurements: Log the Lead II metrics to a MeasurementLog (or pass one)
+    """
+    def __init__(self, ser, socket_path=None, fs=DEFAULT_FS, patient_id="", record=True, recording=None,
+                 measurements=True):
+        self.ser = ser
+        self.socket_path = socket_path or service_socket()
+        self.fs = fs
+        self.patient_id = patient_id
+        self.leads = list(STANDARD_LEADS)
+        self.recording = (recording or ECGRecording()) if record else None
+        if measurements is True:
+            measurements = MeasurementLog()
+        self.metrics_log = measurements or None
+        self.sample_index = 0
+        self.last_metrics = None  # last metrics message
+        self._lead_ii = collections.deque(maxlen=int(ANALYSIS_WINDOW * fs))
+        self._analysed = 0  # sample_index of the last analysis
+        self._clients = []
+        self._clients_lock = threading.Lock()
+        self._server = None
+        self._threads = []
+        self._stopped = threading.Event()
+
+    # --- Lifecycle ---
+    def start(self):
+        """Open the socket, start the device and the acquisition and accept threads."""
+        self._server = self._listen()
+        if self.recording is not None:
+            self.recording.start_recording(self.leads, fs=self.fs, patient_id=self.patient_id)
+        self.ser.reset_input_buffer()
+        self.ser.write(b'1\r\n')
+        for target, name in ((self._acquire, "acquisition"), (self._accept, "service-accept")):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        log.info("Acquisition service listening on %s", self.socket_path,
+                 extra={"fields": {"session": self.recording.session_path if self.recording else None}})
+
+    def stop(self):
+        """Stop the device, close the session and say goodbye to the clients (safe to call twice)."""
+        if self._stopped.is_set() or self._server is None:
+            return
+        self._stopped.set()
+        for thread in self._threads:
+            if thread is not threading.current_thread():
+                thread.join()
+        try:
+            self.ser.write(b'0\r\n')
+            self.ser.close()
+        except Exception as e:
+            log.warning("Could not stop the device: %s", e)
+        if self.recording is not None:
+            self.recording.stop_recording()
+        if self.metrics_log is not None:
+            self.metrics_log.close()
+        self._broadcast(_encode({"type": "bye"}))
+        with self._clients_lock:
+            clients = list(self._clients)
+        for client in clients:
+            client.close()
+        self._server.close()
+        try:
+            os.unlink(self.socket_path)
+        except OSError:
+            pass
+        log.info("Acquisition service stopped after %d samples", self.sample_index)
+
+    def wait(self, timeout=None):
+        """Block until stop() (or a device failure); returns True if stopped."""
+        return self._stopped.wait(timeout)
+
+    @property
+    def client_count(self):
+        with self._clients_lock:
+            return len(self._clients)
+
+    # --- Socket ---
+    def _listen(self):
+        if os.path.exists(self.socket_path):
+            if service_running(self.socket_path):
+                raise RuntimeError(f"An acquisition service is already running on {self.socket_path}")
+            os.unlink(self.socket_path)  # left behind by a service that did not stop cleanly
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(self.socket_path)
+        os.chmod(self.socket_path, 0o600)  # patient data: this user only
+        server.listen()
+        server.settimeout(0.5)  # so the accept thread sees stop()
+        return server
+
+    def _accept(self):
+        while not self._stopped.is_set():
+            try:
+                sock, _ = self._server.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            client = _Client(sock, self._client_closed)
+            # Under the lock, so that every batch past "sample" reaches the new client
+            with self._clients_lock:
+                client.send(_encode({
+                    "type": "hello", "leads": self.leads, "fs": self.fs, "gain": DEFAULT_GAIN,
+                    "session": self.recording.session_path if self.recording else None, "sample": self.sample_index,
+                }))
+                if self.last_metrics is not None:
+                    client.send(self.last_metrics)
+                self._clients.append(client)
+                CLIENTS.set(len(self._clients))
+
+    def _client_closed(self, client):
+        with self._clients_lock:
+            if client in self._clients:
+                self._clients.remove(client)
+            CLIENTS.set(len(self._clients))
+
+    def _broadcast(self, data):
+        with self._clients_lock:
+            clients = list(self._clients)
+        for client in clients:
+            client.send(data)
+
+    # --- Acquisition ---
+    def _acquire(self):
+        batch = []
+        batch_start = self.sample_index
+        while not self._stopped.is_set():
+            try:
+                line = self.ser.readline()
+            except Exception as e:  # device unplugged
+                log.error("Serial read error, stopping the service: %s", e)
+                threading.Thread(target=self.stop, name="service-stop", daemon=True).start()
+                break
+            SERIAL_BYTES.inc(len(line))
+            line_data = line.decode('utf-8', errors='replace').strip()
+            if not line_data:
+                continue
+            logs.record_raw(line_data)
+            try:
+                lead_data = derive_leads(parse_frame(line_data))
+            except ValueError as e:
+                PARSE_ERRORS.inc()
+                SAMPLES_DROPPED.inc()
+                log.warning("Error parsing ECG data: %s", e, extra={"fields": {"line": line_data}})
+                continue
+            frame = [lead_data[lead] for lead in self.leads]
+            if self.recording is not None:
+                self.recording.add_sample(frame)
+            self._lead_ii.append(lead_data["II"])
+            batch.append(frame)
+            self.sample_index += 1
+            SAMPLES_RECEIVED.inc()
+            if len(batch) >= BATCH_FRAMES:
+                self._broadcast(_encode({"type": "samples", "start": batch_start, "data": list(zip(*batch))}))
+                batch = []
+                batch_start = self.sample_index
+            if self.sample_index - self._analysed >= self.fs:
+                self._analyse()
+
+    def _analyse(self):
+        """Median Lead II intervals and rhythm over the last ANALYSIS_WINDOW seconds, measured like the report."""
+        self._analysed = self.sample_index
+        if len(self._lead_ii) < self._lead_ii.maxlen:
+            return
+        try:
+            with ANALYSIS_SECONDS.time():
+                metrics, rhythm, peaks = measure_lead_ii(self._lead_ii, fs=self.fs)
+        except Exception as e:
+            log.warning("ECG analysis error: %s", e)
+            return
+        r_peaks = peaks["R"]
+        beat_age = (len(self._lead_ii) - 1 - r_peaks[-1]) / self.fs if len(r_peaks) > 0 else None
+        if self.recording is not None:
+            self.recording.update_metrics(metrics)
+            self.recording.mark_rhythm(rhythm)
+        if self.metrics_log is not None:
+            self.metrics_log.append(dict(metrics, lead="II", sample=self.sample_index, rhythm=rhythm))
+        self.last_metrics = _encode({"type": "metrics", "sample": self.sample_index, "metrics": metrics,
+                                     "rhythm": rhythm, "beat_age": beat_age})
+        self._broadcast(self.last_metrics)
+
+
+class ServiceClient:
+    """
+    Connection to an AcquisitionService, read by a background thread.
+    drain() hands over the sample batches received since the last call.
+    Args:
+        socket_path: The service's socket (service_socket() if None)
+        max_batches: Batches kept while nobody drains; older ones are dropped
+    Raises:
+        OSError: if no service is listening there
+    """
+    def __init__(self, socket_path=None, max_batches=1500):
+        self.socket_path = socket_path or service_socket()
+        self.hello = None
+        self.metrics = None  # last metrics message
+        self.samples_missed = 0  # frames lost to a slow client (dropped batches)
+        self.connected = True
+        self._batches = collections.deque(maxlen=max_batches)
+        self._next = None
+        self._new_metrics = None
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.connect(self.socket_path)
+        threading.Thread(target=self._run, name="service-reader", daemon=True).start()
+
+    @property
+    def leads(self):
+        return self.hello["leads"] if self.hello else []
+
+    @property
+    def fs(self):
+        return self.hello["fs"] if self.hello else DEFAULT_FS
+
+    def drain(self):
+        """
+        Sample batches received since the last call, oldest first.
+        Returns:
+            list of (start sample, [values per lead])
+        """
+        batches = []
+        while self._batches:
+            batches.append(self._batches.popleft())
+        return batches
+
+    def take_metrics(self):
+        """The metrics message received since the last call, or None."""
+        message, self._new_metrics = self._new_metrics, None
+        return message
+
+    def close(self):
+        """Detach; the service (and its recording) carries on."""
+        try:
+            self._sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._sock.close()
+
+    def _run(self):
+        try:
+            with self._sock.makefile("rb") as f:
+                for line in f:
+                    self._handle(json.loads(line))
+        except (OSError, ValueError) as e:
+            if self.connected:
+                log.info("Service connection closed: %s", e)
+        finally:
+            self.connected = False
+
+    def _handle(self, message):
+        kind = message.get("type")
+        if kind == "samples":
+            start, data = message["start"], message["data"]
+            if self._next is not None and start > self._next:
+                self.samples_missed += start - self._next
+            self._next = start + len(data[0])
+            if len(self._batches) == self._batches.maxlen:
+                self.samples_missed += len(self._batches[0][1][0])
+            self._batches.append((start, data))
+        elif kind == "metrics":
+            self.metrics = self._new_metrics = message
+        elif kind == "hello":
+            self.hello = message
+            self._next = message["sample"]
+        elif kind == "bye":
+            self.connected = False
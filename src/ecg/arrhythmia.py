@@ -0,0 +1,68 @@
+import numpy as np
+
+
+def detect_arrhythmia(heart_rate, qrs_duration, rr_intervals, pr_interval=None, p_peaks=None, r_peaks=None, ecg_signal=None):
+    """
+    Expanded arrhythmia detection logic for common clinical arrhythmias.
+    - Sinus Bradycardia: HR < 60, regular RR
+    - Sinus Tachycardia: HR > 100, regular RR
+    - Atrial Fibrillation: Irregular RR, absent/irregular P waves
+    - Atrial Flutter: Sawtooth P pattern (not robustly detected here)
+    - PAC: Early P, narrow QRS, compensatory pause (approximate)
+    - PVC: Early wide QRS, no P, compensatory pause (approximate)
+    - VT: HR > 100, wide QRS (>120ms), regular
+    - VF: Chaotic, no clear QRS, highly irregular
+    - Asystole: Flatline (very low amplitude, no R)
+    - SVT: HR > 150, narrow QRS, regular
+    - Heart Block: PR > 200 (1°), dropped QRS (2°), AV dissociation (3°)
+    """
+    try:
+        if rr_intervals is None or len(rr_intervals) < 2:
+            return "Detecting..."
+        rr_std = np.std(rr_intervals)
+        rr_mean = np.mean(rr_intervals)
+        rr_reg = rr_std < 0.12  # Regular if std < 120ms
+        # Asystole: flatline (no R peaks, or very low amplitude)
+        if r_peaks is not None and len(r_peaks) < 1:
+            if ecg_signal is not None and np.ptp(ecg_signal) < 50:
+                return "Asystole (Flatline)"
+            return "No QRS Detected"
+        # VF: highly irregular, no clear QRS, rapid undulating
+        if r_peaks is not None and len(r_peaks) > 5:
+            if rr_std > 0.25 and np.ptp(ecg_signal) > 100 and heart_rate and heart_rate > 180:
+                return "Ventricular Fibrillation (VF)"
+        # VT: HR > 100, wide QRS (>120ms), regular
+        if heart_rate and heart_rate > 100 and qrs_duration and qrs_duration > 120 and rr_reg:
+            return "Ventricular Tachycardia (VT)"
+        # Sinus Bradycardia: HR < 60, regular
+        if heart_rate and heart_rate < 60 and rr_reg:
+            return "Sinus Bradycardia"
+        # Sinus Tachycardia: HR > 100, regular
+        if heart_rate and heart_rate > 100 and qrs_duration and qrs_duration <= 120 and rr_reg:
+            return "Sinus Tachycardia"
+        # SVT: HR > 150, narrow QRS, regular
+        if heart_rate and heart_rate > 150 and qrs_duration and qrs_duration <= 120 and rr_reg:
+            return "Supraventricular Tachycardia (SVT)"
+        # AFib: Irregular RR, absent/irregular P
+        if not rr_reg and (p_peaks is None or len(p_peaks) < len(r_peaks) * 0.5):
+            return "Atrial Fibrillation (AFib)"
+        # Atrial Flutter: (not robust, but if HR ~150, regular, and P waves rapid)
+        if heart_rate and 140 < heart_rate < 170 and rr_reg and p_peaks is not None and len(p_peaks) > len(r_peaks):
+            return "Atrial Flutter (suggestive)"
+        # PAC: Early P, narrow QRS, compensatory pause (approximate)
+        if p_peaks is not None and r_peaks is not None and len(p_peaks) > 1 and len(r_peaks) > 1:
+            pr_diffs = np.diff([r - p for p, r in zip(p_peaks, r_peaks)])
+            if np.any(pr_diffs < -0.15 * len(ecg_signal)) and qrs_duration and qrs_duration <= 120:
+                return "Premature Atrial Contraction (PAC)"
+        # PVC: Early wide QRS, no P, compensatory pause (approximate)
+        if qrs_duration and qrs_duration > 120 and (p_peaks is None or len(p_peaks) < len(r_peaks) * 0.5):
+            return "Premature Ventricular Contraction (PVC)"
+        # Heart Block: PR > 200ms (1°), dropped QRS (2°), AV dissociation (3°)
+        if pr_interval and pr_interval > 200:
+            return "Heart Block (1° AV)"
+        # If QRS complexes are missing (dropped beats)
+        if r_peaks is not None and len(r_peaks) < len(ecg_signal) / 500 * heart_rate * 0.7:
+            return "Heart Block (2°/3° AV, dropped QRS)"
+        return "None Detected"
+    except Exception as e:
+        return "Detecting..."
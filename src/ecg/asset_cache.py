@@ -0,0 +1,149 @@
+import os
+import sys
+import json
+import hashlib
+import tempfile
+import threading
+import numpy as np
+
+# --- Report asset cache ---
+# Rendered report assets (strip PNGs, ...) stored under a hash of the data
+# they show plus every parameter that affects the pixels. Re-running a
+# report for the same session, or a batch over sessions already reported,
+# reuses the files instead of rasterizing again. Files live in a per-user
+# cache directory; when it grows past max_bytes the least recently used
+# files are deleted (a hit refreshes the file's mtime).
+
+APP_NAME = "modularecg"
+CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+
+def cache_dir():
+    """Per-user cache directory for report assets."""
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), "AppData", "Local")
+    elif sys.platform == "darwin":
+        base = os.path.join(os.path.expanduser("~"), "Library", "Caches")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, APP_NAME, "report_assets")
+
+
+def asset_key(data, **params):
+    """Hex digest of an array's contents (dtype, shape, bytes) and the render parameters."""
+    data = np.ascontiguousarray(data)
+    h = hashlib.sha256()
+    h.update(f"{data.dtype.str}{data.shape}".encode())
+    h.update(data.tobytes())
+    h.update(json.dumps(params, sort_keys=True, default=str).encode())
+    return h.hexdigest()
+
+
+class AssetCache:
+    """
+    Content-addressed file cache with size-based LRU eviction.
+    Safe to share between threads and between processes (batch workers):
+    files are written to a temp name and renamed into place.
+    Args:
+        directory: Cache directory (default: cache_dir())
+        max_bytes: Total size kept after eviction
+    """
+    def __init__(self, directory=None, max_bytes=CACHE_MAX_BYTES):
+        self.directory = directory or cache_dir()
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+        self._size = sum(size for _, size, _ in self._entries())
+
+    def _entries(self):
+        """(path, size, mtime) of every cached file."""
+        out = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and not entry.name.startswith("."):
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                out.append((entry.path, st.st_size, st.st_mtime))
+        return out
+
+    def path(self, key, suffix=".png"):
+        return os.path.join(self.directory, key + suffix)
+
+    def get(self, key, suffix=".png"):
+        """Path of a cached asset (marked as recently used), or None."""
+        path = self.path(key, suffix)
+        try:
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return path
+
+    def fetch(self, key, render, suffix=".png"):
+        """
+        Cached asset for key, rendering it on a miss.
+        Args:
+            render: callback(path) that writes the asset to path
+        Returns:
+            path of the cached file
+        """
+        path = self.get(key, suffix)
+        if path:
+            return path
+        fd, tmp = tempfile.mkstemp(prefix=".", suffix=suffix, dir=self.directory)
+        os.close(fd)
+        try:
+            render(tmp)
+            size = os.path.getsize(tmp)
+            os.replace(tmp, self.path(key, suffix))
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        with self._lock:
+            self._size += size
+            over = self._size > self.max_bytes
+        if over:
+            self.evict()
+        return self.path(key, suffix)
+
+    def evict(self):
+        """Delete least recently used files until the cache is under max_bytes."""
+        with self._lock:
+            entries = sorted(self._entries(), key=lambda e: e[2])
+            total = sum(size for _, size, _ in entries)
+            for path, size, _ in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    pass
+            self._size = total
+
+    def clear(self):
+        with self._lock:
+            for path, _, _ in self._entries():
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self._size = 0
+
+
+_default = None
+
+
+def default_cache():
+    """Process-wide report asset cache in the user's cache directory, opened on first use."""
+    global _default
+    if _default is None:
+        _default = AssetCache()
+    return _default
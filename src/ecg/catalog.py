@@ -0,0 +1,231 @@
+import os
+import time
+import sqlite3
+import datetime
+import threading
+from ecg.session_store import SessionReader, RECORDINGS_DIR, SESSION_EXT
+from ecg.session_index import SessionIndex, index_path, EVENT_ARRHYTHMIA
+from ecg.journal import journal_path
+from utils.logs import get_logger
+
+log = get_logger("catalog")
+
+# --- Session catalog (recordings/catalog.db) ---
+# sessions     one row per recorded session: patient, start/end time, fs, file
+# metrics      summary measurements per session (HR, PR, QRS, QT, QTc, axis, ST)
+# arrhythmias  one row per distinct arrhythmia label seen in a session
+#
+# Every screen that needs "past tests" asks the catalog instead of opening
+# session files; the indexes below keep the common queries (last ECG for a
+# patient, sessions in a date range, QTc above a threshold, by label) to an
+# index lookup.
+
+CATALOG_NAME = "catalog.db"
+
+METRIC_COLUMNS = {
+    "HR": "heart_rate",
+    "PR": "pr",
+    "QRS": "qrs",
+    "QT": "qt",
+    "QTc": "qtc",
+    "QRS_axis": "qrs_axis",
+    "ST": "st",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    patient_id TEXT NOT NULL DEFAULT '',
+    start_time REAL NOT NULL,
+    end_time REAL NOT NULL,
+    fs REAL NOT NULL,
+    n_leads INTEGER NOT NULL,
+    n_samples INTEGER NOT NULL,
+    path TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_patient_start ON sessions (patient_id, start_time);
+CREATE INDEX IF NOT EXISTS sessions_start ON sessions (start_time);
+
+CREATE TABLE IF NOT EXISTS metrics (
+    session_id TEXT PRIMARY KEY REFERENCES sessions (session_id) ON DELETE CASCADE,
+    heart_rate REAL, pr REAL, qrs REAL, qt REAL, qtc REAL, qrs_axis REAL, st REAL
+);
+CREATE INDEX IF NOT EXISTS metrics_qtc ON metrics (qtc);
+CREATE INDEX IF NOT EXISTS metrics_heart_rate ON metrics (heart_rate);
+
+CREATE TABLE IF NOT EXISTS arrhythmias (
+    session_id TEXT NOT NULL REFERENCES sessions (session_id) ON DELETE CASCADE,
+    label TEXT NOT NULL,
+    PRIMARY KEY (session_id, label)
+);
+CREATE INDEX IF NOT EXISTS arrhythmias_label ON arrhythmias (label, session_id);
+"""
+
+
+def catalog_path(directory=RECORDINGS_DIR):
+    return os.path.join(directory, CATALOG_NAME)
+
+
+def _number(value):
+    """Metric value as a float, or None for placeholders like '--'."""
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class SessionCatalog:
+    """
+    SQLite catalog of recorded sessions and their summary metrics.
+    One connection is shared by all threads and serialized with a lock;
+    every call is a single short transaction.
+    """
+    def __init__(self, path=None):
+        self.path = path or catalog_path()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA foreign_keys=ON")
+        self._db.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def _execute(self, sql, params=()):
+        with self._lock, self._db:
+            return self._db.execute(sql, params).fetchall()
+
+    # --- Writing ---
+    def add_session(self, session_id, path, start_time, end_time, fs, n_leads, n_samples, patient_id="",
+                    metrics=None, arrhythmias=()):
+        """Insert or replace one session with its metrics and arrhythmia labels."""
+        metric_values = [_number((metrics or {}).get(key)) for key in METRIC_COLUMNS]
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO sessions VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (session_id, patient_id or "", start_time, end_time, fs, n_leads, n_samples, os.path.abspath(path)))
+            self._db.execute("DELETE FROM metrics WHERE session_id = ?", (session_id,))
+            self._db.execute("DELETE FROM arrhythmias WHERE session_id = ?", (session_id,))
+            if metrics:
+                self._db.execute(f"INSERT INTO metrics VALUES (?, {', '.join('?' * len(METRIC_COLUMNS))})",
+                                 [session_id] + metric_values)
+            self._db.executemany("INSERT OR IGNORE INTO arrhythmias VALUES (?, ?)",
+                                 [(session_id, label) for label in set(arrhythmias) if label])
+
+    def add_session_file(self, session_path, metrics=None, index=None):
+        """Catalog a session file, reading only its header and chunk table."""
+        reader = SessionReader(session_path, table=index.chunks if index is not None else None)
+        try:
+            if index is None and os.path.exists(index_path(session_path)):
+                index = SessionIndex.load(index_path(session_path))
+            table = reader.chunk_table()
+            start = float(table["t_start"][0]) if len(table) else reader.start_time
+            end = float(table["t_end"][-1]) if len(table) else reader.start_time
+            labels = [ev["label"] for ev in index.events if ev["kind"] == EVENT_ARRHYTHMIA] if index else []
+            self.add_session(reader.session_id, session_path, start, end, reader.fs, len(reader.leads),
+                             reader.n_samples, reader.patient_id, metrics, labels)
+            return reader.session_id
+        finally:
+            reader.close()
+
+    def remove_session(self, session_id):
+        self._execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def scan(self, directory=RECORDINGS_DIR):
+        """
+        Catalog session files not known yet (one-off import of older
+        recordings). Sessions that still have a journal are skipped: they are
+        being recorded, or are left for recover_journals().
+        """
+        if not os.path.isdir(directory):
+            return []
+        known = {row["path"] for row in self._execute("SELECT path FROM sessions")}
+        added = []
+        for name in sorted(os.listdir(directory)):
+            path = os.path.abspath(os.path.join(directory, name))
+            if name.endswith(SESSION_EXT) and path not in known and not os.path.exists(journal_path(path)):
+                try:
+                    added.append(self.add_session_file(path))
+                except Exception as e:
+                    log.warning("Could not catalog %s: %s", path, e)
+        return added
+
+    # --- Queries ---
+    def find_sessions(self, patient_id=None, start=None, end=None, min_qtc=None, max_qtc=None,
+                      arrhythmia=None, limit=None, newest_first=True):
+        """
+        Sessions (with their metrics) matching all given filters.
+        Args:
+            start, end: Session start time bounds, seconds since the epoch
+            min_qtc, max_qtc: QTc bounds in ms
+            arrhythmia: Only sessions with this arrhythmia label
+        Returns:
+            list of dicts with the session columns plus HR/PR/QRS/QT/QTc/QRS_axis/ST
+        """
+        where, params = [], []
+        if patient_id is not None:
+            where.append("s.patient_id = ?")
+            params.append(patient_id)
+        if start is not None:
+            where.append("s.start_time >= ?")
+            params.append(start)
+        if end is not None:
+            where.append("s.start_time < ?")
+            params.append(end)
+        if min_qtc is not None:
+            where.append("m.qtc > ?")
+            params.append(min_qtc)
+        if max_qtc is not None:
+            where.append("m.qtc < ?")
+            params.append(max_qtc)
+        if arrhythmia is not None:
+            where.append("s.session_id IN (SELECT session_id FROM arrhythmias WHERE label = ?)")
+            params.append(arrhythmia)
+        columns = ", ".join(f"m.{col} AS {key}" for key, col in METRIC_COLUMNS.items())
+        sql = f"SELECT s.*, {columns} FROM sessions s LEFT JOIN metrics m USING (session_id)"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY s.start_time " + ("DESC" if newest_first else "ASC")
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        return [dict(row) for row in self._execute(sql, params)]
+
+    def last_session(self, patient_id=None):
+        """Most recent session (optionally for one patient), or None."""
+        rows = self.find_sessions(patient_id=patient_id, limit=1)
+        return rows[0] if rows else None
+
+    def arrhythmias(self, session_id):
+        return [row["label"] for row in self._execute(
+            "SELECT label FROM arrhythmias WHERE session_id = ? ORDER BY label", (session_id,))]
+
+    def session_dates(self, start, end, patient_id=None):
+        """Local dates (datetime.date) with at least one session starting in [start, end)."""
+        sql = "SELECT DISTINCT date(start_time, 'unixepoch', 'localtime') AS day FROM sessions " \
+              "WHERE start_time >= ? AND start_time < ?"
+        params = [start, end]
+        if patient_id is not None:
+            sql += " AND patient_id = ?"
+            params.append(patient_id)
+        return [datetime.date.fromisoformat(row["day"]) for row in self._execute(sql, params)]
+
+
+def month_range(year, month):
+    """(start, end) epoch seconds of a local calendar month."""
+    start = datetime.datetime(year, month, 1)
+    end = datetime.datetime(year + month // 12, month % 12 + 1, 1)
+    return time.mktime(start.timetuple()), time.mktime(end.timetuple())
+
+
+_default = None
+
+
+def default_catalog():
+    """Process-wide catalog at recordings/catalog.db, opened on first use."""
+    global _default
+    if _default is None:
+        _default = SessionCatalog()
+    return _default
@@ -0,0 +1,121 @@
+import numpy as np
+from scipy.signal import find_peaks
+
+
+def snap_to_peak(ecg_signal, approx, fs=500, radius=0.08):
+    """Move approximate R positions (e.g. from pan_tompkins) to the signal maximum nearby."""
+    half = int(radius * fs)
+    snapped = []
+    for a in approx:
+        lo, hi = max(0, int(a) - half), min(len(ecg_signal), int(a) + half + 1)
+        if hi > lo:
+            idx = int(np.argmax(ecg_signal[lo:hi]) + lo)
+            if not snapped or idx - snapped[-1] >= int(0.2 * fs):
+                snapped.append(idx)
+    return np.array(snapped, dtype=int)
+
+
+def detect_pqrst(ecg_signal, fs=500, r_peaks=None):
+    """
+    Locate P, Q, R, S and T fiducial points beat by beat.
+    Args:
+        ecg_signal: 1D numpy array (baseline-centred works best)
+        fs: Sampling frequency (Hz)
+        r_peaks: Optional R positions from a QRS detector; by default R is
+            the prominent local maximum
+    Returns:
+        dict with lists of sample indices for 'P', 'Q', 'R', 'S', 'T'
+    """
+    ecg_signal = np.asarray(ecg_signal, dtype=float)
+    std = np.std(ecg_signal)
+    # R peak detection
+    if r_peaks is None:
+        r_peaks, _ = find_peaks(ecg_signal, distance=int(0.2 * fs), prominence=0.6 * std)
+    # Q and S: local minima before and after R
+    q_peaks = []
+    s_peaks = []
+    for r in r_peaks:
+        q_start = max(0, r - int(0.06 * fs))
+        if r > q_start:
+            q_peaks.append(int(np.argmin(ecg_signal[q_start:r]) + q_start))
+        s_end = min(len(ecg_signal), r + int(0.06 * fs))
+        if s_end > r:
+            s_peaks.append(int(np.argmin(ecg_signal[r:s_end]) + r))
+    # P: positive peak before Q (within 0.08-0.2 s)
+    p_peaks = []
+    for q in q_peaks:
+        p_start = max(0, q - int(0.2 * fs))
+        p_end = q - int(0.08 * fs)
+        if p_end > p_start:
+            p_candidates, _ = find_peaks(ecg_signal[p_start:p_end], prominence=0.1 * std)
+            if len(p_candidates) > 0:
+                p_peaks.append(int(p_start + p_candidates[-1]))
+    # T: largest positive peak after S (within 0.08-0.4 s)
+    t_peaks = []
+    for s in s_peaks:
+        t_start = s + int(0.08 * fs)
+        t_end = min(len(ecg_signal), s + int(0.4 * fs))
+        if t_end > t_start:
+            t_candidates, _ = find_peaks(ecg_signal[t_start:t_end], prominence=0.1 * std)
+            if len(t_candidates) > 0:
+                t_peaks.append(int(t_start + t_candidates[np.argmax(ecg_signal[t_start + t_candidates])]))
+    return {'P': p_peaks, 'Q': q_peaks, 'R': [int(r) for r in r_peaks], 'S': s_peaks, 'T': t_peaks}
+
+
+def _paired(starts, ends, max_gap):
+    """Durations end - start for each start matched with the first end after it."""
+    ends = np.asarray(ends)
+    out = []
+    for a in starts:
+        later = ends[(ends > a) & (ends - a <= max_gap)]
+        if len(later):
+            out.append(later[0] - a)
+    return out
+
+
+def pqrst_intervals(peaks, fs=500):
+    """
+    Median intervals over all beats of a detect_pqrst result.
+    Returns:
+        dict with HR (bpm) and PR, QRS, QT, QTc (Bazett), ST in ms; None where
+        there were not enough fiducials
+    """
+    def median_ms(values):
+        return float(np.median(values)) * 1000 / fs if len(values) else None
+
+    r = peaks['R']
+    heart_rate = 60.0 * fs / float(np.mean(np.diff(r))) if len(r) > 1 else None
+    pr = median_ms(_paired(peaks['P'], r, int(0.3 * fs)))
+    qrs = median_ms(_paired(peaks['Q'], peaks['S'], int(0.2 * fs)))
+    qt = median_ms(_paired(peaks['Q'], peaks['T'], int(0.6 * fs)))
+    st = median_ms(_paired(peaks['S'], peaks['T'], int(0.5 * fs)))
+    qtc = float(qt / np.sqrt(60.0 / heart_rate)) if qt and heart_rate else None
+    return {'HR': heart_rate, 'PR': pr, 'QRS': qrs, 'QT': qt, 'QTc': qtc, 'ST': st}
+
+
+def last_beat_intervals(peaks, fs=500):
+    """
+    Live-view measurements from a short window (the 12-lead page's detailed
+    view): heart rate from the mean RR, PR, QRS and QT from the most recent
+    fiducials.
+    Returns:
+        dict with HR (bpm), PR, QRS, QT, QTc (Bazett) in ms and RR (array of
+        RR intervals in s); None where there were not enough fiducials
+    """
+    p_peaks, q_peaks, r_peaks, s_peaks, t_peaks = (peaks[k] for k in 'PQRST')
+    heart_rate = pr_interval = qrs_duration = qt_interval = qtc_interval = rr_intervals = None
+    if len(r_peaks) > 1:
+        rr_intervals = np.diff(r_peaks) / fs  # in seconds
+        mean_rr = np.mean(rr_intervals)
+        if mean_rr > 0:
+            heart_rate = 60.0 / mean_rr
+    if len(p_peaks) > 0 and len(r_peaks) > 0:
+        pr_interval = (r_peaks[-1] - p_peaks[-1]) * 1000 / fs
+    if len(q_peaks) > 0 and len(s_peaks) > 0:
+        qrs_duration = (s_peaks[-1] - q_peaks[-1]) * 1000 / fs
+    if len(q_peaks) > 0 and len(t_peaks) > 0:
+        qt_interval = (t_peaks[-1] - q_peaks[-1]) * 1000 / fs
+    if qt_interval and heart_rate:
+        qtc_interval = qt_interval / np.sqrt(60.0 / heart_rate)  # Bazett's formula
+    return {'HR': heart_rate, 'PR': pr_interval, 'QRS': qrs_duration, 'QT': qt_interval, 'QTc': qtc_interval,
+            'RR': rr_intervals}
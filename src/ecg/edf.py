@@ -0,0 +1,289 @@
+import os
+import datetime
+import numpy as np
+from ecg.session_store import SessionWriter, INT16_MIN, INT16_MAX
+from ecg.session_index import SessionIndex, index_path, EVENT_ANNOTATION, EVENT_ARRHYTHMIA, EVENT_BEAT
+
+# --- EDF / EDF+ (https://www.edfplus.info/specs) ---
+# 256 byte fixed header + 256 bytes per signal, then data records. Every
+# record holds `samples per record` int16 values for each signal in turn.
+# EDF+ adds an "EDF Annotations" signal carrying time-stamped annotation
+# lists (TALs); the first TAL of each record is its start time.
+#
+# Records are 1 s long, so the writer only ever holds one record in memory.
+
+ANNOTATION_LABEL = "EDF Annotations"
+RECORD_SECONDS = 1
+DEFAULT_ANNOTATION_SAMPLES = 128  # 256 bytes of TALs per record
+
+
+def _field(value, width):
+    text = str(value)
+    if len(text) > width:
+        raise ValueError(f"EDF header field {text!r} longer than {width} characters")
+    return text.ljust(width).encode("ascii")
+
+
+def _number(value, width=8):
+    """Shortest representation of a number that fits an EDF header field."""
+    for digits in range(8, 0, -1):
+        text = f"{value:.{digits}g}"
+        if len(text) <= width:
+            return _field(text, width)
+    raise ValueError(f"Cannot fit {value} into {width} characters")
+
+
+def _tal(onset, text="", duration=None):
+    head = f"{onset:+.3f}".rstrip("0").rstrip(".")
+    if duration:
+        head += f"\x15{duration:.3f}".rstrip("0").rstrip(".")
+    return (head + "\x14" + text + "\x14\x00").encode("utf-8")
+
+
+class EDFWriter:
+    """
+    Streaming EDF / EDF+ writer.
+    Args:
+        path: Output .edf file
+        leads: Signal labels
+        fs: Sampling frequency; must be a whole number of samples per record
+        gain: ADC counts per mV (used for the physical range)
+        annotations: Optional list of (onset s, duration s, text); only
+            written for EDF+ (plus=True)
+    """
+    def __init__(self, path, leads, fs, gain=1.0, start_time=None, patient_id="", recording_id="",
+                 plus=True, annotations=None, annotation_samples=DEFAULT_ANNOTATION_SAMPLES):
+        if int(fs * RECORD_SECONDS) != fs * RECORD_SECONDS:
+            raise ValueError("EDF export needs an integer number of samples per record")
+        self.path = path
+        self.leads = list(leads)
+        self.fs = int(fs)
+        self.spr = int(fs * RECORD_SECONDS)
+        self.plus = plus
+        self.annotation_samples = annotation_samples if plus else 0
+        self.annotations = sorted(annotations or [], key=lambda a: a[0])
+        self._next_annotation = 0
+        self.n_records = 0
+        self._buffer = np.zeros((len(self.leads), self.spr), dtype="<i2")
+        self._fill = 0
+        start = datetime.datetime.fromtimestamp(start_time) if start_time else datetime.datetime.now()
+        self.start = start
+        self._file = open(path, "wb")
+        self._write_header(gain, patient_id, recording_id)
+
+    def _write_header(self, gain, patient_id, recording_id):
+        ns = len(self.leads) + (1 if self.plus else 0)
+        labels = self.leads + ([ANNOTATION_LABEL] if self.plus else [])
+        pmin, pmax = INT16_MIN / float(gain), INT16_MAX / float(gain)
+        patient = (patient_id or "X").replace(" ", "_")
+        h = b"".join([
+            _field("0", 8),
+            _field(f"{patient} X X X" if self.plus else patient, 80),
+            _field(f"Startdate {self.start.strftime('%d-%b-%Y').upper()} {recording_id or 'X'} X X"
+                   if self.plus else recording_id, 80),
+            _field(f"{self.start:%d.%m.%y}", 8),
+            _field(f"{self.start:%H.%M.%S}", 8),
+            _field(256 * (ns + 1), 8),
+            _field("EDF+C" if self.plus else "", 44),
+            _field(-1, 8),  # patched in close()
+            _field(RECORD_SECONDS, 8),
+            _field(ns, 4),
+        ])
+        h += b"".join(_field(l, 16) for l in labels)
+        h += b"".join(_field("AgAgCl electrode" if l != ANNOTATION_LABEL else "", 80) for l in labels)
+        h += b"".join(_field("mV" if l != ANNOTATION_LABEL else "", 8) for l in labels)
+        h += b"".join(_number(pmin) if l != ANNOTATION_LABEL else _field(-1, 8) for l in labels)
+        h += b"".join(_number(pmax) if l != ANNOTATION_LABEL else _field(1, 8) for l in labels)
+        h += b"".join(_field(INT16_MIN, 8) for _ in labels)
+        h += b"".join(_field(INT16_MAX, 8) for _ in labels)
+        h += b"".join(_field("", 80) for _ in labels)
+        h += b"".join(_field(self.spr if l != ANNOTATION_LABEL else self.annotation_samples, 8) for l in labels)
+        h += b"".join(_field("", 32) for _ in labels)
+        self._file.write(h)
+
+    def write_block(self, block):
+        """Append an (n_leads, n) int16 block of consecutive frames."""
+        block = np.asarray(block)
+        pos = 0
+        while pos < block.shape[1]:
+            take = min(self.spr - self._fill, block.shape[1] - pos)
+            self._buffer[:, self._fill:self._fill + take] = block[:, pos:pos + take]
+            self._fill += take
+            pos += take
+            if self._fill == self.spr:
+                self._write_record()
+
+    def _annotation_bytes(self, final=False):
+        onset = self.n_records * RECORD_SECONDS
+        size = self.annotation_samples * 2
+        out = _tal(onset)
+        record_end = onset + RECORD_SECONDS
+        while self._next_annotation < len(self.annotations):
+            t, duration, text = self.annotations[self._next_annotation]
+            if t >= record_end and not final:
+                break
+            tal = _tal(t, text, duration)
+            if len(out) + len(tal) > size:
+                if len(out) > len(_tal(onset)):
+                    break  # spills into the next record; the onset keeps its exact time
+                tal = _tal(t, text[:max(size - len(out) - 32, 0)], duration)
+            out += tal
+            self._next_annotation += 1
+        return out.ljust(size, b"\x00")
+
+    def _write_record(self, final=False):
+        self._file.write(self._buffer.tobytes())
+        if self.plus:
+            self._file.write(self._annotation_bytes(final))
+        self.n_records += 1
+        self._fill = 0
+
+    def close(self):
+        if self._fill:
+            # Pad the final partial record with the last value of each lead
+            self._buffer[:, self._fill:] = self._buffer[:, self._fill - 1:self._fill]
+            self._write_record(final=True)
+        if self.plus:
+            # Annotations that did not fit go into flat-line trailing records
+            while self._next_annotation < len(self.annotations):
+                self._buffer[:] = self._buffer[:, -1:]
+                self._write_record(final=True)
+        self._file.seek(236)
+        self._file.write(_field(self.n_records, 8))
+        self._file.close()
+
+    def abort(self):
+        """Close without finishing the file (the caller removes it)."""
+        self._file.close()
+
+
+class EDFReader:
+    """Streaming EDF / EDF+ reader; one data record is decoded at a time."""
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            h = f.read(256)
+            ns = int(h[252:256])
+            sig = f.read(256 * ns)
+        self.header_bytes = int(h[184:192])
+        self.n_records = int(h[236:244])
+        self.record_seconds = float(h[244:252])
+        self.plus = h[192:197] in (b"EDF+C", b"EDF+D")
+        date, clock = h[168:176].decode(), h[176:184].decode()
+        day, month, year = (int(x) for x in date.split("."))
+        year += 2000 if year < 85 else 1900
+        hh, mm, ss = (int(x) for x in clock.split("."))
+        self.start = datetime.datetime(year, month, day, hh, mm, ss)
+
+        def column(offset, width):
+            base = offset * ns
+            return [sig[base + i * width:base + (i + 1) * width].decode("latin-1").strip() for i in range(ns)]
+        labels = column(0, 16)
+        pmin = [float(x) if x else 0 for x in column(16 + 80 + 8, 8)]
+        pmax = [float(x) if x else 0 for x in column(16 + 80 + 16, 8)]
+        dmin = [int(x) for x in column(16 + 80 + 24, 8)]
+        dmax = [int(x) for x in column(16 + 80 + 32, 8)]
+        spr = [int(x) for x in column(16 + 80 + 40 + 80, 8)]
+        self.annotation_signal = labels.index(ANNOTATION_LABEL) if ANNOTATION_LABEL in labels else None
+        self.signals = [i for i in range(ns) if i != self.annotation_signal]
+        self.leads = [labels[i] for i in self.signals]
+        rates = {spr[i] for i in self.signals}
+        if len(rates) != 1:
+            raise ValueError("Only EDF files with a common sampling rate are supported")
+        self.spr = rates.pop()
+        self.fs = self.spr / self.record_seconds
+        self._spr_all = spr
+        self.record_size = 2 * sum(spr)
+        i = self.signals[0]
+        # counts per physical unit; EDF stores the physical range per signal
+        self.gain = (dmax[i] - dmin[i]) / (pmax[i] - pmin[i]) if pmax[i] != pmin[i] else 1.0
+        if self.n_records < 0:
+            self.n_records = (os.path.getsize(path) - self.header_bytes) // self.record_size
+        self.n_samples = self.n_records * self.spr
+
+    def iter_records(self):
+        """Yield (record number, (n_leads, spr) int16 block, [(onset, duration, text), ...])."""
+        offsets = np.concatenate(([0], np.cumsum(self._spr_all)))
+        with open(self.path, "rb") as f:
+            f.seek(self.header_bytes)
+            for r in range(self.n_records):
+                raw = f.read(self.record_size)
+                if len(raw) < self.record_size:
+                    break
+                values = np.frombuffer(raw, dtype="<i2")
+                block = np.stack([values[offsets[i]:offsets[i + 1]] for i in self.signals])
+                annotations = []
+                if self.annotation_signal is not None:
+                    a = self.annotation_signal
+                    annotations = parse_tals(raw[2 * offsets[a]:2 * offsets[a + 1]])[1:]
+                yield r, block, annotations
+
+
+def parse_tals(data):
+    """Decode the TALs of one annotation signal record into (onset, duration, text) tuples."""
+    out = []
+    for tal in data.split(b"\x00"):
+        if not tal:
+            continue
+        parts = tal.split(b"\x14")
+        timing = parts[0].decode("utf-8")
+        onset, _, duration = timing.partition("\x15")
+        texts = [p.decode("utf-8") for p in parts[1:] if p]
+        out.append((float(onset), float(duration) if duration else 0.0, texts[0] if texts else ""))
+    return out
+
+
+def _event_annotations(events, fs):
+    annotations = []
+    for ev in events:
+        label = ev["label"] or ev["kind"]
+        if ev["kind"] == EVENT_BEAT:
+            label = label or "N"
+        duration = (ev["end"] - ev["start"]) / float(fs)
+        annotations.append((ev["start"] / float(fs), duration, label))
+    return annotations
+
+
+def export_edf(reader, path, index=None, beats=None, plus=True, block_samples=None, progress=None):
+    """
+    Convert a session to EDF(+) chunk by chunk.
+    Args:
+        reader: SessionReader
+        index: Optional SessionIndex whose events become EDF+ annotations
+        beats: Optional R-peak sample indices, annotated as "N"
+        progress: Optional callback(done, total); may raise to abort
+    """
+    events = list(index.events) if index is not None else []
+    if beats is not None:
+        events += [{"start": int(b), "end": int(b), "kind": EVENT_BEAT, "label": "N"} for b in beats]
+    writer = EDFWriter(path, reader.leads, reader.fs, gain=reader.gain, start_time=reader.start_time,
+                       patient_id=reader.patient_id, recording_id=reader.session_id, plus=plus,
+                       annotations=_event_annotations(events, reader.fs) if plus else None)
+    total = reader.n_samples
+    try:
+        for start, block in reader.iter_blocks(block_samples):
+            writer.write_block(block)
+            if progress:
+                progress(min(start + block.shape[1], total), total)
+    except BaseException:
+        writer.abort()
+        raise
+    writer.close()
+
+
+def import_edf(path, session_path, codec="raw"):
+    """Convert an EDF(+) file into a session (plus its sidecar index with annotations)."""
+    edf = EDFReader(path)
+    start_time = edf.start.timestamp()
+    writer = SessionWriter(session_path, edf.leads, fs=edf.fs, gain=edf.gain, start_time=start_time,
+                           codec=codec)
+    events = []
+    for r, block, annotations in edf.iter_records():
+        writer.append_block(block, start_time + r * edf.record_seconds)
+        for onset, duration, text in annotations:
+            start = int(round(onset * edf.fs))
+            kind = EVENT_BEAT if text == "N" else (EVENT_ARRHYTHMIA if duration else EVENT_ANNOTATION)
+            events.append({"start": start, "end": start + int(round(duration * edf.fs)), "kind": kind, "label": text})
+    writer.close()
+    SessionIndex(writer.chunk_table(), writer.fs, events).save(index_path(session_path))
+    return session_path
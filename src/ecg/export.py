@@ -0,0 +1,216 @@
+import os
+import numpy as np
+from PyQt5.QtCore import QThread, pyqtSignal
+from utils.logs import get_logger
+
+log = get_logger("export")
+
+DEFAULT_BLOCK_SAMPLES = 50000  # frames per streamed block (~1.2 MB for 12 leads)
+
+EXPORT_FORMATS = {
+    "csv": "CSV Files (*.csv)",
+    "parquet": "Parquet Files (*.parquet)",
+    "feather": "Feather Files (*.feather)",
+    "edf": "EDF+ Files (*.edf)",
+    "hea": "WFDB Records (*.hea)",
+}
+SESSION_ONLY_FORMATS = ("edf", "hea")  # need a recorded session, not the live buffer
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+class BufferSource:
+    """Adapts the live in-memory lead buffers to the SessionReader read API."""
+    def __init__(self, data, leads):
+        self.leads = list(leads)
+        n = max((len(data.get(lead, [])) for lead in self.leads), default=0)
+        self._block = np.full((len(self.leads), n), np.nan)
+        for i, lead in enumerate(self.leads):
+            values = data.get(lead, [])
+            if len(values):
+                self._block[i, n - len(values):] = values
+        self.n_samples = n
+
+    def read(self, start=0, stop=None, leads=None, physical=False):
+        rows = list(range(len(self.leads))) if leads is None else [self.leads.index(l) for l in leads]
+        return self._block[rows, start:stop]
+
+
+def _blocks(source, block_samples, progress, cancelled):
+    total = source.n_samples
+    for start in range(0, total, block_samples):
+        if cancelled and cancelled():
+            raise ExportCancelled()
+        stop = min(start + block_samples, total)
+        yield start, source.read(start, stop)
+        if progress:
+            progress(stop, total)
+
+
+def export_csv(source, path, block_samples=DEFAULT_BLOCK_SAMPLES, progress=None, cancelled=None):
+    """Stream a session (or BufferSource) to CSV with one vectorized np.savetxt per block."""
+    is_int = np.issubdtype(getattr(source.read(0, 1), "dtype", np.float64), np.integer)
+    fmt = ["%d"] + ["%d" if is_int else "%.6g"] * len(source.leads)
+    with open(path, "w", newline="") as f:
+        f.write(",".join(["Sample"] + source.leads) + "\n")
+        for start, block in _blocks(source, block_samples, progress, cancelled):
+            rows = np.column_stack((np.arange(start, start + block.shape[1]), block.T))
+            np.savetxt(f, rows, fmt=fmt, delimiter=",")
+
+
+def _arrow_batch(pa, leads, start, block):
+    columns = [pa.array(np.arange(start, start + block.shape[1], dtype=np.int64))]
+    columns += [pa.array(np.ascontiguousarray(block[i])) for i in range(len(leads))]
+    return pa.RecordBatch.from_arrays(columns, names=["Sample"] + list(leads))
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        return pyarrow
+    except ImportError:
+        raise RuntimeError("Parquet/Feather export needs the 'pyarrow' package (pip install pyarrow)")
+
+
+def export_parquet(source, path, block_samples=DEFAULT_BLOCK_SAMPLES, progress=None, cancelled=None):
+    """Stream to Parquet, one row group per block."""
+    pa = _require_pyarrow()
+    import pyarrow.parquet as pq
+    writer = None
+    try:
+        for start, block in _blocks(source, block_samples, progress, cancelled):
+            batch = _arrow_batch(pa, source.leads, start, block)
+            if writer is None:
+                writer = pq.ParquetWriter(path, batch.schema, compression="zstd")
+            writer.write_table(pa.Table.from_batches([batch]))
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def export_feather(source, path, block_samples=DEFAULT_BLOCK_SAMPLES, progress=None, cancelled=None):
+    """Stream to Feather v2 (Arrow IPC file), one record batch per block."""
+    pa = _require_pyarrow()
+    writer = None
+    sink = pa.OSFile(path, "wb")
+    try:
+        for start, block in _blocks(source, block_samples, progress, cancelled):
+            batch = _arrow_batch(pa, source.leads, start, block)
+            if writer is None:
+                writer = pa.ipc.new_file(sink, batch.schema, options=pa.ipc.IpcWriteOptions(compression="lz4"))
+            writer.write_batch(batch)
+    finally:
+        if writer is not None:
+            writer.close()
+        sink.close()
+
+
+def _session_progress(progress, cancelled):
+    def on_progress(done, total):
+        if cancelled and cancelled():
+            raise ExportCancelled()
+        if progress:
+            progress(done, total)
+    return on_progress
+
+
+def _session_index(source):
+    from ecg.session_index import SessionIndex, index_path
+    path = index_path(source.path)
+    try:
+        return SessionIndex.load(path) if os.path.exists(path) else None
+    except Exception as e:
+        log.warning("Could not load session index, exporting without annotations: %s", e)
+        return None
+
+
+def _session_beats(source, index):
+    """R peaks for the beat annotations, unless the index already lists beats."""
+    from ecg.session_index import EVENT_BEAT
+    from ecg.pan_tompkins import stream_r_peaks
+    if index is not None and any(ev["kind"] == EVENT_BEAT for ev in index.events):
+        return None
+    return stream_r_peaks(source, lead="II" if "II" in source.leads else source.leads[0])
+
+
+def export_edf(source, path, block_samples=DEFAULT_BLOCK_SAMPLES, progress=None, cancelled=None):
+    """EDF+ with the session's beats, rhythm episodes and annotations; needs a SessionReader source."""
+    from ecg import edf
+    index = _session_index(source)
+    edf.export_edf(source, path, index=index, beats=_session_beats(source, index), block_samples=block_samples,
+                   progress=_session_progress(progress, cancelled))
+
+
+def export_wfdb(source, path, block_samples=DEFAULT_BLOCK_SAMPLES, progress=None, cancelled=None):
+    """WFDB record next to path (.hea/.dat/.atr); needs a SessionReader source."""
+    from ecg import wfdb
+    record = os.path.splitext(path)[0]
+    index = _session_index(source)
+    try:
+        wfdb.export_wfdb(source, record, index=index, beats=_session_beats(source, index),
+                         block_samples=block_samples, progress=_session_progress(progress, cancelled))
+    except BaseException:
+        for p in wfdb.record_paths(record):
+            if os.path.exists(p):
+                os.remove(p)
+        raise
+
+
+def export_pdf(source, path, progress=None, cancelled=None, layout="3x4"):
+    """Paper-format ECG pages (25 mm/s, 10 mm/mV), one page per 10 s of the source."""
+    from ecg.paper_pdf import render_paper_pdf
+    render_paper_pdf(source, path, layout=layout, progress=progress, cancelled=cancelled)
+
+
+EXPORTERS = {
+    "csv": export_csv,
+    "parquet": export_parquet,
+    "feather": export_feather,
+    "edf": export_edf,
+    "hea": export_wfdb,
+    "pdf": export_pdf,
+}
+
+
+def export_session(source, path, fmt, **kwargs):
+    """Export with the named format; a partial file is removed on error or cancel."""
+    try:
+        EXPORTERS[fmt](source, path, **kwargs)
+    except BaseException:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+
+
+class ExportWorker(QThread):
+    """Runs export_session off the UI thread with progress and cancel."""
+    progress = pyqtSignal(int)  # percent
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+    done = pyqtSignal(str)
+
+    def __init__(self, source, path, fmt, parent=None, **options):
+        super().__init__(parent)
+        self.source = source
+        self.path = path
+        self.fmt = fmt
+        self.options = options  # extra exporter arguments, e.g. layout for "pdf"
+        self._cancel = False
+
+    def cancel(self):
+        self._cancel = True
+
+    def run(self):
+        def on_progress(done, total):
+            self.progress.emit(int(100 * done / max(total, 1)))
+        try:
+            export_session(self.source, self.path, self.fmt, progress=on_progress,
+                           cancelled=lambda: self._cancel, **self.options)
+        except ExportCancelled:
+            self.cancelled.emit()
+        except Exception as e:
+            self.failed.emit(str(e))
+        else:
+            self.done.emit(self.path)
@@ -0,0 +1,262 @@
+import os
+import json
+import time
+import zlib
+import queue
+import threading
+import numpy as np
+try:
+    import fcntl
+except ImportError:  # Windows: journals are not checked for a live owner
+    fcntl = None
+from ecg.session_store import SessionWriter, to_int16, SESSION_EXT
+from ecg.session_index import SessionIndex, index_path
+from utils.logs import get_logger
+
+log = get_logger("journal")
+
+# --- Journal layout (<session>.journal) ---
+# MAGIC, uint32 length, JSON header (the session writer's arguments)
+# then batch records: BATCH_DTYPE header followed by an (n_leads, n) int16
+# block. Every record carries a CRC32 of its payload, so a torn write at
+# the end of the file is detected and dropped on replay.
+#
+# The writer holds an exclusive flock on the journal for as long as it is
+# open, and recovery takes the same lock before replaying, so a journal that
+# another process (e.g. the acquisition service) is still writing is left
+# alone instead of being "recovered" from under it.
+
+MAGIC = b"ECGJRNL1"
+JOURNAL_EXT = ".journal"
+DEFAULT_FSYNC_INTERVAL = 1.0  # seconds
+DEFAULT_BATCH_SAMPLES = 50  # frames per batch handed to the journal thread
+MAX_BATCH_SAMPLES = 1 << 20  # anything larger is a corrupt record header
+
+BATCH_DTYPE = np.dtype([
+    ("n_samples", "<u4"),
+    ("crc32", "<u4"),
+    ("t_start", "<f8"),
+    ("t_end", "<f8"),
+])
+
+
+def journal_path(session_path):
+    return os.path.splitext(session_path)[0] + JOURNAL_EXT
+
+
+def _lock(f):
+    """Exclusive, non-blocking flock on an open file; False if another open file holds it."""
+    if fcntl is None:
+        return True
+    try:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return False
+    return True
+
+
+class AcquisitionJournal:
+    """
+    Write-ahead journal for an in-progress acquisition.
+    Frames are batched in memory on the caller's thread and handed to a
+    background thread, which appends them and fsyncs at most every
+    fsync_interval seconds. The UI thread never waits on disk I/O.
+    Args:
+        path: Journal file
+        header: Session metadata (session_path, leads, fs, gain, ids, codec)
+        fsync_interval: Seconds between fsync calls; data older than this
+            survives a crash or power loss
+        batch_samples: Frames collected before a batch is queued (a batch
+            is also queued once its first frame is fsync_interval old)
+    """
+    def __init__(self, path, header, fsync_interval=DEFAULT_FSYNC_INTERVAL, batch_samples=DEFAULT_BATCH_SAMPLES):
+        self.path = path
+        self.header = dict(header)
+        self.n_leads = len(self.header["leads"])
+        self.fsync_interval = fsync_interval
+        self.batch_samples = batch_samples
+        self._batch = np.zeros((self.n_leads, batch_samples), dtype=np.int16)
+        self._fill = 0
+        self._t_first = None
+        self._t_last = None
+        self._error = None
+        self._closed = False
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(path, "wb")
+        _lock(self._file)  # released when the journal thread closes the file
+        payload = json.dumps(self.header).encode("utf-8")
+        self._file.write(MAGIC + np.uint32(len(payload)).tobytes() + payload)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="AcquisitionJournal", daemon=True)
+        self._thread.start()
+
+    def append(self, values, timestamp=None):
+        if self._closed:
+            return
+        if timestamp is None:
+            timestamp = time.time()
+        if self._fill == 0:
+            self._t_first = timestamp
+        self._batch[:, self._fill] = to_int16(values)
+        self._t_last = timestamp
+        self._fill += 1
+        # A slow source must not keep frames in memory past the fsync bound
+        if self._fill == self.batch_samples or timestamp - self._t_first >= self.fsync_interval:
+            self.flush()
+
+    def flush(self):
+        """Queue the pending batch for the journal thread."""
+        if self._fill:
+            self._queue.put((self._batch[:, :self._fill].copy(), self._t_first, self._t_last))
+            self._fill = 0
+
+    def close(self, remove=False):
+        """Flush, fsync and stop the journal thread; remove=True deletes the file (clean stop)."""
+        if self._closed:
+            return
+        self.flush()
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+        if remove:
+            try:
+                os.remove(self.path)
+            except OSError as e:
+                log.warning("Could not remove journal: %s", e)
+
+    def _run(self):
+        last_sync = time.monotonic()
+        dirty = False
+        while True:
+            try:
+                item = self._queue.get(timeout=self.fsync_interval)
+            except queue.Empty:
+                item = False
+            if item:
+                block, t_start, t_end = item
+                try:
+                    payload = np.ascontiguousarray(block, dtype="<i2").tobytes()
+                    head = np.zeros(1, dtype=BATCH_DTYPE)
+                    head["n_samples"] = block.shape[1]
+                    head["crc32"] = zlib.crc32(payload)
+                    head["t_start"] = t_start
+                    head["t_end"] = t_end
+                    self._file.write(head.tobytes() + payload)
+                    dirty = True
+                except Exception as e:
+                    self._error = e
+            now = time.monotonic()
+            if dirty and (item is None or now - last_sync >= self.fsync_interval):
+                try:
+                    self._file.flush()
+                    os.fsync(self._file.fileno())
+                except Exception as e:
+                    self._error = e
+                dirty = False
+                last_sync = now
+            if item is None:
+                break
+        self._file.close()
+
+
+def read_journal(path):
+    """
+    Parse a journal file.
+    Returns:
+        (header, batches) where batches lazily yields (block, t_start, t_end),
+        one record at a time; replay stops at the first torn or corrupt record.
+    """
+    with open(path, "rb") as f:
+        head = f.read(len(MAGIC) + 4)
+        if not head.startswith(MAGIC) or len(head) < len(MAGIC) + 4:
+            raise ValueError(f"{path} is not an acquisition journal")
+        length = int(np.frombuffer(head[len(MAGIC):], dtype="<u4")[0])
+        header = json.loads(f.read(length).decode("utf-8"))
+        data_start = f.tell()
+    n_leads = len(header["leads"])
+
+    def batches():
+        with open(path, "rb") as f:
+            f.seek(data_start)
+            while True:
+                raw = f.read(BATCH_DTYPE.itemsize)
+                if len(raw) < BATCH_DTYPE.itemsize:
+                    break
+                rec = np.frombuffer(raw, dtype=BATCH_DTYPE)[0]
+                n = int(rec["n_samples"])
+                if n == 0 or n > MAX_BATCH_SAMPLES:
+                    break
+                payload = f.read(n * n_leads * 2)
+                if len(payload) < n * n_leads * 2 or zlib.crc32(payload) != int(rec["crc32"]):
+                    break
+                block = np.frombuffer(payload, dtype="<i2").reshape(n_leads, n)
+                yield block, float(rec["t_start"]), float(rec["t_end"])
+    return header, batches()
+
+
+def replay_journal(path, session_path=None):
+    """
+    Rebuild a session file from a journal left behind by a crash.
+    The (possibly incomplete) session file written during acquisition is
+    replaced. Returns the session path, or None if nothing was recovered.
+    """
+    header, batches = read_journal(path)
+    session_path = session_path or header.get("session_path") or os.path.splitext(path)[0] + SESSION_EXT
+    tmp = session_path + ".recover"
+    writer = SessionWriter(tmp, header["leads"], fs=header["fs"], patient_id=header.get("patient_id", ""),
+                           session_id=header.get("session_id"), gain=header.get("gain", 1.0),
+                           start_time=header.get("start_time"), codec=header.get("codec", "raw"))
+    try:
+        for block, t_start, t_end in batches:
+            writer.append_block(block, t_start)
+    finally:
+        writer.close()
+    if writer.samples_written == 0:
+        os.remove(tmp)
+        return None
+    os.replace(tmp, session_path)
+    SessionIndex(writer.chunk_table(), writer.fs).save(index_path(session_path))
+    return session_path
+
+
+def find_journals(directory):
+    """Paths of the journals in directory, sorted by name."""
+    if not os.path.isdir(directory):
+        return []
+    return [os.path.join(directory, name) for name in sorted(os.listdir(directory)) if name.endswith(JOURNAL_EXT)]
+
+
+def recover_journals(directory, on_recovered=None, journals=None):
+    """
+    Replay every journal found in directory into a session file and remove
+    it. Called at startup; returns the list of recovered session paths.
+    Journals still locked by their writer are skipped.
+    Args:
+        journals: Journal paths to replay instead (e.g. listed before a new
+            acquisition could start its own journal)
+    """
+    recovered = []
+    for path in find_journals(directory) if journals is None else journals:
+        try:
+            owner = open(path, "rb")
+        except OSError as e:
+            log.warning("Could not recover journal %s: %s", path, e)
+            continue
+        # Held until the journal is removed, so no one else replays it meanwhile
+        with owner:
+            if not _lock(owner):
+                log.info("Journal %s is still being written, not recovering it", path)
+                continue
+            try:
+                session_path = replay_journal(path)
+            except Exception as e:
+                log.warning("Could not recover journal %s: %s", path, e)
+                continue
+            if session_path:
+                recovered.append(session_path)
+                if on_recovered:
+                    on_recovered(session_path)
+            os.remove(path)
+    return recovered
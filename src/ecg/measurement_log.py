@@ -0,0 +1,146 @@
+import os
+import glob
+import json
+import time
+import queue
+import threading
+
+# --- Measurement log ---
+# History of live measurements (intervals, peaks, ...) as JSON lines, one
+# record per beat or analysis window with a "time" field (unix seconds).
+# Records are batched on the caller's thread and written by a background
+# thread, so the UI loop never touches the disk. Files are named
+# <prefix>_<YYYYmmdd-HHMMSS>.jsonl after their first record and roll over
+# when they reach max_bytes or the day changes; only the newest keep files
+# are kept. read_measurements() reads them back in order.
+
+DEFAULT_DIRECTORY = "measurements"
+DEFAULT_PREFIX = "ecg_metrics"
+DEFAULT_MAX_BYTES = 10_000_000
+DEFAULT_KEEP = 30
+DEFAULT_FLUSH_INTERVAL = 1.0  # seconds
+DEFAULT_BATCH_RECORDS = 100
+
+
+class MeasurementLog:
+    """
+    Append-only, rolling JSON-lines log written from a background thread.
+    Args:
+        directory: Where the files go (created on the first write)
+        prefix: File name prefix
+        max_bytes: Roll over to a new file past this size
+        keep: Number of files kept; older ones are deleted
+        flush_interval: Seconds a record may wait in memory before it is queued
+        batch_records: Records collected before a batch is queued
+    """
+    def __init__(self, directory=DEFAULT_DIRECTORY, prefix=DEFAULT_PREFIX, max_bytes=DEFAULT_MAX_BYTES,
+                 keep=DEFAULT_KEEP, flush_interval=DEFAULT_FLUSH_INTERVAL, batch_records=DEFAULT_BATCH_RECORDS):
+        self.directory = directory
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.keep = keep
+        self.flush_interval = flush_interval
+        self.batch_records = batch_records
+        self.path = None  # current file
+        self.records_written = 0
+        self._batch = []
+        self._batch_started = 0.0
+        self._file = None
+        self._day = None
+        self._error = None
+        self._closed = False
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="MeasurementLog", daemon=True)
+        self._thread.start()
+
+    def append(self, record):
+        """Log one measurement (a JSON-serialisable dict); "time" is added if missing."""
+        if self._closed:
+            return
+        now = time.time()
+        record.setdefault("time", round(now, 3))
+        if not self._batch:
+            self._batch_started = now
+        self._batch.append(record)
+        if len(self._batch) >= self.batch_records or now - self._batch_started >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """Queue the pending records for the writer thread."""
+        if self._batch:
+            self._queue.put(self._batch)
+            self._batch = []
+
+    def close(self):
+        """Flush, write everything queued and stop the writer thread."""
+        if self._closed:
+            return
+        self.flush()
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join()
+
+    @property
+    def error(self):
+        """Last write error of the writer thread, or None."""
+        return self._error
+
+    def _roll(self, t):
+        if self._file is not None:
+            self._file.close()
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(t))
+        self.path = os.path.join(self.directory, f"{self.prefix}_{stamp}.jsonl")
+        n = 0
+        while os.path.exists(self.path):  # rolled over within the same second
+            n += 1
+            self.path = os.path.join(self.directory, f"{self.prefix}_{stamp}_{n:03d}.jsonl")
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._day = time.localtime(t)[:3]
+        for old in log_files(self.directory, self.prefix)[:-self.keep]:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+
+    def _write(self, batch):
+        t = batch[0]["time"]
+        if self._file is None or self._file.tell() >= self.max_bytes or time.localtime(t)[:3] != self._day:
+            self._roll(t)
+        self._file.write("".join(json.dumps(record, default=str) + "\n" for record in batch))
+        self._file.flush()
+        self.records_written += len(batch)
+
+    def _run(self):
+        while True:
+            batch = self._queue.get()
+            if batch is None:
+                break
+            try:
+                self._write(batch)
+            except Exception as e:
+                self._error = e
+        if self._file is not None:
+            self._file.close()
+
+
+def log_files(directory=DEFAULT_DIRECTORY, prefix=DEFAULT_PREFIX):
+    """Log files of prefix in directory, oldest first."""
+    return sorted(glob.glob(os.path.join(directory, f"{prefix}_*.jsonl")))
+
+
+def read_measurements(directory=DEFAULT_DIRECTORY, prefix=DEFAULT_PREFIX, since=None, until=None):
+    """
+    Yield logged records in time order, optionally limited to since <= time < until.
+    A torn last line (the app was killed mid-write) is skipped.
+    """
+    for path in log_files(directory, prefix):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                t = record.get("time", 0)
+                if (since is None or t >= since) and (until is None or t < until):
+                    yield record
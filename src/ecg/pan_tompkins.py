@@ -31,3 +31,33 @@ def pan_tompkins(ecg, fs=500):
     from scipy.signal import find_peaks
     peaks, _ = find_peaks(mwa, height=threshold, distance=min_distance)
     return peaks
+
+
+def stream_r_peaks(reader, lead="II", block_seconds=60, overlap_seconds=2):
+    """
+    Run pan_tompkins over a whole session block by block.
+    Args:
+        reader: SessionReader (or anything with fs, n_samples and read())
+        lead: Lead to detect on
+        block_seconds: Block length; memory use is bounded by one block
+        overlap_seconds: Overlap between blocks so edge beats are not lost
+    Returns:
+        r_peaks: Absolute sample indices of detected R peaks
+    """
+    fs = reader.fs
+    block = int(block_seconds * fs)
+    overlap = int(overlap_seconds * fs)
+    min_distance = int(0.2 * fs)
+    peaks = []
+    last = -min_distance
+    for start in range(0, reader.n_samples, block):
+        lo = max(start - overlap, 0)
+        signal = reader.read(lo, start + block, leads=[lead])[0].astype(np.float64)
+        if len(signal) < fs:
+            continue
+        for p in pan_tompkins(signal, fs=fs) + lo:
+            # Beats found again in the overlap are dropped
+            if p >= start - overlap // 2 and p - last >= min_distance:
+                peaks.append(int(p))
+                last = p
+    return np.array(peaks, dtype=np.int64)
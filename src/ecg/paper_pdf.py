@@ -0,0 +1,233 @@
+import math
+import datetime
+import numpy as np
+from PyQt5.QtCore import Qt, QLineF, QMarginsF, QPointF
+from PyQt5.QtGui import QPdfWriter, QPainter, QPainterPath, QPageSize, QPageLayout, QPen, QColor, QFont, QPolygonF
+
+# --- Paper ECG PDF ---
+# Standard ECG paper: 1 mm minor / 5 mm major grid, 25 mm/s, 10 mm/mV.
+# Everything is drawn with QPainter in millimetres straight into a vector
+# PDF: the grid is two QPainterPaths built once and stroked once per page,
+# each trace is one polyline, and pages are produced one after another
+# from source.read() windows, so a long recording never has to be in
+# memory (or in matplotlib figures) all at once.
+
+PAPER_SPEED = 25.0  # mm/s
+PAPER_GAIN = 10.0  # mm/mV
+PAGE_MM = (297.0, 210.0)  # A4 landscape
+GRID_MM = (260.0, 170.0)  # 10 mm calibration + 250 mm (10 s) of trace, 34 large boxes high
+GRID_TOP = 30.0
+CAL_MM = 10.0  # space for the 1 mV calibration pulse at the start of each row
+RESOLUTION = 1200  # dpi of PDF coordinates
+
+LAYOUTS = {
+    "3x4": "3×4 + rhythm strip (II)",
+    "12x1": "12×1",
+}
+GRID_3X4 = [["I", "aVR", "V1", "V4"], ["II", "aVL", "V2", "V5"], ["III", "aVF", "V3", "V6"]]
+RHYTHM_LEAD = "II"
+
+MINOR_COLOR = QColor(255, 192, 192)
+MAJOR_COLOR = QColor(240, 120, 120)
+TRACE_COLOR = QColor(0, 0, 0)
+
+
+def page_seconds(speed=PAPER_SPEED):
+    """Seconds of signal across one page width."""
+    return (GRID_MM[0] - CAL_MM) / speed
+
+
+def _grid_paths(x0, y0, width, height):
+    """(minor, major) grid line paths for a width x height mm area."""
+    minor, major = QPainterPath(), QPainterPath()
+    for i in range(int(round(width)) + 1):
+        path = major if i % 5 == 0 else minor
+        path.moveTo(x0 + i, y0)
+        path.lineTo(x0 + i, y0 + height)
+    for j in range(int(round(height)) + 1):
+        path = major if j % 5 == 0 else minor
+        path.moveTo(x0, y0 + j)
+        path.lineTo(x0 + width, y0 + j)
+    return minor, major
+
+
+def _polyline(x, y):
+    """QPolygonF filled in place from numpy arrays (no per-point Python objects)."""
+    ok = np.isfinite(y)
+    x, y = x[ok], y[ok]
+    poly = QPolygonF(len(x))
+    if len(x):
+        ptr = poly.data()
+        ptr.setsize(len(x) * 16)
+        xy = np.frombuffer(ptr, dtype=np.float64).reshape(-1, 2)
+        xy[:, 0] = x
+        xy[:, 1] = y
+    return poly
+
+
+class PaperRenderer:
+    """
+    Renders a recording onto ECG paper pages in a PDF.
+    Args:
+        path: Output PDF
+        layout: "3x4" (3×4 grid plus a Lead II rhythm strip) or "12x1"
+        fs: Sampling rate of the pages' blocks (Hz)
+        speed: Paper speed, mm/s
+        gain: Amplitude, mm/mV
+        title: Header text (e.g. patient name)
+    """
+    def __init__(self, path, layout="3x4", fs=500, speed=PAPER_SPEED, gain=PAPER_GAIN, title=""):
+        if layout not in LAYOUTS:
+            raise ValueError(f"Unknown layout {layout!r}, expected one of {', '.join(LAYOUTS)}")
+        self.layout = layout
+        self.fs = fs
+        self.speed = speed
+        self.gain = gain
+        self.title = title
+        self.pages = 0
+        self._writer = QPdfWriter(path)
+        self._writer.setResolution(RESOLUTION)
+        self._writer.setPageSize(QPageSize(QPageSize.A4))
+        self._writer.setPageOrientation(QPageLayout.Landscape)
+        self._writer.setPageMargins(QMarginsF(0, 0, 0, 0))
+        self._writer.setTitle(title or "ECG")
+        self._painter = QPainter(self._writer)
+        self._mm = RESOLUTION / 25.4
+        self._x0 = (PAGE_MM[0] - GRID_MM[0]) / 2
+        self._minor, self._major = _grid_paths(self._x0, GRID_TOP, *GRID_MM)
+        self._minor_pen = QPen(MINOR_COLOR, 0.1)
+        self._major_pen = QPen(MAJOR_COLOR, 0.2)
+        self._trace_pen = QPen(TRACE_COLOR, 0.3)
+        self._trace_pen.setJoinStyle(Qt.RoundJoin)
+
+    def rows(self):
+        """Baseline y (mm) of every trace row on a page."""
+        n = 4 if self.layout == "3x4" else 12
+        pitch = GRID_MM[1] / n
+        return [GRID_TOP + pitch * (i + 0.5) for i in range(n)]
+
+    # --- Drawing ---
+    def _text(self, x, y, text, size=8, bold=False):
+        p = self._painter
+        p.save()
+        p.resetTransform()
+        p.setPen(QColor(0, 0, 0))
+        font = QFont("Helvetica")
+        font.setPointSizeF(size)
+        font.setBold(bold)
+        p.setFont(font)
+        p.drawText(QPointF(x * self._mm, y * self._mm), text)
+        p.restore()
+
+    def _trace(self, x, baseline, mv):
+        """Draw a trace in mV starting at x mm, centred on its median."""
+        if not len(mv):
+            return
+        finite = mv[np.isfinite(mv)]
+        if not len(finite):
+            return
+        t = x + np.arange(len(mv)) * (self.speed / self.fs)
+        self._painter.drawPolyline(_polyline(t, baseline - (mv - np.median(finite)) * self.gain))
+
+    def _calibration(self, baseline):
+        """1 mV, 200 ms calibration pulse."""
+        x, h, w = self._x0 + 2, self.gain, 0.2 * self.speed
+        self._painter.drawPolyline(QPolygonF([QPointF(x, baseline), QPointF(x + 1, baseline),
+                                              QPointF(x + 1, baseline - h), QPointF(x + 1 + w, baseline - h),
+                                              QPointF(x + 1 + w, baseline), QPointF(x + CAL_MM - 1, baseline)]))
+
+    def _begin_page(self, header):
+        if self.pages:
+            self._writer.newPage()
+        self.pages += 1
+        p = self._painter
+        p.resetTransform()
+        p.scale(self._mm, self._mm)
+        p.setPen(self._minor_pen)
+        p.drawPath(self._minor)
+        p.setPen(self._major_pen)
+        p.drawPath(self._major)
+        self._text(self._x0, 14, self.title, size=12, bold=True)
+        self._text(self._x0, 21, header, size=9)
+        self._text(self._x0, GRID_TOP + GRID_MM[1] + 6,
+                   f"{self.speed:g} mm/s   {self.gain:g} mm/mV   {self.fs:g} Hz", size=8)
+        p.setPen(self._trace_pen)
+
+    def page(self, block, leads, header=""):
+        """
+        Draw one page.
+        Args:
+            block: (n_leads, n) array in mV covering page_seconds() of signal
+            leads: Lead names of the block rows
+            header: Text under the title (time window, page number)
+        """
+        self._begin_page(header)
+        row_of = {lead: i for i, lead in enumerate(leads)}
+        rows = self.rows()
+        start = self._x0 + CAL_MM
+        if self.layout == "3x4":
+            seg = int(round(page_seconds(self.speed) * self.fs / 4))  # samples per column
+            for r, names in enumerate(GRID_3X4):
+                self._calibration(rows[r])
+                for c, lead in enumerate(names):
+                    x = start + c * seg * self.speed / self.fs
+                    if c:
+                        self._painter.drawLine(QLineF(x, rows[r] - 4, x, rows[r] + 4))
+                    self._text(x + 1, rows[r] - self.gain * 1.3, lead, size=9, bold=True)
+                    if lead in row_of:
+                        self._trace(x, rows[r], block[row_of[lead], c * seg:(c + 1) * seg])
+            rhythm = RHYTHM_LEAD if RHYTHM_LEAD in row_of else leads[0]
+            self._calibration(rows[3])
+            self._text(start + 1, rows[3] - self.gain * 1.3, rhythm, size=9, bold=True)
+            self._trace(start, rows[3], block[row_of[rhythm]])
+        else:
+            for r, lead in enumerate(leads[:12]):
+                self._calibration(rows[r])
+                self._text(self._x0 + CAL_MM + 1, rows[r] - 2, lead, size=7, bold=True)
+                self._trace(start, rows[r], block[r])
+
+    def close(self):
+        self._painter.end()
+
+
+def render_paper_pdf(source, path, layout="3x4", start=0.0, stop=None, fs=None, title=None,
+                     speed=PAPER_SPEED, gain=PAPER_GAIN, progress=None, cancelled=None):
+    """
+    Print a recording (SessionReader, or BufferSource) as paper-format pages.
+    Pages follow each other in time, one page_seconds() window per page,
+    each read from the source only when its page is drawn.
+    Args:
+        start, stop: Time range in seconds (default: everything)
+        fs: Sampling rate if the source has none
+        title: Header title, default the source's patient id
+        progress: Optional callback(pages_done, pages_total)
+        cancelled: Optional callable; checked before every page
+    Returns:
+        Number of pages written
+    """
+    fs = float(getattr(source, "fs", None) or fs or 500)
+    leads = list(source.leads)
+    window = int(round(page_seconds(speed) * fs))
+    first = int(start * fs)
+    last = source.n_samples if stop is None else min(source.n_samples, int(stop * fs))
+    total = max(1, math.ceil((last - first) / window))
+    t0 = getattr(source, "start_time", None)
+    renderer = PaperRenderer(path, layout=layout, fs=fs, speed=speed, gain=gain,
+                             title=title if title is not None else (getattr(source, "patient_id", "") or "ECG"))
+    try:
+        for page in range(total):
+            if cancelled and cancelled():
+                from ecg.export import ExportCancelled
+                raise ExportCancelled()
+            a = first + page * window
+            block = source.read(a, min(a + window, last), physical=True) if a < last \
+                else np.zeros((len(leads), 0))
+            when = f"{a / fs:.0f}-{(a + window) / fs:.0f} s"
+            if t0:
+                when = datetime.datetime.fromtimestamp(t0 + a / fs).strftime("%Y-%m-%d %H:%M:%S") + f"  ({when})"
+            renderer.page(np.asarray(block, dtype=float), leads, header=f"{when}   Page {page + 1} of {total}")
+            if progress:
+                progress(page + 1, total)
+    finally:
+        renderer.close()
+    return renderer.pages
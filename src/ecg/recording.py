@@ -3,28 +3,11 @@ from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
 import numpy as np
 from PyQt5.QtCore import QTimer, Qt
+from ecg.session_recording import ECGRecording  # Qt-free; imported from here by the test page
+from utils.logs import get_logger
 
-class ECGRecording:
-    def __init__(self):
-        self.recording = False
-        self.data = []
+log = get_logger("recording")
 
-    def start_recording(self):
-        self.recording = True
-        self.data = []  # Reset data for new recording
-        # Code to start ECG data acquisition would go here
-
-    def stop_recording(self):
-        self.recording = False
-        # Code to stop ECG data acquisition would go here
-
-    def save_recording(self, filename):
-        if not self.recording and self.data:
-            # Code to save self.data to a file with the given filename
-            pass
-        else:
-            raise Exception("Recording is still in progress or no data to save.")
-        
 class Lead12BlackPage(QWidget):
     def __init__(self, parent=None, dashboard=None):
         super().__init__(parent)
@@ -60,6 +43,10 @@ class Lead12BlackPage(QWidget):
         self.timer.timeout.connect(self.update_data)
         self.timer.start(30)  # ~33 FPS
 
+    def closeEvent(self, event):
+        self.timer.stop()
+        super().closeEvent(event)
+
     def update_data(self):
         for i in range(12):
             # Slide a window over the simulated ECG for animation
@@ -87,7 +74,7 @@ class Lead12BlackPage(QWidget):
                     by_label = dict(zip(labels, handles))
                     ax.legend(by_label.values(), by_label.keys(), loc='upper right', fontsize=8)
                 except Exception as e:
-                    print(f"ECG analysis error in lead {self.lead_names[i]}:", e)
+                    log.warning("ECG analysis error in lead %s: %s", self.lead_names[i], e)
             self.canvases[i].draw()
         # --- Lead II metrics and dashboard update (as before) ---
         lead_ii_signal = self.ecg_buffers[1][self.ptrs[1]:self.ptrs[1]+self.window_size]
@@ -100,21 +87,19 @@ class Lead12BlackPage(QWidget):
                 qtc_interval = 0.42  # Dummy value
                 qrs_axis = "--"  # Placeholder
                 st_segment = "--"  # Placeholder
-                with open("ecg_metrics_output.txt", "w") as f:
-                    f.write("# ECG Metrics Output\n")
-                    f.write("# Format: PR_interval(ms), QRS_duration(ms), QTc_interval(ms), QRS_axis, ST_segment\n")
-                    f.write(f"{pr_interval*1000}, {qrs_duration*1000}, {qtc_interval*1000}, {qrs_axis}, {st_segment}\n")
-                    # Dummy peak lists
-                    f.write(f"P_peaks: {list(np.array([100, 200, 300]))}\n")
-                    f.write(f"Q_peaks: {list(np.array([150, 250, 350]))}\n")
-                    f.write(f"R_peaks: {list(np.array([180, 280, 380]))}\n")
-                    f.write(f"S_peaks: {list(np.array([210, 310, 410]))}\n")
-                    f.write(f"T_peaks: {list(np.array([240, 340, 440]))}\n")
+                metrics = {
+                    'PR': pr_interval * 1000,
+                    'QRS': qrs_duration * 1000,
+                    'QT': qt_interval * 1000,
+                    'QTc': qtc_interval * 1000,
+                    'QRS_axis': qrs_axis,
+                    'ST': None if st_segment == "--" else st_segment,
+                }
                 if self.dashboard and hasattr(self.dashboard, "update_ecg_metrics"):
-                    self.dashboard.update_ecg_metrics(pr_interval, qrs_duration, qtc_interval, qrs_axis, st_segment)
+                    self.dashboard.update_ecg_metrics(metrics)
                     QTimer.singleShot(0, self.dashboard.repaint)
             except Exception as e:
-                print("ECG analysis error:", e)
+                log.warning("ECG analysis error: %s", e)
 
 class ECGMenu(QGroupBox):
     def __init__(self, parent=None, dashboard=None):
@@ -0,0 +1,315 @@
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import datetime
+import numpy as np
+from PyQt5.QtCore import QThread, pyqtSignal
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+# --- Report pipeline ---
+# snapshot (GUI thread) -> strip PNG (Agg) -> HTML -> PDF (QTextDocument)
+# Everything after the snapshot touches only copies of the data, so it
+# runs on the ReportQueue thread while the dashboard keeps animating.
+
+STRIP_SIZE = (8, 3.5)  # inches
+STRIP_DPI = 250
+STRIP_SECONDS = 10  # Lead II strip and interval analysis window for session reports
+STRIP_RENDERER = 1  # bump when render_strip output changes, so cached strips are not reused
+
+
+class ReportCancelled(Exception):
+    pass
+
+
+def render_strip(signal, path, title="Lead II", figsize=STRIP_SIZE, dpi=STRIP_DPI, color="#ff6600"):
+    """Render a signal strip to PNG with a private Agg canvas (safe off the GUI thread)."""
+    fig = Figure(figsize=figsize, dpi=dpi)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(111)
+    ax.set_facecolor("#eee")
+    ax.set_xticks([])
+    ax.set_yticks([])
+    ax.set_title(title, fontsize=10)
+    ax.plot(np.arange(len(signal)), signal, color=color)
+    fig.savefig(path, bbox_inches='tight', dpi=dpi)
+    return path
+
+
+def cached_strip(signal, cache=None, title="Lead II", figsize=STRIP_SIZE, dpi=STRIP_DPI, color="#ff6600"):
+    """
+    render_strip through the report asset cache: the same samples with the
+    same render parameters come back as the already rasterized PNG.
+    Returns:
+        path of the cached PNG (owned by the cache, do not delete)
+    """
+    from ecg.asset_cache import asset_key, default_cache
+    cache = cache or default_cache()
+    key = asset_key(signal, kind="strip", renderer=STRIP_RENDERER, title=title, figsize=list(figsize), dpi=dpi,
+                    color=color)
+    return cache.fetch(key, lambda path: render_strip(signal, path, title, figsize, dpi, color))
+
+
+def strip_asset_path(html_path):
+    """Where the report HTML's own copy of the strip image goes (next to it)."""
+    return os.path.splitext(html_path)[0] + "_lead2.png"
+
+
+def html_to_pdf(html, path):
+    """Print HTML to a PDF file with Qt's QTextDocument (no extra dependencies)."""
+    from PyQt5.QtGui import QTextDocument
+    from PyQt5.QtPrintSupport import QPrinter
+    doc = QTextDocument()
+    doc.setHtml(html)
+    printer = QPrinter(QPrinter.HighResolution)
+    printer.setOutputFormat(QPrinter.PdfFormat)
+    printer.setOutputFileName(path)
+    doc.print_(printer)
+    return path
+
+
+class ReportJob:
+    """
+    Everything needed to produce one report, copied on the GUI thread.
+    Args:
+        pdf_path: Output PDF
+        metrics: Dict with HR, PR, QRS, QT, QTc, ST, QRS_axis
+        patient: Dict with first_name, last_name, age, height, gender, weight
+        strip: Lead II samples to plot (copied), or None for no graph
+        notes: Extra conclusion text (e.g. arrhythmias found)
+        html_path: Also keep the report HTML here, with its own copy of the
+            strip image next to it (None: nothing is written besides the PDF)
+        template: Report layout (file in ecg/templates/ or absolute path)
+        use_cache: Take the strip image from the report asset cache
+    """
+    def __init__(self, pdf_path, metrics, patient=None, strip=None, test_name="12 Lead ECG", date_time=None,
+                 abnormal_report='N', notes="", html_path=None, template=None, use_cache=True):
+        self.pdf_path = pdf_path
+        self.metrics = dict(metrics)
+        self.patient = dict(patient or {})
+        self.strip = None if strip is None else np.array(strip, dtype=float)
+        self.test_name = test_name
+        self.date_time = date_time or datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
+        self.abnormal_report = abnormal_report
+        self.notes = notes
+        self.html_path = html_path
+        self.template = template
+        self.use_cache = use_cache
+        self.id = None
+
+
+def analyse_session(reader, index=None, lead="II", strip_seconds=STRIP_SECONDS):
+    """
+    Summary metrics for a recorded session.
+    Heart rate comes from R peaks over the whole session (streamed block by
+    block); PR/QRS/QT/QTc/ST are medians over the strip window, the first
+    strip_seconds of the session.
+    Returns:
+        (metrics dict, strip in mV, arrhythmia labels)
+    """
+    from ecg.pan_tompkins import stream_r_peaks, pan_tompkins
+    from ecg.ecg_pqrst import detect_pqrst, pqrst_intervals, snap_to_peak
+    from ecg.session_index import EVENT_ARRHYTHMIA
+    lead = lead if lead in reader.leads else reader.leads[0]
+    fs = reader.fs
+    strip = reader.read(0, int(strip_seconds * fs), leads=[lead], physical=True)[0]
+    strip = strip - np.mean(strip) if len(strip) else strip
+    metrics = {'HR': None, 'PR': None, 'QRS': None, 'QT': None, 'QTc': None, 'ST': None, 'QRS_axis': None}
+    if len(strip) > fs:
+        peaks = detect_pqrst(strip, fs=fs, r_peaks=snap_to_peak(strip, pan_tompkins(strip, fs=fs), fs=fs))
+        metrics.update(pqrst_intervals(peaks, fs=fs))
+    r_all = stream_r_peaks(reader, lead=lead)
+    if len(r_all) > 1:
+        metrics['HR'] = 60.0 * fs / float(np.mean(np.diff(r_all)))
+        if metrics['QT']:
+            metrics['QTc'] = float(metrics['QT'] / np.sqrt(60.0 / metrics['HR']))
+    labels = []
+    if index is not None:
+        for ev in index.events:
+            if ev["kind"] == EVENT_ARRHYTHMIA and ev["label"] not in labels:
+                labels.append(ev["label"])
+    return metrics, strip, labels
+
+
+def job_from_session(session_path, pdf_path, html_path=None, patient=None, template=None, use_cache=True):
+    """Analyse a session file and build the ReportJob for it."""
+    from ecg.session_index import open_session
+    reader, index = open_session(session_path)
+    try:
+        metrics, strip, labels = analyse_session(reader, index)
+        start = index.start_time or reader.start_time
+    finally:
+        reader.close()
+    notes = ("Arrhythmias recorded: " + ", ".join(labels)) if labels else ""
+    display = {k: (f"{v:.0f}" if k == 'HR' else f"{v:.1f}") if v is not None else "--" for k, v in metrics.items()}
+    job = ReportJob(pdf_path, display, patient=patient or {'first_name': reader.patient_id or "Unknown"},
+                    strip=strip, date_time=datetime.datetime.fromtimestamp(start).strftime("%Y-%m-%d %H:%M"),
+                    notes=notes, html_path=html_path, template=template, use_cache=use_cache)
+    return job, metrics, labels
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+def build_report(job, progress=None, cancelled=None):
+    """
+    Run the whole pipeline for one job.
+    Args:
+        progress: Optional callback(percent)
+        cancelled: Optional callable; checked between steps
+    Returns:
+        job.pdf_path
+    The PDF is printed to a temporary file next to job.pdf_path and moved
+    into place after the last cancel check, so a cancelled job never
+    touches a file already at that path.
+    """
+    from ecg.ecg_report_generator import generate_ecg_html_report
+    from ecg.report_templates import DEFAULT_TEMPLATE
+
+    def step(percent):
+        if cancelled and cancelled():
+            raise ReportCancelled()
+        if progress:
+            progress(percent)
+
+    step(0)
+    strip_path = temp_path = pdf_tmp = None
+    try:
+        if job.strip is not None and len(job.strip):
+            if job.use_cache:
+                strip_path = cached_strip(job.strip)
+            else:
+                fd, strip_path = tempfile.mkstemp(prefix="lead2_graph_", suffix=".png")
+                os.close(fd)
+                temp_path = render_strip(job.strip, strip_path)
+            if job.html_path:
+                # The HTML outlives the cached/temporary PNG (LRU eviction,
+                # cleanup below), so it gets a copy of its own
+                asset_path = strip_asset_path(job.html_path)
+                shutil.copyfile(strip_path, asset_path)
+                strip_path = asset_path
+        step(50)
+        m, p = job.metrics, job.patient
+        html = generate_ecg_html_report(
+            HR=m.get('HR', "--"),
+            PR=_number(m.get('PR')),
+            QRS=_number(m.get('QRS')),
+            QT=_number(m.get('QT')),
+            QTc=_number(m.get('QTc')),
+            ST=_number(m.get('ST')),
+            test_name=job.test_name,
+            date_time=job.date_time,
+            first_name=p.get('first_name', "Unknown"),
+            last_name=p.get('last_name', ""),
+            age=p.get('age', ""),
+            height=p.get('height', ""),
+            gender=p.get('gender', ""),
+            weight=p.get('weight', ""),
+            abnormal_report=job.abnormal_report,
+            text=job.notes, obstext="", qrstext="",
+            uId="NA", testId="NA", dataId="NA",
+            lead2_img_path=strip_path,
+            QRS_axis=m.get('QRS_axis', "--"),
+            template=job.template or DEFAULT_TEMPLATE
+        )
+        if job.html_path:
+            with open(job.html_path, "w") as f:
+                f.write(html)
+        step(70)
+        fd, pdf_tmp = tempfile.mkstemp(prefix=".report_", suffix=".pdf",
+                                       dir=os.path.dirname(os.path.abspath(job.pdf_path)))
+        os.close(fd)
+        html_to_pdf(html, pdf_tmp)
+        step(100)
+        os.replace(pdf_tmp, job.pdf_path)
+        pdf_tmp = None
+    finally:
+        if pdf_tmp and os.path.exists(pdf_tmp):
+            os.remove(pdf_tmp)
+        if temp_path and os.path.exists(temp_path):
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+    return job.pdf_path
+
+
+class ReportQueue(QThread):
+    """
+    Background report job queue. Jobs run one after another on this
+    thread, so several reports can be requested back to back; signals
+    arrive on the GUI thread with the job id.
+    """
+    job_started = pyqtSignal(int)
+    job_progress = pyqtSignal(int, int)  # job id, percent
+    job_done = pyqtSignal(int, str)
+    job_failed = pyqtSignal(int, str)
+    job_cancelled = pyqtSignal(int)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._jobs = queue.Queue()
+        self._lock = threading.Lock()
+        self._last_id = 0
+        self._cancelled = set()
+        self._cancel_upto = 0  # every job id <= this was cancelled by cancel()
+        self._pending = 0
+
+    @property
+    def pending(self):
+        """Jobs queued or running."""
+        return self._pending
+
+    def submit(self, job):
+        with self._lock:
+            self._last_id += 1
+            job.id = self._last_id
+            self._pending += 1
+        self._jobs.put(job)
+        if not self.isRunning():
+            self.start()
+        return job.id
+
+    def cancel(self, job_id=None):
+        """Cancel one job, or every queued and running job if job_id is None."""
+        with self._lock:
+            if job_id is None:
+                self._cancel_upto = self._last_id
+            else:
+                self._cancelled.add(job_id)
+
+    def is_cancelled(self, job_id):
+        return job_id <= self._cancel_upto or job_id in self._cancelled
+
+    def shutdown(self):
+        self.cancel()
+        self._jobs.put(None)
+        self.wait()
+
+    def run(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                break
+            signal, args = self.job_done, (job.id, job.pdf_path)
+            try:
+                if self.is_cancelled(job.id):
+                    raise ReportCancelled()
+                self.job_started.emit(job.id)
+                build_report(job, progress=lambda pct: self.job_progress.emit(job.id, pct),
+                             cancelled=lambda: self.is_cancelled(job.id))
+            except ReportCancelled:
+                signal, args = self.job_cancelled, (job.id,)
+            except Exception as e:
+                signal, args = self.job_failed, (job.id, str(e))
+            # Not pending any more by the time the outcome is announced
+            with self._lock:
+                self._pending -= 1
+                self._cancelled.discard(job.id)
+            signal.emit(*args)
@@ -0,0 +1,248 @@
+import os
+import re
+import json
+import threading
+from html import escape
+
+# --- Report templates ---
+# Report layouts are HTML files in ecg/templates/ with a small template
+# syntax; reference ranges and conclusion rules live in a JSON table next
+# to them. A template is parsed and compiled to a Python function once and
+# cached (reloaded when the file changes), so rendering a report is one
+# function call over a context dict.
+#
+#   {{ name }}  {{ row.value }}    value, HTML-escaped (None renders empty)
+#   {{ name|raw }}                 value inserted as-is
+#   {% if name %} {% elif not other %} {% else %} {% endif %}
+#   {% for row in rows %} ... {% endfor %}
+#   {# comment #}
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+DEFAULT_TEMPLATE = "report.html"
+DEFAULT_RULES = "report_rules.json"
+
+_TOKEN = re.compile(r"({{.*?}}|{%.*?%}|{#.*?#})", re.S)
+_PATH = re.compile(r"^[A-Za-z_]\w*(\.\w+)*$")
+_SPECIAL = re.compile(r"[&<>\"']")
+
+
+class TemplateError(ValueError):
+    pass
+
+
+def _lookup(value, path):
+    """Follow a dotted path through dicts, sequences and attributes."""
+    for part in path:
+        if value is None:
+            return None
+        if isinstance(value, dict):
+            value = value.get(part)
+        elif part.isdigit():
+            value = value[int(part)] if int(part) < len(value) else None
+        else:
+            value = getattr(value, part, None)
+    return value
+
+
+def _text(value, raw=False):
+    if value is None:
+        return ""
+    if raw or isinstance(value, (int, float)):
+        return str(value)
+    text = str(value)
+    return escape(text) if _SPECIAL.search(text) else text
+
+
+class Template:
+    """
+    A compiled template.
+    Args:
+        source: Template text
+        name: Shown in error messages
+    """
+    def __init__(self, source, name="<template>"):
+        self.name = name
+        self.source = source
+        code = self._compile(source)
+        namespace = {"_lookup": _lookup, "_text": _text}
+        exec(compile(code, name, "exec"), namespace)
+        self._render = namespace["render"]
+
+    def render(self, context=None, **kwargs):
+        """Render with a context dict (and/or keyword values) and return the text."""
+        ctx = dict(context or {})
+        ctx.update(kwargs)
+        return self._render(ctx)
+
+    def _expr(self, text, loops, line):
+        """Python expression for a template expression: [not] dotted.path"""
+        negate = False
+        text = text.strip()
+        if text.startswith("not "):
+            negate, text = True, text[4:].strip()
+        if not _PATH.match(text):
+            raise TemplateError(f"{self.name}:{line}: bad expression {text!r}")
+        root, *rest = text.split(".")
+        base = f"l_{root}" if root in loops else f"ctx.get({root!r})"
+        expr = f"_lookup({base}, {tuple(rest)!r})" if rest else base
+        return f"(not {expr})" if negate else expr
+
+    def _compile(self, source):
+        lines = ["def render(ctx):", "    out = []", "    append = out.append"]
+        stack = []  # open blocks: (keyword, line number)
+        loops = []
+        line = 1
+        for token in _TOKEN.split(source):
+            indent = "    " * (len(stack) + 1)
+            if token.startswith("{#"):
+                pass
+            elif token.startswith("{{"):
+                expr, _, filt = token[2:-2].partition("|")
+                filt = filt.strip()
+                if filt not in ("", "raw"):
+                    raise TemplateError(f"{self.name}:{line}: unknown filter {filt!r}")
+                lines.append(f"{indent}append(_text({self._expr(expr, loops, line)}, {filt == 'raw'}))")
+            elif token.startswith("{%"):
+                words = token[2:-2].split(None, 1)
+                keyword, arg = (words + ["", ""])[:2] if words else ("", "")
+                if keyword == "if":
+                    lines.append(f"{indent}if {self._expr(arg, loops, line)}:")
+                    stack.append(("if", line))
+                elif keyword in ("elif", "else"):
+                    if not stack or stack[-1][0] != "if":
+                        raise TemplateError(f"{self.name}:{line}: {keyword} outside if")
+                    outer = "    " * len(stack)
+                    lines.append(f"{indent}pass")
+                    lines.append(f"{outer}elif {self._expr(arg, loops, line)}:" if keyword == "elif" else f"{outer}else:")
+                elif keyword == "for":
+                    m = re.match(r"^(\w+)\s+in\s+(.+)$", arg.strip())
+                    if not m:
+                        raise TemplateError(f"{self.name}:{line}: expected 'for name in list'")
+                    lines.append(f"{indent}for l_{m.group(1)} in {self._expr(m.group(2), loops, line)} or ():")
+                    loops.append(m.group(1))
+                    stack.append(("for", line))
+                elif keyword in ("endif", "endfor"):
+                    if not stack or stack[-1][0] != keyword[3:]:
+                        raise TemplateError(f"{self.name}:{line}: unexpected {keyword}")
+                    lines.append(f"{indent}pass")
+                    if stack.pop()[0] == "for":
+                        loops.pop()
+                else:
+                    raise TemplateError(f"{self.name}:{line}: unknown tag {keyword!r}")
+            elif token:
+                lines.append(f"{indent}append({token!r})")
+            line += token.count("\n")
+        if stack:
+            keyword, opened = stack[-1]
+            raise TemplateError(f"{self.name}:{opened}: {keyword} is never closed")
+        lines.append("    return ''.join(out)")
+        return "\n".join(lines)
+
+
+# --- Cache ---
+_lock = threading.Lock()
+_templates = {}  # path -> (mtime, Template)
+_rules = {}  # path -> (mtime, rules dict)
+
+
+def _resolve(name, directory):
+    return name if os.path.isabs(name) else os.path.join(directory, name)
+
+
+def get_template(name=DEFAULT_TEMPLATE, directory=TEMPLATE_DIR):
+    """Compiled template by file name (or absolute path), compiled on first use or when the file changed."""
+    path = _resolve(name, directory)
+    mtime = os.path.getmtime(path)
+    with _lock:
+        cached = _templates.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+    with open(path, encoding="utf-8") as f:
+        template = Template(f.read(), name=path)
+    with _lock:
+        _templates[path] = (mtime, template)
+    return template
+
+
+def load_rules(name=DEFAULT_RULES, directory=TEMPLATE_DIR):
+    """Reference ranges and conclusion rules table (JSON), cached like templates."""
+    path = _resolve(name, directory)
+    mtime = os.path.getmtime(path)
+    with _lock:
+        cached = _rules.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1]
+    with open(path, encoding="utf-8") as f:
+        rules = json.load(f)
+    with _lock:
+        _rules[path] = (mtime, rules)
+    return rules
+
+
+def clear_cache():
+    with _lock:
+        _templates.clear()
+        _rules.clear()
+
+
+# --- Rules ---
+def _matches(rule, value):
+    """A rule applies when value is within its optional inclusive min/max bounds."""
+    if value is None:
+        return "min" not in rule and "max" not in rule
+    return ("min" not in rule or value >= rule["min"]) and ("max" not in rule or value <= rule["max"])
+
+
+def observed_rows(metrics, rules):
+    """
+    Observed values table rows from the rules' "observed" list.
+    Returns:
+        list of dicts with label, value (with unit) and range
+    """
+    rows = []
+    for row in rules.get("observed", []):
+        value = metrics.get(row["metric"])
+        if value is None:
+            text = row.get("missing", "")
+        else:
+            text = f"{value} {row['unit']}" if row.get("unit") else value
+        rows.append({"label": row["label"], "value": text, "range": row.get("range", "")})
+    return rows
+
+
+def conclusions(metrics, rules):
+    """
+    Evaluate the conclusion rules: for each metric in the "conclusions"
+    list the first rule whose bounds contain the value gives the sentence.
+    Metrics are numbered by their position in the list, whether or not a
+    rule matched.
+    Returns:
+        list of dicts with number, metric, text and abnormal
+    """
+    out = []
+    for number, entry in enumerate(rules.get("conclusions", []), 1):
+        value = metrics.get(entry["metric"])
+        for rule in entry["rules"]:
+            if _matches(rule, value):
+                out.append({"number": number, "metric": entry["metric"], "text": rule["text"],
+                            "abnormal": bool(rule.get("abnormal"))})
+                break
+    return out
+
+
+def render_report(context, template=DEFAULT_TEMPLATE, rules=DEFAULT_RULES, directory=TEMPLATE_DIR):
+    """
+    Render a report template.
+    Args:
+        context: Dict with "metrics" (HR, PR, ... as numbers) and any other
+            values the template uses
+        template, rules: File names in directory, or absolute paths
+    Returns:
+        HTML text
+    """
+    table = load_rules(rules, directory)
+    metrics = context.get("metrics", {})
+    ctx = dict(context)
+    ctx["observed"] = observed_rows(metrics, table)
+    ctx["conclusions"] = conclusions(metrics, table)
+    return get_template(template, directory).render(ctx)
@@ -0,0 +1,163 @@
+import os
+import json
+import bisect
+import numpy as np
+from ecg.session_store import (
+    SessionReader, CHUNK_TABLE_DTYPE, CHUNK_HEADER_DTYPE, HEADER_SIZE
+)
+from utils.logs import get_logger
+
+log = get_logger("session_index")
+
+# --- Sidecar index (<session>.idx, an uncompressed .npz) ---
+# chunks       CHUNK_TABLE_DTYPE rows: index, n_samples, nbytes, t_start, t_end, file offset
+# sample_start first sample of every chunk (cumulative n_samples)
+# event_*      events sorted by start sample: start/end samples plus kind and
+#              label ids into the JSON vocabulary stored in event_vocab
+#
+# Sample -> chunk and wall-clock time -> sample lookups are binary searches
+# over these arrays, so seeking in a 24 h recording never touches the data.
+
+INDEX_EXT = ".idx"
+
+EVENT_ARRHYTHMIA = "arrhythmia"
+EVENT_ANNOTATION = "annotation"
+EVENT_BEAT = "beat"
+
+
+def index_path(session_path):
+    return os.path.splitext(session_path)[0] + INDEX_EXT
+
+
+class SessionIndex:
+    """
+    Sample/time -> chunk lookup table plus an event index for one session.
+    Args:
+        chunks: CHUNK_TABLE_DTYPE array describing the session's chunks
+        fs: Sampling frequency (Hz)
+        events: Optional list of {"start", "end", "kind", "label"} dicts
+    """
+    def __init__(self, chunks, fs, events=None):
+        self.chunks = np.asarray(chunks, dtype=CHUNK_TABLE_DTYPE)
+        self.fs = fs
+        counts = self.chunks["n_samples"].astype(np.int64)
+        self.sample_start = np.concatenate(([0], np.cumsum(counts)[:-1])) if len(counts) else np.zeros(0, np.int64)
+        self.n_samples = int(counts.sum())
+        self.events = sorted(
+            ({"start": int(ev["start"]), "end": int(ev.get("end", ev["start"])),
+              "kind": ev.get("kind", EVENT_ANNOTATION), "label": ev.get("label", "")} for ev in events or []),
+            key=lambda ev: ev["start"])
+        self._event_starts = [ev["start"] for ev in self.events]
+        self._max_span = max((ev["end"] - ev["start"] for ev in self.events), default=0)
+
+    @classmethod
+    def build(cls, reader, events=None):
+        """Index an open SessionReader (scans chunk headers if the session is compressed)."""
+        return cls(reader.chunk_table(), reader.fs, events)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as f:
+            chunks = f["chunks"]
+            fs = float(f["fs"])
+            vocab = json.loads(str(f["event_vocab"]))
+            kinds, labels = vocab["kinds"], vocab["labels"]
+            events = [{"start": int(s), "end": int(e), "kind": kinds[k], "label": labels[l]}
+                      for s, e, k, l in zip(f["event_start"], f["event_end"], f["event_kind"], f["event_label"])]
+        return cls(chunks, fs, events)
+
+    def save(self, path):
+        kinds = sorted({e["kind"] for e in self.events})
+        labels = sorted({e["label"] for e in self.events})
+        kind_ids = {k: i for i, k in enumerate(kinds)}
+        label_ids = {l: i for i, l in enumerate(labels)}
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, chunks=self.chunks, sample_start=self.sample_start, fs=np.float64(self.fs),
+                     event_start=np.array([e["start"] for e in self.events], dtype=np.int64),
+                     event_end=np.array([e["end"] for e in self.events], dtype=np.int64),
+                     event_kind=np.array([kind_ids[e["kind"]] for e in self.events], dtype=np.int32),
+                     event_label=np.array([label_ids[e["label"]] for e in self.events], dtype=np.int32),
+                     event_vocab=np.array(json.dumps({"kinds": kinds, "labels": labels})))
+        os.replace(tmp, path)
+
+    def matches(self, session_path):
+        """True if the index describes the session file as it is on disk."""
+        if not os.path.exists(session_path):
+            return False
+        if len(self.chunks) == 0:
+            return os.path.getsize(session_path) <= HEADER_SIZE
+        last = self.chunks[-1]
+        end = int(last["offset"]) + CHUNK_HEADER_DTYPE.itemsize + int(last["nbytes"])
+        return end == os.path.getsize(session_path)
+
+    # --- Lookups ---
+    def locate(self, sample):
+        """(chunk number, offset within chunk) holding the given sample."""
+        if not len(self.chunks):
+            raise IndexError("Session is empty")
+        sample = min(max(int(sample), 0), self.n_samples - 1)
+        chunk = int(np.searchsorted(self.sample_start, sample, side="right")) - 1
+        return chunk, sample - int(self.sample_start[chunk])
+
+    def sample_at_time(self, t):
+        """Sample index recorded at wall-clock time t (seconds since the epoch)."""
+        if not len(self.chunks):
+            return 0
+        chunk = max(int(np.searchsorted(self.chunks["t_start"], t, side="right")) - 1, 0)
+        offset = int(round((t - self.chunks["t_start"][chunk]) * self.fs))
+        offset = min(max(offset, 0), int(self.chunks["n_samples"][chunk]) - 1)
+        return int(self.sample_start[chunk]) + offset
+
+    def time_at_sample(self, sample):
+        chunk, offset = self.locate(sample)
+        return float(self.chunks["t_start"][chunk]) + offset / float(self.fs)
+
+    @property
+    def start_time(self):
+        return float(self.chunks["t_start"][0]) if len(self.chunks) else 0.0
+
+    # --- Events ---
+    def add_event(self, start, end, kind, label=""):
+        ev = {"start": int(start), "end": int(end), "kind": kind, "label": label}
+        pos = bisect.bisect_right(self._event_starts, ev["start"])
+        self._event_starts.insert(pos, ev["start"])
+        self.events.insert(pos, ev)
+        self._max_span = max(self._max_span, ev["end"] - ev["start"])
+        return ev
+
+    def events_between(self, start, stop, kind=None):
+        """Events overlapping [start, stop), optionally filtered by kind."""
+        lo = bisect.bisect_left(self._event_starts, start - self._max_span)
+        hi = bisect.bisect_left(self._event_starts, stop)
+        found = [ev for ev in self.events[lo:hi] if ev["end"] >= start]
+        if kind is not None:
+            found = [ev for ev in found if ev["kind"] == kind]
+        return found
+
+
+def open_session(session_path):
+    """
+    Open a session together with its sidecar index.
+    A missing or stale index (e.g. after a crash) is rebuilt from the
+    chunk headers and saved next to the session.
+    Returns:
+        (SessionReader, SessionIndex)
+    """
+    path = index_path(session_path)
+    index = None
+    if os.path.exists(path):
+        try:
+            index = SessionIndex.load(path)
+        except Exception as e:
+            log.warning("Could not load session index, rebuilding: %s", e)
+            index = None
+    if index is not None and index.matches(session_path):
+        return SessionReader(session_path, table=index.chunks), index
+    reader = SessionReader(session_path)
+    rebuilt = SessionIndex.build(reader, events=index.events if index else None)
+    try:
+        rebuilt.save(path)
+    except OSError as e:
+        log.warning("Could not save session index: %s", e)
+    return reader, rebuilt
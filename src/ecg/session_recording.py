@@ -0,0 +1,117 @@
+import os
+import time
+import shutil
+from ecg.session_store import SessionWriter, new_session_id, DEFAULT_FS, DEFAULT_GAIN, RECORDINGS_DIR, SESSION_EXT
+from ecg.session_index import SessionIndex, index_path, EVENT_ARRHYTHMIA, EVENT_ANNOTATION
+from ecg.journal import AcquisitionJournal, journal_path, DEFAULT_FSYNC_INTERVAL
+from ecg.catalog import default_catalog
+from utils.logs import get_logger
+
+# --- Session recording ---
+# Streams an acquisition to a session file (with its crash journal, index
+# and catalog entry). No Qt here: used by the 12-lead page and by the
+# headless acquisition service (ecg/acquisition_service.py).
+
+log = get_logger("recording")
+
+
+class ECGRecording:
+    def __init__(self, directory=RECORDINGS_DIR, codec="raw", fsync_interval=DEFAULT_FSYNC_INTERVAL, catalog=None):
+        self.recording = False
+        self.directory = directory
+        self.codec = codec  # "zlib"/"lzma" trade memmap access for ~2-3x smaller files
+        self.fsync_interval = fsync_interval
+        self.catalog = catalog  # SessionCatalog; the shared default one if None
+        self.session_path = None
+        self.writer = None
+        self.journal = None
+        self.events = []
+        self.metrics = {}
+        self._rhythm = None  # (label, start sample) of the open arrhythmia episode
+
+    def start_recording(self, leads, fs=DEFAULT_FS, patient_id="", gain=DEFAULT_GAIN):
+        self.stop_recording()
+        session_id = new_session_id()
+        self.session_path = os.path.join(self.directory, session_id + SESSION_EXT)
+        # Samples are streamed to disk by a background writer as they arrive
+        self.events = []
+        self.metrics = {}
+        self._rhythm = None
+        self.writer = SessionWriter(self.session_path, leads, fs=fs, patient_id=patient_id,
+                                    session_id=session_id, gain=gain, codec=self.codec)
+        # Crash safety: the journal is fsynced every fsync_interval seconds and
+        # replayed by recover_journals() on the next start if we never stop cleanly
+        header = dict(self.writer.header, session_path=self.session_path)
+        self.journal = AcquisitionJournal(journal_path(self.session_path), header,
+                                          fsync_interval=self.fsync_interval)
+        self.recording = True
+
+    def add_sample(self, values, timestamp=None):
+        if self.recording and self.writer:
+            if timestamp is None:
+                timestamp = time.time()
+            self.writer.append(values, timestamp)
+            self.journal.append(values, timestamp)
+
+    @property
+    def sample_count(self):
+        if not self.writer:
+            return 0
+        return self.writer.n_samples
+
+    def annotate(self, label, start=None, end=None, kind=EVENT_ANNOTATION):
+        if not self.recording:
+            return
+        start = self.sample_count if start is None else start
+        self.events.append({"start": start, "end": start if end is None else end, "kind": kind, "label": label})
+
+    def update_metrics(self, metrics):
+        """Keep the latest measurements (HR, PR, QRS, QT, QTc, QRS_axis, ST) for the catalog."""
+        if self.recording:
+            self.metrics.update({k: v for k, v in metrics.items() if v is not None})
+
+    def mark_rhythm(self, label):
+        """Track arrhythmia episodes: a new label closes the previous episode."""
+        if not self.recording:
+            return
+        normal = label in (None, "", "--", "None Detected", "Detecting...")
+        if self._rhythm and self._rhythm[0] == label:
+            return
+        self._close_rhythm()
+        if not normal:
+            self._rhythm = (label, self.sample_count)
+
+    def _close_rhythm(self):
+        if self._rhythm:
+            label, start = self._rhythm
+            self.events.append({"start": start, "end": self.sample_count, "kind": EVENT_ARRHYTHMIA, "label": label})
+            self._rhythm = None
+
+    def stop_recording(self):
+        if self.writer:
+            self._close_rhythm()
+        self.recording = False
+        if self.writer:
+            writer, self.writer = self.writer, None
+            writer.close()
+            index = SessionIndex(writer.chunk_table(), writer.fs, self.events)
+            try:
+                index.save(index_path(self.session_path))
+            except OSError as e:
+                log.warning("Could not write session index: %s", e)
+            try:
+                (self.catalog or default_catalog()).add_session_file(self.session_path, self.metrics, index)
+            except Exception as e:
+                log.warning("Could not add session to catalog: %s", e)
+        if self.journal:
+            journal, self.journal = self.journal, None
+            journal.close(remove=True)
+
+    def save_recording(self, filename):
+        if not self.recording and self.session_path and os.path.exists(self.session_path):
+            if os.path.abspath(filename) != os.path.abspath(self.session_path):
+                shutil.copyfile(self.session_path, filename)
+                if os.path.exists(index_path(self.session_path)):
+                    shutil.copyfile(index_path(self.session_path), index_path(filename))
+        else:
+            raise Exception("Recording is still in progress or no data to save.")
@@ -0,0 +1,454 @@
+import os
+import json
+import lzma
+import time
+import zlib
+import uuid
+import queue
+import threading
+import numpy as np
+
+# --- Session file layout ---
+# [HEADER_SIZE bytes]  MAGIC + uint32 length + JSON header, zero padded
+# [chunk record] * N   CHUNK_HEADER_DTYPE followed by the int16 payload
+#
+# Every chunk holds chunk_samples frames for all leads stored lead-major
+# (n_leads x chunk_samples). The last chunk may be partially filled, its
+# n_samples field tells how many frames are valid. Uncompressed sessions
+# have fixed-size records so the whole file can be opened with np.memmap.
+#
+# Compressed sessions ("zlib"/"lzma" codec in the header) store each chunk
+# as an n-th order difference along time, split into low/high byte planes
+# and passed through the codec. Differencing restarts in every chunk so any
+# chunk decodes on its own; nbytes gives the size of the payload.
+
+MAGIC = b"ECGSESS1"
+CHUNK_MAGIC = b"CHNK"
+HEADER_SIZE = 4096
+FORMAT_VERSION = 1
+DEFAULT_FS = 500
+DEFAULT_GAIN = 1.0  # ADC counts per mV
+DEFAULT_CHUNK_SAMPLES = 2500  # 5 s at 500 Hz
+SESSION_EXT = ".ecgs"
+CODECS = ("raw", "zlib", "lzma")
+DEFAULT_DELTA_ORDER = 1
+RECORDINGS_DIR = "recordings"
+
+# Lead layout shared by the acquisition service, the test page and the
+# simulated device
+STANDARD_LEADS = ["I", "II", "III", "aVR", "aVL", "aVF", "V1", "V2", "V3", "V4", "V5", "V6"]
+# Channel order of the acquisition board's text protocol: one line per frame
+# of eight space-separated integers (the other limb leads are derived from
+# I and II, see ecg.acquisition_service.derive_leads).
+DEVICE_CHANNELS = ["I", "V4", "V5", "II", "V3", "V6", "V1", "V2"]
+
+CHUNK_HEADER_DTYPE = np.dtype([
+    ("magic", "S4"),
+    ("index", "<u4"),
+    ("n_samples", "<u4"),
+    ("nbytes", "<u4"),
+    ("t_start", "<f8"),
+    ("t_end", "<f8"),
+])
+
+CHUNK_TABLE_DTYPE = np.dtype([
+    ("index", "<u4"),
+    ("n_samples", "<u4"),
+    ("nbytes", "<u4"),
+    ("t_start", "<f8"),
+    ("t_end", "<f8"),
+    ("offset", "<i8"),
+])
+
+INT16_MIN = np.iinfo(np.int16).min
+INT16_MAX = np.iinfo(np.int16).max
+
+
+class SessionFormatError(Exception):
+    pass
+
+
+def new_session_id():
+    return time.strftime("%Y%m%d-%H%M%S") + "-" + uuid.uuid4().hex[:6]
+
+
+def chunk_record_dtype(n_leads, chunk_samples):
+    """Structured dtype of one uncompressed chunk record (header + payload)."""
+    return np.dtype(CHUNK_HEADER_DTYPE.descr + [("data", "<i2", (n_leads, chunk_samples))])
+
+
+def to_int16(values):
+    return np.clip(np.rint(values), INT16_MIN, INT16_MAX).astype(np.int16)
+
+
+def delta_encode(data, order):
+    """n-th order difference along time in wrapping int16 arithmetic (lossless)."""
+    out = np.array(data, dtype=np.int16)
+    for _ in range(order):
+        out[:, 1:] = np.diff(out, axis=1)
+    return out
+
+
+def delta_decode(data, order):
+    out = np.array(data, dtype=np.int16)
+    for _ in range(order):
+        np.cumsum(out, axis=1, dtype=np.int16, out=out)
+    return out
+
+
+def encode_chunk(data, codec="raw", delta_order=DEFAULT_DELTA_ORDER, level=None):
+    """Encode one (n_leads, chunk_samples) int16 chunk into a payload."""
+    if codec == "raw":
+        return np.ascontiguousarray(data, dtype="<i2").tobytes()
+    planes = delta_encode(data, delta_order).astype("<i2").view(np.uint8).reshape(-1, 2)
+    # Low bytes first, then high bytes: small deltas leave the high plane near-constant
+    shuffled = np.ascontiguousarray(planes.T).tobytes()
+    if codec == "zlib":
+        return zlib.compress(shuffled, 6 if level is None else level)
+    if codec == "lzma":
+        return lzma.compress(shuffled, preset=6 if level is None else level)
+    raise SessionFormatError(f"Unknown codec {codec!r}")
+
+
+def decode_chunk(payload, n_leads, chunk_samples, codec="raw", delta_order=DEFAULT_DELTA_ORDER):
+    """Inverse of encode_chunk; returns an (n_leads, chunk_samples) int16 array."""
+    if codec == "raw":
+        return np.frombuffer(payload, dtype="<i2").reshape(n_leads, chunk_samples)
+    if codec == "zlib":
+        raw = zlib.decompress(payload)
+    elif codec == "lzma":
+        raw = lzma.decompress(payload)
+    else:
+        raise SessionFormatError(f"Unknown codec {codec!r}")
+    planes = np.frombuffer(raw, dtype=np.uint8).reshape(2, -1)
+    data = np.ascontiguousarray(planes.T).view("<i2").reshape(n_leads, chunk_samples)
+    return delta_decode(data, delta_order)
+
+
+def _write_header(f, header):
+    payload = json.dumps(header).encode("utf-8")
+    if len(MAGIC) + 4 + len(payload) > HEADER_SIZE:
+        raise SessionFormatError("Session header too large")
+    block = bytearray(HEADER_SIZE)
+    block[:len(MAGIC)] = MAGIC
+    block[len(MAGIC):len(MAGIC) + 4] = np.uint32(len(payload)).tobytes()
+    block[len(MAGIC) + 4:len(MAGIC) + 4 + len(payload)] = payload
+    f.write(bytes(block))
+
+
+def read_header(path):
+    with open(path, "rb") as f:
+        block = f.read(HEADER_SIZE)
+    if len(block) < HEADER_SIZE or not block.startswith(MAGIC):
+        raise SessionFormatError(f"{path} is not an ECG session file")
+    length = int(np.frombuffer(block[len(MAGIC):len(MAGIC) + 4], dtype="<u4")[0])
+    return json.loads(block[len(MAGIC) + 4:len(MAGIC) + 4 + length].decode("utf-8"))
+
+
+class SessionWriter:
+    """
+    Append-only writer for chunked ECG session files.
+    Frames are collected into a preallocated int16 chunk on the caller's
+    thread; full chunks are handed to a background thread which writes them
+    to disk. The queue is bounded so memory stays constant however long the
+    session runs.
+    Args:
+        path: Output file (.ecgs)
+        leads: Lead names in storage order
+        fs: Sampling frequency (Hz)
+        gain: ADC counts per mV, stored in the header for readers
+        codec: "raw" (memmap-able), "zlib" or "lzma" (lossless, per chunk)
+        delta_order: Difference order applied before a compressing codec
+    """
+    def __init__(self, path, leads, fs=DEFAULT_FS, patient_id="", session_id=None, gain=DEFAULT_GAIN,
+                 chunk_samples=DEFAULT_CHUNK_SAMPLES, start_time=None, queue_size=16,
+                 codec="raw", delta_order=DEFAULT_DELTA_ORDER, level=None):
+        if codec not in CODECS:
+            raise ValueError(f"Unknown codec {codec!r}, expected one of {CODECS}")
+        self.path = path
+        self.codec = codec
+        self.delta_order = delta_order
+        self.level = level
+        self.leads = list(leads)
+        self.fs = fs
+        self.gain = gain
+        self.chunk_samples = chunk_samples
+        self.session_id = session_id or new_session_id()
+        self.patient_id = patient_id
+        self.start_time = time.time() if start_time is None else start_time
+        self.header = {
+            "version": FORMAT_VERSION,
+            "fs": fs,
+            "leads": self.leads,
+            "patient_id": patient_id,
+            "session_id": self.session_id,
+            "gain": gain,
+            "chunk_samples": chunk_samples,
+            "start_time": self.start_time,
+            "codec": codec,
+            "delta_order": delta_order,
+        }
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "wb")
+        _write_header(self._file, self.header)
+        self._chunk = np.zeros((len(self.leads), chunk_samples), dtype=np.int16)
+        self._fill = 0
+        self._t_first = None
+        self._t_last = None
+        self.chunks_written = 0
+        self.samples_written = 0
+        self._error = None
+        self._closed = False
+        self._table_rows = []  # filled by the writer thread, see chunk_table()
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(target=self._run, name="SessionWriter", daemon=True)
+        self._thread.start()
+
+    def append(self, values, timestamp=None):
+        """Append one frame (one value per lead, in lead order)."""
+        self._check()
+        if timestamp is None:
+            timestamp = time.time()
+        if self._fill == 0:
+            self._t_first = timestamp
+        self._chunk[:, self._fill] = to_int16(values)
+        self._t_last = timestamp
+        self._fill += 1
+        if self._fill == self.chunk_samples:
+            self._flush_chunk()
+
+    def append_block(self, block, t_start=None):
+        """Append an (n_leads, n) block of consecutive frames starting at t_start."""
+        self._check()
+        block = np.asarray(block)
+        if block.ndim != 2 or block.shape[0] != len(self.leads):
+            raise ValueError(f"Expected block of shape ({len(self.leads)}, n), got {block.shape}")
+        if t_start is None:
+            t_start = time.time()
+        pos = 0
+        n = block.shape[1]
+        while pos < n:
+            take = min(self.chunk_samples - self._fill, n - pos)
+            if self._fill == 0:
+                self._t_first = t_start + pos / self.fs
+            self._chunk[:, self._fill:self._fill + take] = to_int16(block[:, pos:pos + take])
+            self._fill += take
+            pos += take
+            self._t_last = t_start + (pos - 1) / self.fs
+            if self._fill == self.chunk_samples:
+                self._flush_chunk()
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        if self._fill:
+            self._flush_chunk()
+        self._queue.put(None)
+        self._thread.join()
+        self._file.close()
+        if self._error is not None:
+            raise self._error
+
+    @property
+    def n_samples(self):
+        """Frames appended so far, including the partially filled chunk."""
+        return self.samples_written + self._fill
+
+    def chunk_table(self):
+        """Table of the chunks written so far (CHUNK_TABLE_DTYPE), e.g. for a sidecar index."""
+        return np.array(list(self._table_rows), dtype=CHUNK_TABLE_DTYPE)
+
+    def _check(self):
+        if self._closed:
+            raise ValueError("Session writer is closed")
+        if self._error is not None:
+            raise self._error
+
+    def _flush_chunk(self):
+        n = self._fill
+        data = self._chunk.copy()
+        if n < self.chunk_samples:
+            data[:, n:] = 0
+        self._queue.put((self.chunks_written, n, self._t_first, self._t_last, data))
+        self.chunks_written += 1
+        self.samples_written += n
+        self._fill = 0
+
+    def _encode(self, data):
+        return encode_chunk(data, self.codec, self.delta_order, self.level)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            if self._error is not None:
+                continue
+            index, n, t_start, t_end, data = item
+            try:
+                payload = self._encode(data)
+                head = np.zeros(1, dtype=CHUNK_HEADER_DTYPE)
+                head["magic"] = CHUNK_MAGIC
+                head["index"] = index
+                head["n_samples"] = n
+                head["nbytes"] = len(payload)
+                head["t_start"] = t_start
+                head["t_end"] = t_end
+                offset = self._file.tell()
+                self._file.write(head.tobytes())
+                self._file.write(payload)
+                self._table_rows.append((index, n, len(payload), t_start, t_end, offset))
+            except Exception as e:
+                self._error = e
+        try:
+            self._file.flush()
+        except Exception as e:
+            self._error = self._error or e
+
+
+class SessionReader:
+    """
+    Random-access reader for session files written by SessionWriter.
+    Only the header is read up front; raw sessions are served from an
+    np.memmap so multi-hour recordings open instantly, compressed ones
+    decode just the chunks a read touches.
+    Args:
+        path: Session file (.ecgs)
+        table: Optional chunk table (e.g. from the sidecar index) which
+            saves scanning the chunk headers of compressed sessions
+    """
+    def __init__(self, path, table=None):
+        self.path = path
+        self.header = read_header(path)
+        self.fs = self.header["fs"]
+        self.leads = list(self.header["leads"])
+        self.gain = self.header.get("gain", DEFAULT_GAIN)
+        self.chunk_samples = self.header["chunk_samples"]
+        self.patient_id = self.header.get("patient_id", "")
+        self.session_id = self.header.get("session_id", "")
+        self.start_time = self.header.get("start_time", 0.0)
+        self.codec = self.header.get("codec", "raw")
+        self.delta_order = self.header.get("delta_order", DEFAULT_DELTA_ORDER)
+        self.compressed = self.codec != "raw"
+        self.record_dtype = chunk_record_dtype(len(self.leads), self.chunk_samples)
+        self._records = None
+        self._table = None
+        self._file = None
+        if self.compressed:
+            self._table = self._scan_chunks() if table is None else table
+            self.n_chunks = len(self._table)
+        else:
+            size = os.path.getsize(path) - HEADER_SIZE
+            # A trailing partial record (e.g. after a crash) is ignored
+            self.n_chunks = max(size, 0) // self.record_dtype.itemsize
+            if table is not None and len(table) == self.n_chunks:
+                self._table = table
+
+    def _scan_chunks(self):
+        """Walk the chunk headers of a compressed session, returning (header, offset) rows."""
+        rows = []
+        size = os.path.getsize(self.path)
+        offset = HEADER_SIZE
+        with open(self.path, "rb") as f:
+            while offset + CHUNK_HEADER_DTYPE.itemsize <= size:
+                f.seek(offset)
+                head = np.frombuffer(f.read(CHUNK_HEADER_DTYPE.itemsize), dtype=CHUNK_HEADER_DTYPE)[0]
+                end = offset + CHUNK_HEADER_DTYPE.itemsize + int(head["nbytes"])
+                if head["magic"] != CHUNK_MAGIC or end > size:
+                    break
+                rows.append((head["index"], head["n_samples"], head["nbytes"], head["t_start"], head["t_end"], offset))
+                offset = end
+        return np.array(rows, dtype=CHUNK_TABLE_DTYPE)
+
+    def chunk_table(self):
+        """Per-chunk index, n_samples, nbytes, t_start, t_end and file offset."""
+        if self._table is None:
+            rec = self.memmap()
+            table = np.zeros(self.n_chunks, dtype=CHUNK_TABLE_DTYPE)
+            for name in ("index", "n_samples", "nbytes", "t_start", "t_end"):
+                table[name] = rec[name]
+            table["offset"] = HEADER_SIZE + np.arange(self.n_chunks, dtype=np.int64) * self.record_dtype.itemsize
+            self._table = table
+        return self._table
+
+    def memmap(self):
+        """Structured memmap over all complete chunk records (raw sessions only)."""
+        if self.compressed:
+            raise SessionFormatError("Compressed sessions cannot be memory-mapped")
+        if self._records is None:
+            if self.n_chunks == 0:
+                self._records = np.zeros(0, dtype=self.record_dtype)
+            else:
+                self._records = np.memmap(self.path, dtype=self.record_dtype, mode="r",
+                                          offset=HEADER_SIZE, shape=(self.n_chunks,))
+        return self._records
+
+    @property
+    def n_samples(self):
+        if self.n_chunks == 0:
+            return 0
+        if self.compressed:
+            last = int(self._table["n_samples"][-1])
+        else:
+            last = int(self.memmap()["n_samples"][-1])
+        return (self.n_chunks - 1) * self.chunk_samples + last
+
+    @property
+    def duration(self):
+        return self.n_samples / float(self.fs)
+
+    def lead_index(self, lead):
+        return self.leads.index(lead)
+
+    def chunk(self, i):
+        """Valid (n_leads, n_samples) int16 data of chunk i."""
+        if not self.compressed:
+            rec = self.memmap()[i]
+            return rec["data"][:, :int(rec["n_samples"])]
+        row = self._table[i]
+        if self._file is None:
+            self._file = open(self.path, "rb")
+        self._file.seek(int(row["offset"]) + CHUNK_HEADER_DTYPE.itemsize)
+        payload = self._file.read(int(row["nbytes"]))
+        data = decode_chunk(payload, len(self.leads), self.chunk_samples, self.codec, self.delta_order)
+        return data[:, :int(row["n_samples"])]
+
+    def read(self, start=0, stop=None, leads=None, physical=False):
+        """
+        Read frames [start, stop) for the given leads.
+        Returns an (n_leads, n) array; int16 counts, or float mV if physical.
+        """
+        total = self.n_samples
+        stop = total if stop is None else min(stop, total)
+        start = max(0, start)
+        rows = list(range(len(self.leads))) if leads is None else [self.lead_index(l) for l in leads]
+        out = np.zeros((len(rows), max(stop - start, 0)), dtype=np.int16)
+        if stop <= start:
+            return out.astype(np.float64) if physical else out
+        first = start // self.chunk_samples
+        last = (stop - 1) // self.chunk_samples
+        pos = 0
+        for i in range(first, last + 1):
+            data = self.chunk(i)
+            lo = max(start - i * self.chunk_samples, 0)
+            hi = min(stop - i * self.chunk_samples, data.shape[1])
+            out[:, pos:pos + hi - lo] = data[rows, lo:hi]
+            pos += hi - lo
+        if physical:
+            return out / float(self.gain)
+        return out
+
+    def iter_blocks(self, block_samples=None, leads=None, physical=False):
+        """Yield (start_sample, block) pairs covering the whole session."""
+        block_samples = block_samples or self.chunk_samples
+        total = self.n_samples
+        for start in range(0, total, block_samples):
+            yield start, self.read(start, start + block_samples, leads=leads, physical=physical)
+
+    def close(self):
+        self._records = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,166 @@
+import datetime
+import numpy as np
+from PyQt5.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QSlider, QComboBox, QLineEdit, QMessageBox
+)
+from PyQt5.QtCore import Qt
+from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+from matplotlib.figure import Figure
+from ecg.session_index import open_session, EVENT_BEAT
+
+WINDOW_CHOICES = [5, 10, 30, 60]  # seconds visible at once
+
+
+def format_elapsed(seconds):
+    seconds = int(seconds)
+    return f"{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+def parse_elapsed(text):
+    parts = [float(p) for p in text.strip().split(":")]
+    seconds = 0.0
+    for p in parts:
+        seconds = seconds * 60 + p
+    return seconds
+
+
+class SessionViewer(QWidget):
+    """
+    Browse a recorded session. Only the visible window is read from disk;
+    seeking by elapsed time, wall-clock time or event goes through the
+    sidecar index.
+    """
+    def __init__(self, session_path, parent=None):
+        super().__init__(parent)
+        self.reader, self.index = open_session(session_path)
+        self.fs = self.reader.fs
+        self.window_s = WINDOW_CHOICES[1]
+        self.start = 0
+        self._spans = []
+        self.setWindowTitle(f"ECG Session - {self.reader.session_id}")
+        self.setStyleSheet("background: #000; color: #00ff00;")
+        self.resize(1200, 800)
+
+        layout = QVBoxLayout(self)
+        started = datetime.datetime.fromtimestamp(self.index.start_time or self.reader.start_time)
+        info = QLabel(f"Patient: {self.reader.patient_id or '--'}    Started: {started:%Y-%m-%d %H:%M:%S}    "
+                      f"Duration: {format_elapsed(self.index.n_samples / self.fs)}")
+        info.setStyleSheet("color: #ff6600; font-size: 14px; font-weight: bold;")
+        layout.addWidget(info)
+
+        self.fig = Figure(facecolor='#000', figsize=(12, len(self.reader.leads) * 0.8))
+        self.axes = []
+        self.lines = []
+        for i, lead in enumerate(self.reader.leads):
+            ax = self.fig.add_subplot(len(self.reader.leads), 1, i + 1)
+            ax.set_facecolor('#000')
+            ax.set_xticks([])
+            ax.set_yticks([])
+            for spine in ax.spines.values():
+                spine.set_visible(False)
+            ax.set_ylabel(lead, color='#00ff00', fontsize=10, rotation=0, labelpad=20)
+            line, = ax.plot([], [], color="#00ff00", lw=1)
+            self.axes.append(ax)
+            self.lines.append(line)
+        self.fig.subplots_adjust(left=0.05, right=0.99, top=0.99, bottom=0.01, hspace=0.05)
+        self.canvas = FigureCanvas(self.fig)
+        layout.addWidget(self.canvas)
+
+        self.slider = QSlider(Qt.Horizontal)
+        self.slider.valueChanged.connect(lambda v: self.show_sample(v * self.fs))
+        layout.addWidget(self.slider)
+
+        controls = QHBoxLayout()
+        self.position_label = QLabel()
+        controls.addWidget(self.position_label)
+        controls.addStretch(1)
+        controls.addWidget(QLabel("Window:"))
+        self.window_combo = QComboBox()
+        self.window_combo.addItems([f"{w} s" for w in WINDOW_CHOICES])
+        self.window_combo.setCurrentIndex(WINDOW_CHOICES.index(self.window_s))
+        self.window_combo.currentIndexChanged.connect(self.set_window)
+        controls.addWidget(self.window_combo)
+        controls.addWidget(QLabel("Go to:"))
+        self.goto_edit = QLineEdit()
+        self.goto_edit.setPlaceholderText("elapsed hh:mm:ss or clock YYYY-MM-DD hh:mm:ss")
+        self.goto_edit.returnPressed.connect(self.go_to_text)
+        controls.addWidget(self.goto_edit)
+        controls.addWidget(QLabel("Events:"))
+        self.event_combo = QComboBox()
+        self._events = [ev for ev in self.index.events if ev["kind"] != EVENT_BEAT]
+        self.event_combo.addItem(f"{len(self._events)} events")
+        for ev in self._events:
+            self.event_combo.addItem(f"{format_elapsed(ev['start'] / self.fs)}  {ev['label']}")
+        self.event_combo.currentIndexChanged.connect(self.go_to_event)
+        controls.addWidget(self.event_combo)
+        layout.addLayout(controls)
+
+        self._update_slider()
+        self.show_sample(0)
+
+    def _update_slider(self):
+        last = max(int((self.index.n_samples / self.fs) - self.window_s), 0)
+        self.slider.blockSignals(True)
+        self.slider.setRange(0, last)
+        self.slider.setPageStep(self.window_s)
+        self.slider.blockSignals(False)
+
+    def set_window(self, idx):
+        self.window_s = WINDOW_CHOICES[idx]
+        self._update_slider()
+        self.show_sample(self.start)
+
+    def show_sample(self, sample):
+        n = int(self.window_s * self.fs)
+        self.start = int(min(max(sample, 0), max(self.index.n_samples - n, 0)))
+        block = self.reader.read(self.start, self.start + n, physical=True)
+        x = np.arange(block.shape[1])
+        for i, line in enumerate(self.lines):
+            y = block[i] - (np.mean(block[i]) if block.shape[1] else 0)
+            line.set_data(x, y)
+            ax = self.axes[i]
+            ax.set_xlim(0, max(n - 1, 1))
+            span = np.max(np.abs(y)) if len(y) else 0
+            ax.set_ylim(-(span or 1) * 1.1, (span or 1) * 1.1)
+        for artist in self._spans:
+            artist.remove()
+        self._spans = []
+        for ev in self.index.events_between(self.start, self.start + n):
+            if ev["kind"] == EVENT_BEAT:
+                continue
+            lo = max(ev["start"], self.start) - self.start
+            hi = min(max(ev["end"], ev["start"] + 1), self.start + n) - self.start
+            for ax in self.axes:
+                self._spans.append(ax.axvspan(lo, hi, color="#ff6600", alpha=0.25))
+        self.slider.blockSignals(True)
+        self.slider.setValue(int(self.start / self.fs))
+        self.slider.blockSignals(False)
+        clock = datetime.datetime.fromtimestamp(self.index.time_at_sample(self.start)) if self.index.n_samples else None
+        self.position_label.setText(f"{format_elapsed(self.start / self.fs)}"
+                                    + (f"  ({clock:%H:%M:%S})" if clock else ""))
+        self.canvas.draw_idle()
+
+    def show_time(self, t):
+        """Show the window starting at wall-clock time t (seconds since the epoch)."""
+        self.show_sample(self.index.sample_at_time(t))
+
+    def go_to_text(self):
+        text = self.goto_edit.text().strip()
+        try:
+            if "-" in text:
+                self.show_time(datetime.datetime.strptime(text, "%Y-%m-%d %H:%M:%S").timestamp())
+            else:
+                self.show_sample(parse_elapsed(text) * self.fs)
+        except ValueError:
+            QMessageBox.warning(self, "Go to", "Use hh:mm:ss (elapsed) or YYYY-MM-DD hh:mm:ss (clock time).")
+
+    def go_to_event(self, idx):
+        if idx <= 0:
+            return
+        ev = self._events[idx - 1]
+        # Put the event a second into the window so its onset is visible
+        self.show_sample(ev["start"] - self.fs)
+
+    def closeEvent(self, event):
+        self.reader.close()
+        super().closeEvent(event)
@@ -0,0 +1,189 @@
+import time
+import collections
+import numpy as np
+from ecg.session_store import STANDARD_LEADS, DEVICE_CHANNELS
+
+# Gaussian wave model of one beat: name -> (offset from R in s, width in s, amplitude in mV)
+WAVES = {
+    "P": (-0.16, 0.025, 0.15),
+    "Q": (-0.03, 0.010, -0.12),
+    "R": (0.0, 0.012, 1.2),
+    "S": (0.03, 0.010, -0.25),
+    "T": (0.28, 0.060, 0.35),
+}
+
+# Per-lead scaling of (atrial/repolarisation waves, QRS complex)
+LEAD_WEIGHTS = {
+    "I": (0.6, 0.6), "II": (1.0, 1.0), "III": (0.4, 0.4),
+    "aVR": (-0.8, -0.8), "aVL": (0.1, 0.1), "aVF": (0.7, 0.7),
+    "V1": (0.3, -0.5), "V2": (0.5, -0.2), "V3": (0.7, 0.4),
+    "V4": (0.9, 0.9), "V5": (0.8, 1.0), "V6": (0.6, 0.8),
+}
+
+TEMPLATE_WINDOW = (-0.3, 0.5)  # seconds around R covered by the beat template
+
+
+def beat_template(fs, lead="II"):
+    """One beat for a lead in mV, sampled from TEMPLATE_WINDOW[0] to TEMPLATE_WINDOW[1]."""
+    t = np.arange(int(TEMPLATE_WINDOW[0] * fs), int(TEMPLATE_WINDOW[1] * fs)) / fs
+    pt_weight, qrs_weight = LEAD_WEIGHTS.get(lead, (1.0, 1.0))
+    beat = np.zeros_like(t)
+    for name, (offset, width, amp) in WAVES.items():
+        weight = pt_weight if name in ("P", "T") else qrs_weight
+        beat += weight * amp * np.exp(-0.5 * ((t - offset) / width) ** 2)
+    return beat
+
+
+class SyntheticECG:
+    """
+    Stateful multi-lead ECG generator with known ground truth.
+    Successive generate() calls continue the same signal, so arbitrarily
+    long recordings can be produced block by block. R-peak sample indices
+    of every emitted beat are collected in self.beats.
+    Args:
+        fs: Sampling frequency (Hz)
+        heart_rate: Mean heart rate (bpm)
+        hrv: Standard deviation of RR intervals relative to the mean
+        noise: White noise standard deviation (mV)
+        wander: Baseline wander amplitude (mV)
+        gain: ADC counts per mV of the returned signal
+    """
+    def __init__(self, fs=500, leads=STANDARD_LEADS, heart_rate=72, hrv=0.03, noise=0.02, wander=0.1,
+                 gain=200, seed=0):
+        self.fs = fs
+        self.leads = list(leads)
+        self.heart_rate = heart_rate
+        self.hrv = hrv
+        self.noise = noise
+        self.wander = wander
+        self.gain = gain
+        self.rng = np.random.default_rng(seed)
+        self.templates = np.array([beat_template(fs, lead) for lead in self.leads])
+        self.pre = -int(TEMPLATE_WINDOW[0] * fs)
+        self.position = 0
+        self.beats = []
+        self._next_beat = self.pre
+
+    def _rr(self):
+        rr = 60.0 / self.heart_rate * (1 + self.hrv * self.rng.standard_normal())
+        return max(int(rr * self.fs), int(0.25 * self.fs))
+
+    def generate(self, n):
+        """Next n frames as an (n_leads, n) float array in ADC counts."""
+        start, stop = self.position, self.position + n
+        out = np.zeros((len(self.leads), n))
+        width = self.templates.shape[1]
+        # Schedule beats until one starts past the end of this block
+        while self._next_beat - self.pre < stop:
+            self.beats.append(self._next_beat)
+            self._next_beat += self._rr()
+        for r in reversed(self.beats):
+            b0 = r - self.pre
+            if b0 + width <= start:
+                break
+            lo, hi = max(b0, start), min(b0 + width, stop)
+            if hi > lo:
+                out[:, lo - start:hi - start] += self.templates[:, lo - b0:hi - b0]
+        if self.wander:
+            t = np.arange(start, stop) / self.fs
+            out += self.wander * np.sin(2 * np.pi * 0.25 * t)
+        if self.noise:
+            out += self.noise * self.rng.standard_normal(out.shape)
+        self.position = stop
+        return out * self.gain
+
+    def r_peaks(self, start=0, stop=None):
+        """Ground-truth R-peak indices emitted so far within [start, stop)."""
+        beats = np.asarray(self.beats)
+        stop = self.position if stop is None else stop
+        return beats[(beats >= start) & (beats < min(stop, self.position))]
+
+    def intervals(self):
+        """Ground-truth PR, QRS and QT durations (ms) using the app's fiducial definitions."""
+        return {
+            "PR": (WAVES["R"][0] - WAVES["P"][0]) * 1000,
+            "QRS": (WAVES["S"][0] - WAVES["Q"][0]) * 1000,
+            "QT": (WAVES["T"][0] - WAVES["Q"][0]) * 1000,
+        }
+
+
+def synthetic_ecg(duration, fs=500, **kwargs):
+    """Convenience wrapper returning (signal, generator) for duration seconds."""
+    gen = SyntheticECG(fs=fs, **kwargs)
+    return gen.generate(int(duration * fs)), gen
+
+
+class SimulatedSerial:
+    """
+    Stand-in for the acquisition board on a serial port: the part of the
+    serial.Serial interface the app uses, sending SyntheticECG frames in
+    the device's line format. Pass it to SerialECGReader(ser=...) to run
+    the 12-lead page (or a benchmark) without hardware.
+    Args:
+        rate: Frames per second the device sends
+        realtime: Produce frames at rate from reset_input_buffer() on, like a
+            real device (unread frames pile up in the input buffer and
+            readline() waits for the next one); otherwise one per readline()
+        buffer_frames: Input buffer size; when it is full the oldest unread
+            frame is lost, like a UART/driver buffer overrun, and counted
+            in frames_dropped
+        **kwargs: SyntheticECG parameters (heart_rate, noise, seed, ...)
+    """
+    BLOCK = 256  # frames generated at a time
+    BUFFER_FRAMES = 1000  # ~2 s at 500 Hz, ~60 KB of device lines
+
+    def __init__(self, rate=500, realtime=True, buffer_frames=BUFFER_FRAMES, **kwargs):
+        self.rate = rate
+        self.realtime = realtime
+        self.gen = SyntheticECG(fs=rate, leads=DEVICE_CHANNELS, **kwargs)
+        self.timeout = 1
+        self.lines_read = 0
+        self.frames_dropped = 0  # lost to input buffer overruns
+        self._pending = collections.deque()  # generated, not yet due
+        self._buffer = collections.deque(maxlen=buffer_frames)  # (send time, line), due, not yet read
+        self._sent = 0
+        self.last_sent = None  # perf_counter() time the last frame read was sent
+        self._t0 = time.perf_counter()
+
+    def _generate(self):
+        block = np.rint(self.gen.generate(self.BLOCK)).astype(int)
+        self._pending.extend(" ".join(map(str, frame)).encode() + b"\r\n" for frame in block.T)
+
+    def _poll(self):
+        """Move frames that are due by now into the input buffer."""
+        due = int((time.perf_counter() - self._t0) * self.rate) if self.realtime else self.lines_read + 1
+        while self._sent < due:
+            if not self._pending:
+                self._generate()
+            sent = self._t0 + self._sent / self.rate if self.realtime else time.perf_counter()
+            if len(self._buffer) == self._buffer.maxlen:
+                self.frames_dropped += 1
+            self._buffer.append((sent, self._pending.popleft()))
+            self._sent += 1
+
+    @property
+    def in_waiting(self):
+        """Frames sent by the device and not read yet."""
+        self._poll()
+        return len(self._buffer)
+
+    def reset_input_buffer(self):
+        self._poll()
+        self._buffer.clear()
+
+    def write(self, data):
+        return len(data)
+
+    def readline(self):
+        self._poll()
+        if not self._buffer:
+            time.sleep(min(self.timeout, 1.0 / self.rate))
+            self._poll()
+            if not self._buffer:
+                return b""
+        self.lines_read += 1
+        self.last_sent, line = self._buffer.popleft()
+        return line
+
+    def close(self):
+        self._buffer.clear()
@@ -1,24 +1,52 @@
+import os
 import sys
 import time
+import weakref
 import numpy as np
-from pyparsing import line
-import serial
-import serial.tools.list_ports
-import csv
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QComboBox, QGroupBox, QFileDialog,
-    QStackedLayout, QGridLayout, QSizePolicy, QMessageBox, QFormLayout, QLineEdit, QFrame
+    QStackedLayout, QGridLayout, QSizePolicy, QMessageBox, QFormLayout, QLineEdit, QFrame, QProgressDialog,
+    QInputDialog, QShortcut
 )
-from PyQt5.QtGui import QFont
+from PyQt5.QtGui import QFont, QKeySequence
 from PyQt5.QtCore import Qt, QTimer
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
-from ecg.recording import ECGMenu
-from scipy.signal import find_peaks
+from ecg.recording import ECGMenu, ECGRecording
+from ecg.measurement_log import MeasurementLog
+from ecg.acquisition_service import (
+    ServiceClient, service_socket, parse_frame, derive_leads, measure_lead_ii, SOCKET_ENV as SERVICE_ENV
+)
+from utils import startup_trace, latency_trace, perf_metrics, logs
+from utils.perf_hud import PerfOverlay
+
+log = logs.get_logger("twelve_lead_test")
+
+# Offered as a serial port when ECG_SIMULATED_DEVICE is set: a synthetic
+# 8-channel device (ecg.synthetic.SimulatedSerial) for repeatable runs
+SIMULATED_PORT = "Simulated device"
+SIMULATED_ENV = "ECG_SIMULATED_DEVICE"
+# Offered when a headless acquisition service (ecg_service.py) is running or
+# ECG_SERVICE_SOCKET is set: the page only views, the service records
+SERVICE_PORT = "Acquisition service"
+MAX_FRAMES_PER_TICK = 1000  # device lines read per update_plot tick at most (2 s at 500 Hz)
+LIVE_ANALYSIS_INTERVAL = 1.0  # s between Lead II analyses while acquiring
+
+# --- Live pipeline metrics (utils/perf_metrics.py), always on ---
+SAMPLES_RECEIVED = perf_metrics.counter("ecg_samples_received_total", "Device frames stored in the lead buffers")
+SAMPLES_DROPPED = perf_metrics.counter("ecg_samples_dropped_total", "Device frames read but not stored")
+PARSE_ERRORS = perf_metrics.counter("ecg_parse_errors_total", "Device lines that were not 8 integers")
+SERIAL_BYTES = perf_metrics.counter("ecg_serial_bytes_total", "Bytes read from the device")
+QUEUE_DEPTH = perf_metrics.gauge("ecg_serial_queue_depth", "Device bytes (frames for a simulated device) waiting to be read")
+FRAME_SECONDS = perf_metrics.summary("ecg_frame_seconds", "Live plot frames: update tick start to canvas drawn")
+ANALYSIS_SECONDS = perf_metrics.summary("ecg_analysis_seconds", "Lead II fiducials, metrics and arrhythmia check per batch")
 
 class SerialECGReader:
-    def __init__(self, port, baudrate):
-        self.ser = serial.Serial(port, baudrate, timeout=1)
+    def __init__(self, port, baudrate, ser=None):
+        if ser is None:
+            import serial  # pyserial is only needed once a device is opened
+            ser = serial.Serial(port, baudrate, timeout=1)
+        self.ser = ser  # or a stand-in such as ecg.synthetic.SimulatedSerial
         self.running = False
 
     def start(self):
@@ -38,11 +66,11 @@ class SerialECGReader:
             line_raw = self.ser.readline()
             line_data = line_raw.decode('utf-8', errors='replace').strip()
             if line_data:
-                print("Received:", line_data)
+                logs.record_raw(line_data)
             if line_data.isdigit():
                 return int(line_data[-3:])
         except Exception as e:
-            print("Error:", e)
+            log.warning("Serial read error: %s", e)
         return None
 
     def close(self):
@@ -82,71 +110,91 @@ class LiveLeadWindow(QWidget):
             self.line.set_ydata(plot_data)
             self.canvas.draw_idle()
 
-def detect_arrhythmia(heart_rate, qrs_duration, rr_intervals, pr_interval=None, p_peaks=None, r_peaks=None, ecg_signal=None):
+class LeadDetailView(QWidget):
     """
-    Expanded arrhythmia detection logic for common clinical arrhythmias.
-    - Sinus Bradycardia: HR < 60, regular RR
-    - Sinus Tachycardia: HR > 100, regular RR
-    - Atrial Fibrillation: Irregular RR, absent/irregular P waves
-    - Atrial Flutter: Sawtooth P pattern (not robustly detected here)
-    - PAC: Early P, narrow QRS, compensatory pause (approximate)
-    - PVC: Early wide QRS, no P, compensatory pause (approximate)
-    - VT: HR > 100, wide QRS (>120ms), regular
-    - VF: Chaotic, no clear QRS, highly irregular
-    - Asystole: Flatline (very low amplitude, no R)
-    - SVT: HR > 150, narrow QRS, regular
-    - Heart Block: PR > 200 (1°), dropped QRS (2°), AV dissociation (3°)
+    Expanded view of one lead: a large plot and the metric cards.
+    Built once per test page and pointed at another lead with bind(), so
+    moving between the grid and the detail view creates no figures, canvases
+    or timers.
+    Args:
+        on_back: Called by the Back button
+        on_tick: Called every 100 ms while the view is visible, to redraw it
     """
-    try:
-        if rr_intervals is None or len(rr_intervals) < 2:
-            return "Detecting..."
-        rr_std = np.std(rr_intervals)
-        rr_mean = np.mean(rr_intervals)
-        rr_reg = rr_std < 0.12  # Regular if std < 120ms
-        # Asystole: flatline (no R peaks, or very low amplitude)
-        if r_peaks is not None and len(r_peaks) < 1:
-            if ecg_signal is not None and np.ptp(ecg_signal) < 50:
-                return "Asystole (Flatline)"
-            return "No QRS Detected"
-        # VF: highly irregular, no clear QRS, rapid undulating
-        if r_peaks is not None and len(r_peaks) > 5:
-            if rr_std > 0.25 and np.ptp(ecg_signal) > 100 and heart_rate and heart_rate > 180:
-                return "Ventricular Fibrillation (VF)"
-        # VT: HR > 100, wide QRS (>120ms), regular
-        if heart_rate and heart_rate > 100 and qrs_duration and qrs_duration > 120 and rr_reg:
-            return "Ventricular Tachycardia (VT)"
-        # Sinus Bradycardia: HR < 60, regular
-        if heart_rate and heart_rate < 60 and rr_reg:
-            return "Sinus Bradycardia"
-        # Sinus Tachycardia: HR > 100, regular
-        if heart_rate and heart_rate > 100 and qrs_duration and qrs_duration <= 120 and rr_reg:
-            return "Sinus Tachycardia"
-        # SVT: HR > 150, narrow QRS, regular
-        if heart_rate and heart_rate > 150 and qrs_duration and qrs_duration <= 120 and rr_reg:
-            return "Supraventricular Tachycardia (SVT)"
-        # AFib: Irregular RR, absent/irregular P
-        if not rr_reg and (p_peaks is None or len(p_peaks) < len(r_peaks) * 0.5):
-            return "Atrial Fibrillation (AFib)"
-        # Atrial Flutter: (not robust, but if HR ~150, regular, and P waves rapid)
-        if heart_rate and 140 < heart_rate < 170 and rr_reg and p_peaks is not None and len(p_peaks) > len(r_peaks):
-            return "Atrial Flutter (suggestive)"
-        # PAC: Early P, narrow QRS, compensatory pause (approximate)
-        if p_peaks is not None and r_peaks is not None and len(p_peaks) > 1 and len(r_peaks) > 1:
-            pr_diffs = np.diff([r - p for p, r in zip(p_peaks, r_peaks)])
-            if np.any(pr_diffs < -0.15 * len(ecg_signal)) and qrs_duration and qrs_duration <= 120:
-                return "Premature Atrial Contraction (PAC)"
-        # PVC: Early wide QRS, no P, compensatory pause (approximate)
-        if qrs_duration and qrs_duration > 120 and (p_peaks is None or len(p_peaks) < len(r_peaks) * 0.5):
-            return "Premature Ventricular Contraction (PVC)"
-        # Heart Block: PR > 200ms (1°), dropped QRS (2°), AV dissociation (3°)
-        if pr_interval and pr_interval > 200:
-            return "Heart Block (1° AV)"
-        # If QRS complexes are missing (dropped beats)
-        if r_peaks is not None and len(r_peaks) < len(ecg_signal) / 500 * heart_rate * 0.7:
-            return "Heart Block (2°/3° AV, dropped QRS)"
-        return "None Detected"
-    except Exception as e:
-        return "Detecting..."
+    def __init__(self, on_back, on_tick, parent=None):
+        super().__init__(parent)
+        self.lead_name = None
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(0)
+        back_btn = QPushButton("Back")
+        back_btn.setFixedHeight(40)
+        back_btn.clicked.connect(on_back)
+        layout.addWidget(back_btn, alignment=Qt.AlignLeft)
+        self.fig = Figure(facecolor='#fff')  # White background for the figure
+        self.ax = self.fig.add_subplot(111)
+        self.ax.set_facecolor('#fff')        # White background for the axes
+        self.line, = self.ax.plot([], [], lw=2)
+        self.canvas = FigureCanvas(self.fig)
+        self.canvas.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        layout.addWidget(self.canvas)
+        # Create metric labels for cards
+        self.pr_label = QLabel("-- ms")
+        self.qrs_label = QLabel("-- ms")
+        self.qtc_label = QLabel("-- ms")
+        self.arrhythmia_label = QLabel("--")
+        # Add metrics card row below the plot (card style)
+        metrics_row = QHBoxLayout()
+        metrics_row.setSpacing(32)
+        metrics_row.setContentsMargins(32, 16, 32, 24)
+        metrics_row.setAlignment(Qt.AlignHCenter)
+        for title, label in (("PR Interval", self.pr_label), ("QRS Duration", self.qrs_label),
+                             ("QTc Interval", self.qtc_label), ("Arrhythmia", self.arrhythmia_label)):
+            card = self._metric_card(title, label)
+            card.setMinimumWidth(0)
+            card.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+            metrics_row.addWidget(card)
+        layout.addLayout(metrics_row)
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(on_tick)
+
+    @staticmethod
+    def _metric_card(title, label_widget):
+        card = QFrame()
+        card.setStyleSheet("""
+            background: qlineargradient(x1:0, y1:0, x2:1, y2:1, stop:0 #fff7f0, stop:1 #ffe0cc);
+            border-radius: 32px;
+            border: 2.5px solid #ff6600;
+            padding: 18px 18px;
+        """)
+        vbox = QVBoxLayout(card)
+        vbox.setSpacing(6)
+        lbl = QLabel(title)
+        lbl.setAlignment(Qt.AlignHCenter)
+        lbl.setStyleSheet("color: #ff6600; font-size: 18px; font-weight: bold;")
+        label_widget.setStyleSheet("font-size: 32px; font-weight: bold; color: #222; padding: 8px 0;")
+        vbox.addWidget(lbl)
+        vbox.addWidget(label_widget)
+        vbox.setAlignment(Qt.AlignHCenter)
+        return card
+
+    def bind(self, lead_name, color):
+        """Point the view at another lead: new colour, cleared plot and metrics."""
+        self.lead_name = lead_name
+        self.line.set_color(color)
+        self.line.set_data([], [])
+        for artist in list(self.ax.lines)[1:] + list(self.ax.texts):  # peak markers of the previous lead
+            artist.remove()
+        for label in (self.pr_label, self.qrs_label, self.qtc_label):
+            label.setText("-- ms")
+        self.arrhythmia_label.setText("--")
+
+    def showEvent(self, event):
+        self.timer.start(100)
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self.timer.stop()
+        super().hideEvent(event)
 
 class ECGTestPage(QWidget):
     LEADS_MAP = {
@@ -170,6 +218,7 @@ class ECGTestPage(QWidget):
         "V5": "#00b894",
         "V6": "#ff0066"
     }
+    @startup_trace.traced
     def __init__(self, test_name, stacked_widget):
         super().__init__()
         self.setWindowTitle("12-Lead ECG Monitor")
@@ -192,10 +241,22 @@ class ECGTestPage(QWidget):
         self.timer = QTimer()
         self.timer.timeout.connect(self.update_plot)
         self.serial_reader = None
+        self.service_client = None
+        self.recording = ECGRecording()
+        # Lead II measurements go to a rolling history (measurements/ecg_metrics_*.jsonl), one record a second
+        self.metrics_log = MeasurementLog()
+        self.metrics_log_interval = 1.0
+        self._last_logged = 0.0
+        self.live_metrics = None  # (metrics, rhythm) of the last Lead II analysis
+        self._last_analysis = 0.0
+        self.patient_id = ""  # set by the dashboard to the signed-in user
+        self._export_workers = []
         self.stacked_widget = stacked_widget
         self.lines = []
         self.axs = []
         self.canvases = []
+        self.detail_view = None  # built by the first expand_lead()
+        self._lead_panels = {}  # lead -> (group box, figure, canvas, axes, line), kept across layouts
 
         # Add Back button at the top
         back_btn = QPushButton("Back")
@@ -288,6 +349,36 @@ class ECGTestPage(QWidget):
         main_hbox.addLayout(main_vbox)
         self.grid_widget.setLayout(main_hbox)
 
+        # Sample-to-pixel latency overlay (utils/latency_trace.py)
+        latency_trace.enable_from_env()
+        self.latency_overlay = latency_trace.LatencyOverlay(self)
+        QShortcut(QKeySequence("Ctrl+Shift+L"), self, activated=self.latency_overlay.toggle)
+        # Performance HUD and metrics export (utils/perf_hud.py, utils/perf_metrics.py)
+        self._frame_start = None
+        self._frame_canvas = None
+        buffer_bytes = weakref.WeakMethod(self._buffer_bytes)
+        perf_metrics.gauge("ecg_buffer_bytes", "Memory held by the live lead buffers", fn=lambda: buffer_bytes()())
+        perf_metrics.start_from_env()
+        self.perf_overlay = PerfOverlay(self)
+        QShortcut(QKeySequence("Ctrl+Shift+P"), self, activated=self.perf_overlay.toggle)
+        if os.environ.get("ECG_PERF_HUD"):
+            self.perf_overlay.toggle()
+
+    def _buffer_bytes(self):
+        # list storage plus one int object per sample
+        return sum(sys.getsizeof(buf) + 28 * len(buf) for buf in list(self.data.values()))
+
+    def _frame_scheduled(self, start, canvas):
+        """A tick that began at start has asked canvas (drawn last) to redraw; the frame ends when it is drawn."""
+        if self._frame_start is None:  # coalesced ticks count from the first one
+            self._frame_start = start
+        self._frame_canvas = canvas
+
+    def _frame_drawn(self, event):
+        if self._frame_start is not None and event.canvas is self._frame_canvas:
+            FRAME_SECONDS.observe(time.perf_counter() - self._frame_start)
+            self._frame_start = None
+
     def center_on_screen(self):
         qr = self.frameGeometry()
         from PyQt5.QtWidgets import QApplication
@@ -303,7 +394,7 @@ class ECGTestPage(QWidget):
         self._12to1_lines = {}
         self._12to1_axes = {}
         for lead in ordered_leads:
-            group = QGroup
+            group = QGroupBox(lead)
             group.setStyleSheet("QGroupBox { border: 2px solid rgba(0,0,0,0.2); border-radius: 8px; margin-top: 8px; }")
             vbox = QVBoxLayout(group)
             fig = Figure(figsize=(12, 2.5), facecolor='#000')
@@ -344,247 +435,114 @@ class ECGTestPage(QWidget):
             ax.figure.canvas.draw_idle()
 
     def expand_lead(self, idx):
+        """Show lead idx in the detailed view (built on first use, then rebound to each lead)."""
+        if self.detail_view is None:
+            self.detail_view = LeadDetailView(on_back=lambda: self.page_stack.setCurrentIndex(0),
+                                              on_tick=self.update_detailed_plot)
+            layout = QVBoxLayout(self.detailed_widget)
+            layout.setContentsMargins(0, 0, 0, 0)
+            layout.addWidget(self.detail_view)
+            latency_trace.watch_paint(self.detail_view.canvas)
+            self.detail_view.canvas.mpl_connect('draw_event', self._frame_drawn)
+            self.detailed_widget.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
         lead = self.leads[idx]
-        def get_lead_data():
-            return self.data[lead]
-        color = self.LEAD_COLORS.get(lead, "#00ff99")
-        if hasattr(self, '_detailed_timer') and self._detailed_timer is not None:
-            self._detailed_timer.stop()
-            self._detailed_timer.deleteLater()
-            self._detailed_timer = None
-        old_layout = self.detailed_widget.layout()
-        if old_layout is not None:
-            while old_layout.count():
-                item = old_layout.takeAt(0)
-                widget = item.widget()
-                if widget is not None:
-                    widget.deleteLater()
-            QWidget().setLayout(old_layout)
-        layout = QVBoxLayout()
-        layout.setContentsMargins(0, 0, 0, 0)
-        layout.setSpacing(0)
-        back_btn = QPushButton("Back")
-        back_btn.setFixedHeight(40)
-        back_btn.clicked.connect(lambda: self.page_stack.setCurrentIndex(0))
-        layout.addWidget(back_btn, alignment=Qt.AlignLeft)
-        fig = Figure(facecolor='#fff')  # White background for the figure
-        ax = fig.add_subplot(111)
-        ax.set_facecolor('#fff')        # White background for the axes
-        line, = ax.plot([], [], color=color, lw=2)
-        canvas = FigureCanvas(fig)
-        canvas.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
-        layout.addWidget(canvas)
-        # Create metric labels for cards
-        pr_label = QLabel("-- ms")
-        qrs_label = QLabel("-- ms")
-        qtc_label = QLabel("-- ms")
-        arrhythmia_label = QLabel("--")
-        # Add metrics card row below the plot (card style)
-        metrics_row = QHBoxLayout()
-        def create_metric_card(title, label_widget):
-            card = QFrame()
-            card.setStyleSheet("""
-                background: qlineargradient(x1:0, y1:0, x2:1, y2:1, stop:0 #fff7f0, stop:1 #ffe0cc);
-                border-radius: 32px;
-                border: 2.5px solid #ff6600;
-                padding: 18px 18px;
-            """)
-            vbox = QVBoxLayout(card)
-            vbox.setSpacing(6)
-            lbl = QLabel(title)
-            lbl.setAlignment(Qt.AlignHCenter)
-            lbl.setStyleSheet("color: #ff6600; font-size: 18px; font-weight: bold;")
-            label_widget.setStyleSheet("font-size: 32px; font-weight: bold; color: #222; padding: 8px 0;")
-            vbox.addWidget(lbl)
-            vbox.addWidget(label_widget)
-            vbox.setAlignment(Qt.AlignHCenter)
-            return card
-        metrics_row.setSpacing(32)
-        metrics_row.setContentsMargins(32, 16, 32, 24)
-        metrics_row.setAlignment(Qt.AlignHCenter)
-        cards = [create_metric_card("PR Interval", pr_label),
-                 create_metric_card("QRS Duration", qrs_label),
-                 create_metric_card("QTc Interval", qtc_label),
-                 create_metric_card("Arrhythmia", arrhythmia_label)]
-        for card in cards:
-            card.setMinimumWidth(0)
-            card.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
-            metrics_row.addWidget(card)
-        layout.addLayout(metrics_row)
-        self.detailed_widget.setLayout(layout)
-        self.detailed_widget.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        self.detail_view.bind(lead, self.LEAD_COLORS.get(lead, "#00ff99"))
         self.page_stack.setCurrentIndex(1)
-        self._detailed_timer = QTimer(self)
-
-        def update_detailed_plot():
-            detailed_buffer_size = 500  # Reduced to 500 samples for real-time effect
-            data = get_lead_data()
-            # Robust: Only plot if enough data, else show blank
-            if data and len(data) >= 10:
-                plot_data = np.array(data[-detailed_buffer_size:])
-                x = np.arange(len(plot_data))
-                centered = plot_data - np.mean(plot_data)
-                line.set_data(x, centered)
-                ax.set_xlim(0, max(len(centered)-1, 1))
-                ymin = np.min(centered) - 100
-                ymax = np.max(centered) + 100
-                if ymin == ymax:
-                    ymin, ymax = -500, 500
-                ax.set_ylim(ymin, ymax)
-                # --- PQRST detection and green labeling for Lead II only ---
-                # Remove all extra lines except the main ECG line (robust for all Matplotlib versions)
+        self.update_detailed_plot()  # Draw immediately on open
+
+    def update_detailed_plot(self):
+        tick = time.perf_counter()
+        view = self.detail_view
+        lead = view.lead_name
+        data = self.data.get(lead, [])
+        line, ax, canvas = view.line, view.ax, view.canvas
+        pr_label, qrs_label, qtc_label, arrhythmia_label = view.pr_label, view.qrs_label, view.qtc_label, view.arrhythmia_label
+        detailed_buffer_size = 500  # Reduced to 500 samples for real-time effect
+        # Robust: Only plot if enough data, else show blank
+        if data and len(data) >= 10:
+            plot_data = np.array(data[-detailed_buffer_size:])
+            x = np.arange(len(plot_data))
+            centered = plot_data - np.mean(plot_data)
+            line.set_data(x, centered)
+            ax.set_xlim(0, max(len(centered)-1, 1))
+            ymin = np.min(centered) - 100
+            ymax = np.max(centered) + 100
+            if ymin == ymax:
+                ymin, ymax = -500, 500
+            ax.set_ylim(ymin, ymax)
+            # --- PQRST detection and green labeling for Lead II only ---
+            # Remove all extra lines except the main ECG line (robust for all Matplotlib versions)
+            try:
+                while len(ax.lines) > 1:
+                    ax.lines[-1].remove()
+            except Exception as e:
+                log.warning("Could not remove extra lines: %s", e)
+            for txt in list(ax.texts):
                 try:
-                    while len(ax.lines) > 1:
-                        ax.lines.remove(ax.lines[-1])
+                    txt.remove()
                 except Exception as e:
-                    print(f"Warning: Could not remove extra lines: {e}")
-                for txt in list(ax.texts):
-                    try:
-                        txt.remove()
-                    except Exception as e:
-                        print(f"Warning: Could not remove text: {e}")
-                # Optionally, clear all lines if you want only labels visible (no ECG trace):
-                # ax.lines.clear()
-                if lead == "II":
-                    # Use the same detection logic as in main.py
-                    from scipy.signal import find_peaks
-                    sampling_rate = 500
-                    ecg_signal = centered
-                    window_size = min(500, len(ecg_signal))
-                    if len(ecg_signal) > window_size:
-                        ecg_signal = ecg_signal[-window_size:]
-                        x = x[-window_size:]
-                    # R peak detection
-                    r_peaks, _ = find_peaks(ecg_signal, distance=int(0.2 * sampling_rate), prominence=0.6 * np.std(ecg_signal))
-                    # Q and S: local minima before and after R
-                    q_peaks = []
-                    s_peaks = []
-                    for r in r_peaks:
-                        q_start = max(0, r - int(0.06 * sampling_rate))
-                        q_end = r
-                        if q_end > q_start:
-                            q_idx = np.argmin(ecg_signal[q_start:q_end]) + q_start
-                            q_peaks.append(q_idx)
-                        s_start = r
-                        s_end = min(len(ecg_signal), r + int(0.06 * sampling_rate))
-                        if s_end > s_start:
-                            s_idx = np.argmin(ecg_signal[s_start:s_end]) + s_start
-                            s_peaks.append(s_idx)
-                    # P: positive peak before Q (within 0.1-0.2s)
-                    p_peaks = []
-                    for q in q_peaks:
-                        p_start = max(0, q - int(0.2 * sampling_rate))
-                        p_end = q - int(0.08 * sampling_rate)
-                        if p_end > p_start:
-                            p_candidates, _ = find_peaks(ecg_signal[p_start:p_end], prominence=0.1 * np.std(ecg_signal))
-                            if len(p_candidates) > 0:
-                                p_peaks.append(p_start + p_candidates[-1])
-                    # T: positive peak after S (within 0.1-0.4s)
-                    t_peaks = []
-                    for s in s_peaks:
-                        t_start = s + int(0.08 * sampling_rate)
-                        t_end = min(len(ecg_signal), s + int(0.4 * sampling_rate))
-                        if t_end > t_start:
-                            t_candidates, _ = find_peaks(ecg_signal[t_start:t_end], prominence=0.1 * np.std(ecg_signal))
-                            if len(t_candidates) > 0:
-                                t_peaks.append(t_start + t_candidates[np.argmax(ecg_signal[t_start + t_candidates])])
-                    # Only show the most recent peak for each label (if any)
-                    peak_dict = {'P': p_peaks, 'Q': q_peaks, 'R': r_peaks, 'S': s_peaks, 'T': t_peaks}
-                    for label, idxs in peak_dict.items():
-                        if len(idxs) > 0:
-                            idx = idxs[-1]
-                            ax.plot(idx, ecg_signal[idx], 'o', color='green', markersize=8, zorder=10)
-                            y_offset = 0.12 * (np.max(ecg_signal) - np.min(ecg_signal))
-                            if label in ['P', 'T']:
-                                ax.text(idx, ecg_signal[idx]+y_offset, label, color='green', fontsize=12, fontweight='bold', ha='center', va='bottom', zorder=11, bbox=dict(facecolor='white', edgecolor='none', alpha=0.7, boxstyle='round,pad=0.1'))
-                            else:
-                                ax.text(idx, ecg_signal[idx]-y_offset, label, color='green', fontsize=12, fontweight='bold', ha='center', va='top', zorder=11, bbox=dict(facecolor='white', edgecolor='none', alpha=0.7, boxstyle='round,pad=0.1'))
-                # --- Metrics (for Lead II only, based on R peaks) ---
-                if lead == "II":
-                    heart_rate = None
-                    pr_interval = None
-                    qrs_duration = None
-                    qt_interval = None
-                    qtc_interval = None
-                    rr_intervals = None
-
-                    if len(r_peaks) > 1:
-                        rr_intervals = np.diff(r_peaks) / sampling_rate  # in seconds
-                        mean_rr = np.mean(rr_intervals)
-                        if mean_rr > 0:
-                            heart_rate = 60.0 / mean_rr
-                    if len(p_peaks) > 0 and len(r_peaks) > 0:
-                        pr_interval = (r_peaks[-1] - p_peaks[-1]) * 1000 / sampling_rate  # ms
-                    if len(q_peaks) > 0 and len(s_peaks) > 0:
-                        qrs_duration = (s_peaks[-1] - q_peaks[-1]) * 1000 / sampling_rate  # ms
-                    if len(q_peaks) > 0 and len(t_peaks) > 0:
-                        qt_interval = (t_peaks[-1] - q_peaks[-1]) * 1000 / sampling_rate  # ms
-                    if qt_interval and heart_rate:
-                        qtc_interval = qt_interval / np.sqrt(60.0 / heart_rate)  # Bazett's formula
-
-                    pr_label.setText(f"{pr_interval:.1f} ms" if pr_interval else "-- ms")
-                    qrs_label.setText(f"{qrs_duration:.1f} ms" if qrs_duration else "-- ms")
-                    qtc_label.setText(f"{qtc_interval:.1f} ms" if qtc_interval else "-- ms")
-                    
-                    if hasattr(self, 'dashboard_callback'):
-                        self.dashboard_callback({
-                            'PR': pr_interval,
-                            'QRS': qrs_duration,
-                            'QTc': qtc_interval,
-                            'QRS_axis': '--',  # Replace with actual axis if you compute it
-                            'ST': None  # Replace with actual ST segment if you compute it
-                        })
-
-                    # --- Arrhythmia detection ---
-                    arrhythmia_result = detect_arrhythmia(heart_rate, qrs_duration, rr_intervals)
-                    arrhythmia_label.setText(arrhythmia_result)
-                else:
-                    pr_label.setText("-- ms")
-                    qrs_label.setText("-- ms")
-                    qtc_label.setText("-- ms")
-                    arrhythmia_label.setText("--")
+                    log.warning("Could not remove text: %s", e)
+            # Optionally, clear all lines if you want only labels visible (no ECG trace):
+            # ax.lines.clear()
+            if lead == "II":
+                from ecg.ecg_pqrst import detect_pqrst
+                sampling_rate = 500
+                ecg_signal = centered
+                window_size = min(500, len(ecg_signal))
+                if len(ecg_signal) > window_size:
+                    ecg_signal = ecg_signal[-window_size:]
+                    x = x[-window_size:]
+                peaks = detect_pqrst(ecg_signal, fs=sampling_rate)
+                p_peaks, q_peaks, r_peaks, s_peaks, t_peaks = (peaks[k] for k in 'PQRST')
+                # Only show the most recent peak for each label (if any)
+                peak_dict = {'P': p_peaks, 'Q': q_peaks, 'R': r_peaks, 'S': s_peaks, 'T': t_peaks}
+                for label, idxs in peak_dict.items():
+                    if len(idxs) > 0:
+                        idx = idxs[-1]
+                        ax.plot(idx, ecg_signal[idx], 'o', color='green', markersize=8, zorder=10)
+                        y_offset = 0.12 * (np.max(ecg_signal) - np.min(ecg_signal))
+                        if label in ['P', 'T']:
+                            ax.text(idx, ecg_signal[idx]+y_offset, label, color='green', fontsize=12, fontweight='bold', ha='center', va='bottom', zorder=11, bbox=dict(facecolor='white', edgecolor='none', alpha=0.7, boxstyle='round,pad=0.1'))
+                        else:
+                            ax.text(idx, ecg_signal[idx]-y_offset, label, color='green', fontsize=12, fontweight='bold', ha='center', va='top', zorder=11, bbox=dict(facecolor='white', edgecolor='none', alpha=0.7, boxstyle='round,pad=0.1'))
+            # --- Metrics (for Lead II only): the live analysis of the last seconds ---
+            if lead == "II":
+                latency_trace.mark("analysis")
+                metrics, rhythm = self.live_metrics or ({}, "Detecting...")
+                for label, key in ((pr_label, 'PR'), (qrs_label, 'QRS'), (qtc_label, 'QTc')):
+                    label.setText(f"{metrics[key]:.1f} ms" if metrics.get(key) else "-- ms")
+                arrhythmia_label.setText(rhythm)
             else:
-                line.set_data([], [])
-                ax.set_xlim(0, 1)
-                ax.set_ylim(-500, 500)
                 pr_label.setText("-- ms")
                 qrs_label.setText("-- ms")
                 qtc_label.setText("-- ms")
-            canvas.draw_idle()
-        self._detailed_timer.timeout.connect(update_detailed_plot)
-        self._detailed_timer.start(100)
-        update_detailed_plot()  # Draw immediately on open
+                arrhythmia_label.setText("--")
+        else:
+            line.set_data([], [])
+            ax.set_xlim(0, 1)
+            ax.set_ylim(-500, 500)
+            pr_label.setText("-- ms")
+            qrs_label.setText("-- ms")
+            qtc_label.setText("-- ms")
+        canvas.draw_idle()
+        latency_trace.mark("schedule")
+        self._frame_scheduled(tick, canvas)
 
     def refresh_ports(self):
         self.port_combo.clear()
         self.port_combo.addItem("Select Port")
+        import serial.tools.list_ports
         ports = serial.tools.list_ports.comports()
         for port in ports:
             self.port_combo.addItem(port.device)
-
-    def update_lead_layout(self):
-        old_layout = self.plot_area.layout()
-        if old_layout:
-            while old_layout.count():
-                item = old_layout.takeAt(0)
-                widget = item.widget()
-                if widget:
-                    widget.setParent(None)
-            self.plot_area.setLayout(None)
-        self.figures = []
-        self.canvases = []
-        self.axs = []
-        self.lines = []
-        grid = QGridLayout()
-        n_leads = len(self.leads)
-        if n_leads == 12:
-            rows, cols = 3, 4
-        elif n_leads == 7:
-            rows, cols = 2, 4
-        else:
-            rows, cols = 1, 1
-        for idx, lead in enumerate(self.leads):
-            row, col = divmod(idx, cols)
+        if os.environ.get(SIMULATED_ENV):
+            self.port_combo.addItem(SIMULATED_PORT)
+        if os.environ.get(SERVICE_ENV) or os.path.exists(service_socket()):
+            self.port_combo.addItem(SERVICE_PORT)
+
+    def _lead_panel(self, lead):
+        """Group box with the grid figure for lead; created once and reused by every layout."""
+        if lead not in self._lead_panels:
             group = QGroupBox(lead)
             group.setStyleSheet("""
                 QGroupBox {
@@ -608,30 +566,92 @@ class ECGTestPage(QWidget):
             for spine in ax.spines.values():
                 spine.set_color('#ff6600')
             line, = ax.plot([0]*self.buffer_size, color=self.LEAD_COLORS.get(lead, '#ff6600'), lw=2)
-            self.lines.append(line)
             canvas = FigureCanvas(fig)
             vbox.addWidget(canvas)
+            latency_trace.watch_paint(canvas)
+            canvas.mpl_connect('draw_event', self._frame_drawn)
+            # Look the lead up on click: its position depends on the current layout
+            canvas.mpl_connect('button_press_event', lambda event, lead=lead: self.expand_lead(self.leads.index(lead)))
+            self._lead_panels[lead] = (group, fig, canvas, ax, line)
+        return self._lead_panels[lead]
+
+    @startup_trace.traced
+    def update_lead_layout(self):
+        grid = self.plot_area.layout()
+        if grid is None:
+            grid = QGridLayout(self.plot_area)
+        while grid.count():
+            widget = grid.takeAt(0).widget()
+            if widget is not None:
+                widget.hide()  # kept in _lead_panels for the next layout
+        self.figures = []
+        self.canvases = []
+        self.axs = []
+        self.lines = []
+        n_leads = len(self.leads)
+        if n_leads == 12:
+            rows, cols = 3, 4
+        elif n_leads == 7:
+            rows, cols = 2, 4
+        else:
+            rows, cols = 1, 1
+        for idx, lead in enumerate(self.leads):
+            row, col = divmod(idx, cols)
+            group, fig, canvas, ax, line = self._lead_panel(lead)
             grid.addWidget(group, row, col)
+            group.show()
             self.figures.append(fig)
             self.canvases.append(canvas)
             self.axs.append(ax)
-        self.plot_area.setLayout(grid)
-        def make_expand_lead(idx):
-            return lambda event: self.expand_lead(idx)
-        for i, canvas in enumerate(self.canvases):
-            canvas.mpl_connect('button_press_event', make_expand_lead(i))
+            self.lines.append(line)
+
+    def set_test(self, test_name):
+        """
+        Switch to another test's lead set (e.g. "7 Lead ECG Test"), reusing
+        the lead figures already built. Not possible while acquiring.
+        Returns:
+            True if the layout changed
+        """
+        if self.timer.isActive() or self.recording.recording:
+            log.warning("Stop the acquisition before changing the lead layout")
+            return False
+        self.test_name = test_name
+        self.leads = self.LEADS_MAP[test_name]
+        self.data = {lead: self.data.get(lead, []) for lead in self.leads}
+        self.update_lead_layout()
+        if self.page_stack.currentIndex() == 1 and self.detail_view.lead_name not in self.leads:
+            self.page_stack.setCurrentIndex(0)
+        return True
 
     def start_acquisition(self):
         port = self.port_combo.currentText()
         baud = self.baud_combo.currentText()
-        if port == "Select Port" or baud == "Select Baud Rate":
+        simulated = port == SIMULATED_PORT
+        if port == "Select Port" or (baud == "Select Baud Rate" and port not in (SIMULATED_PORT, SERVICE_PORT)):
             self.show_connection_warning()
             return
+        self.live_metrics = None
         try:
             if self.serial_reader:
                 self.serial_reader.close()
-            self.serial_reader = SerialECGReader(port, int(baud))
+                self.serial_reader = None
+            if self.service_client:
+                self.service_client.close()
+                self.service_client = None
+            if port == SERVICE_PORT:
+                # Thin client: the service owns the device and the session
+                self.service_client = ServiceClient(service_socket())
+                self.timer.start(50)
+                if hasattr(self, '_12to1_timer'):
+                    self._12to1_timer.start(100)
+                return
+            if simulated:
+                from ecg.synthetic import SimulatedSerial
+                self.serial_reader = SerialECGReader(None, None, ser=SimulatedSerial(seed=0))
+            else:
+                self.serial_reader = SerialECGReader(port, int(baud))
             self.serial_reader.start()
+            self.recording.start_recording(self.leads, patient_id=self.patient_id)
             self.timer.start(50)
             if hasattr(self, '_12to1_timer'):
                 self._12to1_timer.start(100)
@@ -641,125 +661,236 @@ class ECGTestPage(QWidget):
     def stop_acquisition(self):
         port = self.port_combo.currentText()
         baud = self.baud_combo.currentText()
-        if port == "Select Port" or baud == "Select Baud Rate":
+        if port == "Select Port" or (baud == "Select Baud Rate" and port not in (SIMULATED_PORT, SERVICE_PORT)):
             self.show_connection_warning()
             return
         if self.serial_reader:
             self.serial_reader.stop()
+        if self.service_client:
+            self.service_client.close()  # detach; the service keeps recording
+            self.service_client = None
         self.timer.stop()
         if hasattr(self, '_12to1_timer'):
             self._12to1_timer.stop()
-            
-        if hasattr(self, 'dashboard_callback'):
-            lead2_data = self.data.get("II", [])[-500:]
-            if len(lead2_data) > 100:
-                from ecg.ecg_pqrst import detect_pqrst
-                fs = 500
-                peaks = detect_pqrst(np.array(lead2_data), fs=fs)
-                p_peaks = peaks['P']
-                q_peaks = peaks['Q']
-                r_peaks = peaks['R']
-                s_peaks = peaks['S']
-                t_peaks = peaks['T']
-                pr_interval = (r_peaks[-1] - p_peaks[-1]) * 1000 / fs if p_peaks and r_peaks else None
-                qrs_duration = (s_peaks[-1] - q_peaks[-1]) * 1000 / fs if q_peaks and s_peaks else None
-                qt_interval = (t_peaks[-1] - q_peaks[-1]) * 1000 / fs if q_peaks and t_peaks else None
-                qtc_interval = qt_interval / np.sqrt(60.0 / 75.0) if qt_interval else None  # Use last HR or estimate
-                qrs_axis = "--"
-                st_segment = (t_peaks[-1] - s_peaks[-1]) * 1000 / fs if s_peaks and t_peaks else None
-                self.dashboard_callback({
-                    'PR': pr_interval,
-                    'QRS': qrs_duration,
-                    'QTc': qtc_interval,
-                    'QRS_axis': qrs_axis,
-                    'ST': st_segment
-                })
+        # Closes the session and adds it to the catalog with the median metrics
+        # analyse_lead_ii() stored during the acquisition
+        self.recording.stop_recording()
 
     def update_plot(self):
+        if self.service_client:
+            self._update_from_service()
+            return
         if not self.serial_reader:
             return
-        line = self.serial_reader.ser.readline()
-        line_data = line.decode('utf-8', errors='replace').strip()
-        if not line_data:
+        tick = time.perf_counter()
+        ser = self.serial_reader.ser
+        if not ser.in_waiting:
+            return
+        # Everything the device sent since the last tick, so the live view
+        # and the session keep up with the real sampling rate
+        frames = []
+        while len(frames) < MAX_FRAMES_PER_TICK:
+            line = ser.readline()
+            SERIAL_BYTES.inc(len(line))
+            line_data = line.decode('utf-8', errors='replace').strip()
+            if line_data:
+                latency_trace.received(getattr(ser, "last_sent", None))
+                logs.record_raw(line_data)
+                try:
+                    frames.append(derive_leads(parse_frame(line_data)))
+                except Exception as e:
+                    PARSE_ERRORS.inc()
+                    SAMPLES_DROPPED.inc()
+                    log.warning("Error parsing ECG data: %s", e, extra={"fields": {"line": line_data}})
+            if not ser.in_waiting:
+                break
+        QUEUE_DEPTH.set(ser.in_waiting)
+        if not frames:
+            return
+        for lead in self.leads:
+            buf = self.data[lead]
+            buf.extend(frame[lead] for frame in frames)
+            del buf[:-self.buffer_size]
+        # Full session goes to disk; self.data only keeps the live window
+        for frame in frames:
+            self.recording.add_sample([frame[lead] for lead in self.leads])
+        SAMPLES_RECEIVED.inc(len(frames))
+        latency_trace.mark("parse")
+        if time.monotonic() - self._last_analysis >= LIVE_ANALYSIS_INTERVAL:
+            self.analyse_lead_ii()
+        try:
+            self._redraw_grid(tick)
+        except Exception as e:
+            log.warning("Error drawing ECG data: %s", e)
+
+    def analyse_lead_ii(self, fs=500):
+        """
+        Median Lead II intervals and rhythm over the live buffer (measured
+        like the report), once a second while acquiring. The results go to
+        the recording, the measurement log, the dashboard metrics and its
+        beating heart, and the detailed view's cards.
+        """
+        self._last_analysis = time.monotonic()
+        if "II" not in self.data or len(self.data["II"]) < 2 * fs:
             return
-        print("Received:", line_data)
+        analysis_start = time.perf_counter()
         try:
-            values = [int(x) for x in line_data.split()]
-            if len(values) != 8:
-                return
-            lead1 = values[0]
-            v4    = values[1]
-            v5    = values[2]
-            lead2 = values[3]
-            v3    = values[4]
-            v6    = values[5]
-            v1    = values[6]
-            v2    = values[7]
-            lead3 = lead2 - lead1
-            avr = - (lead1 + lead2) / 2
-            avl = (lead1 - lead3) / 2
-            avf = (lead2 + lead3) / 2
-            lead_data = {
-                "I": lead1,
-                "II": lead2,
-                "III": lead3,
-                "aVR": avr,
-                "aVL": avl,
-                "aVF": avf,
-                "V1": v1,
-                "V2": v2,
-                "V3": v3,
-                "V4": v4,
-                "V5": v5,
-                "V6": v6
-            }
-            for i, lead in enumerate(self.leads):
-                self.data[lead].append(lead_data[lead])
-                if len(self.data[lead]) > self.buffer_size:
-                    self.data[lead].pop(0)
-            # Write latest Lead II data to file for dashboard
-            try:
-                import json
-                with open('lead_ii_live.json', 'w') as f:
-                    json.dump(self.data["II"][-500:], f)
-            except Exception as e:
-                print("Error writing lead_ii_live.json:", e)
-            for i, lead in enumerate(self.leads):
-                if len(self.data[lead]) > 0:
-                    if len(self.data[lead]) < self.buffer_size:
-                        data = np.full(self.buffer_size, np.nan)
-                        data[-len(self.data[lead]):] = self.data[lead]
-                    else:
-                        data = np.array(self.data[lead])
-                    centered = data - np.nanmean(data)
-                    self.lines[i].set_ydata(centered)
-                    self.axs[i].set_ylim(-400, 400)
-                    self.canvases[i].draw_idle()
+            signal = self.data["II"]
+            metrics, rhythm, peaks = measure_lead_ii(signal, fs=fs)
         except Exception as e:
-            print("Error parsing ECG data:", e)
+            log.warning("ECG analysis error: %s", e)
+            return
+        ANALYSIS_SECONDS.observe(time.perf_counter() - analysis_start)
+        r_peaks = peaks['R']
+        self.live_metrics = (metrics, rhythm)
+        self.recording.update_metrics(metrics)
+        self.recording.mark_rhythm(rhythm)
+        now = time.time()
+        if now - self._last_logged >= self.metrics_log_interval:
+            self._last_logged = now
+            # Fiducials as sample indices in the analysed window
+            self.metrics_log.append(dict(metrics, time=round(now, 3), lead="II", rhythm=rhythm,
+                                         **{k: [int(i) for i in v] for k, v in peaks.items()}))
+        if hasattr(self, 'dashboard_callback'):
+            self.dashboard_callback(metrics)
+        # Pace the dashboard heart with the live beats: age of the newest R-peak in the buffer
+        if hasattr(self, 'beat_callback') and len(r_peaks) > 0:
+            self.beat_callback((len(signal) - 1 - r_peaks[-1]) / fs, metrics['HR'])
+
+    def _update_from_service(self):
+        """Thin-client tick: append the batches the acquisition service sent since the last one."""
+        tick = time.perf_counter()
+        client = self.service_client
+        batches = client.drain()
+        missed, client.samples_missed = client.samples_missed, 0
+        SAMPLES_DROPPED.inc(missed)
+        message = client.take_metrics()
+        if message is not None:
+            self.live_metrics = (message["metrics"], message["rhythm"])
+            if hasattr(self, 'dashboard_callback'):
+                self.dashboard_callback(message["metrics"])
+            if hasattr(self, 'beat_callback') and message["beat_age"] is not None:
+                self.beat_callback(message["beat_age"], message["metrics"]["HR"])
+        if not batches:
+            if not client.connected:
+                log.warning("Acquisition service closed the connection")
+                self.timer.stop()
+                client.close()
+                self.service_client = None
+                self.show_connection_warning("The acquisition service has stopped.")
+            return
+        index = {lead: i for i, lead in enumerate(client.leads)}
+        for start, data in batches:
+            latency_trace.received()
+            for lead in self.leads:
+                buf = self.data[lead]
+                buf.extend(data[index[lead]])
+                del buf[:-self.buffer_size]
+            SAMPLES_RECEIVED.inc(len(data[0]))
+        latency_trace.mark("parse")
+        try:
+            self._redraw_grid(tick)
+        except Exception as e:
+            log.warning("Error drawing ECG data: %s", e)
+
+    def _redraw_grid(self, tick):
+        """Publish the live Lead II window and redraw the lead grid from self.data."""
+        # Write latest Lead II data to file for dashboard
+        try:
+            import json
+            with open('lead_ii_live.json', 'w') as f:
+                json.dump(self.data["II"][-500:], f)
+        except Exception as e:
+            log.warning("Error writing lead_ii_live.json: %s", e)
+        for i, lead in enumerate(self.leads):
+            if len(self.data[lead]) > 0:
+                if len(self.data[lead]) < self.buffer_size:
+                    data = np.full(self.buffer_size, np.nan)
+                    data[-len(self.data[lead]):] = self.data[lead]
+                else:
+                    data = np.array(self.data[lead])
+                centered = data - np.nanmean(data)
+                self.lines[i].set_ydata(centered)
+                self.axs[i].set_ylim(-400, 400)
+        latency_trace.mark("filter")
+        for i, lead in enumerate(self.leads):
+            if len(self.data[lead]) > 0:
+                self.canvases[i].draw_idle()
+        if self.page_stack.currentIndex() == 0 and self.canvases:  # the detailed view schedules its own redraw
+            latency_trace.mark("schedule")
+            self._frame_scheduled(tick, self.canvases[-1])
 
     def export_pdf(self):
+        from ecg.export import BufferSource
+        from ecg.paper_pdf import LAYOUTS
+        from ecg.session_store import SessionReader
         path, _ = QFileDialog.getSaveFileName(self, "Export ECG Data as PDF", "", "PDF Files (*.pdf)")
-        if path:
-            from matplotlib.backends.backend_pdf import PdfPages
-            with PdfPages(path) as pdf:
-                for fig in self.figures:
-                    pdf.savefig(fig)
+        if not path:
+            return
+        if not path.lower().endswith(".pdf"):
+            path += ".pdf"
+        names = list(LAYOUTS.values())
+        name, ok = QInputDialog.getItem(self, "Export as PDF", "Paper layout (25 mm/s, 10 mm/mV):", names, 0, False)
+        if not ok:
+            return
+        layout = list(LAYOUTS)[names.index(name)]
+        # Print the whole recorded session when there is one, else the live buffer
+        session_path = self.recording.session_path
+        try:
+            if session_path and os.path.exists(session_path):
+                source = SessionReader(session_path)
+            else:
+                source = BufferSource(self.data, self.leads)
+        except Exception as e:
+            QMessageBox.warning(self, "Export", f"Could not open recording:\n{e}")
+            return
+        self._start_export(source, path, "pdf", "Printing ECG pages...", layout=layout)
 
     def export_csv(self):
-        path, _ = QFileDialog.getSaveFileName(self, "Export ECG Data as CSV", "", "CSV Files (*.csv)")
-        if path:
-            with open(path, 'w', newline='') as f:
-                writer = csv.writer(f)
-                writer.writerow(["Sample"] + self.leads)
-                for i in range(self.buffer_size):
-                    row = [i]
-                    for lead in self.leads:
-                        if i < len(self.data[lead]):
-                            row.append(self.data[lead][i])
-                        else:
-                            row.append("")
-                    writer.writerow(row)
+        from ecg.export import BufferSource, EXPORT_FORMATS, SESSION_ONLY_FORMATS
+        from ecg.session_store import SessionReader
+        filters = ";;".join(EXPORT_FORMATS.values())
+        path, chosen = QFileDialog.getSaveFileName(self, "Export ECG Data", "", filters)
+        if not path:
+            return
+        fmt = next(key for key, value in EXPORT_FORMATS.items() if value == chosen) if chosen else "csv"
+        if not path.lower().endswith("." + fmt):
+            path += "." + fmt
+        # Export the whole recorded session when there is one, else the live buffer
+        session_path = self.recording.session_path
+        try:
+            if session_path and os.path.exists(session_path):
+                source = SessionReader(session_path)
+            elif fmt in SESSION_ONLY_FORMATS:
+                QMessageBox.warning(self, "Export", "EDF+ and WFDB export need a recorded session.")
+                return
+            else:
+                source = BufferSource(self.data, self.leads)
+        except Exception as e:
+            QMessageBox.warning(self, "Export", f"Could not open recording:\n{e}")
+            return
+        self._start_export(source, path, fmt, "Exporting ECG data...")
+
+    def _start_export(self, source, path, fmt, label, **options):
+        """Run an export on an ExportWorker behind a cancellable progress dialog."""
+        from ecg.export import ExportWorker
+        progress = QProgressDialog(label, "Cancel", 0, 100, self)
+        progress.setWindowTitle("Export")
+        progress.setAutoClose(True)
+        worker = ExportWorker(source, path, fmt, self, **options)
+        worker.progress.connect(progress.setValue)
+        progress.canceled.connect(worker.cancel)
+        worker.done.connect(lambda p: QMessageBox.information(self, "Export", f"ECG data exported:\n{p}"))
+        worker.failed.connect(lambda msg: QMessageBox.warning(self, "Export", f"Export failed:\n{msg}"))
+        worker.finished.connect(progress.reset)
+        worker.finished.connect(lambda: self._export_workers.remove(worker))
+        self._export_workers.append(worker)
+        progress.show()
+        worker.start()
+
+    def closeEvent(self, event):
+        self.metrics_log.close()
+        super().closeEvent(event)
 
     def go_back(self):
         # Go back to dashboard (assumes dashboard is at index 0)
@@ -813,12 +944,36 @@ class ECGTestPage(QWidget):
                 widget.setParent(None)
 
     def show_save_ecg(self):
-        # ...user's full show_save_ecg code here...
-        QMessageBox.information(self, "Save ECG", "Save ECG UI would show here.")
+        if self.recording.recording:
+            QMessageBox.warning(self, "Save ECG", "Stop the acquisition before saving the recording.")
+            return
+        if not self.recording.session_path:
+            QMessageBox.information(self, "Save ECG", "No ECG has been recorded yet.")
+            return
+        path, _ = QFileDialog.getSaveFileName(self, "Save ECG Recording", "", "ECG Session (*.ecgs)")
+        if not path:
+            return
+        if not path.endswith(".ecgs"):
+            path += ".ecgs"
+        try:
+            self.recording.save_recording(path)
+        except Exception as e:
+            QMessageBox.warning(self, "Save ECG", f"Could not save recording:\n{e}")
+            return
+        QMessageBox.information(self, "Save ECG", f"ECG recording saved:\n{path}")
 
     def show_open_ecg(self):
-        # ...user's full show_open_ecg code here...
-        QMessageBox.information(self, "Open ECG", "Open ECG UI would show here.")
+        path, _ = QFileDialog.getOpenFileName(self, "Open ECG Recording", "recordings", "ECG Session (*.ecgs)")
+        if not path:
+            return
+        from ecg.session_viewer import SessionViewer
+        try:
+            win = SessionViewer(path)
+        except Exception as e:
+            QMessageBox.warning(self, "Open ECG", f"Could not open recording:\n{e}")
+            return
+        win.show()
+        self._session_viewer = win
 
     def show_working_mode(self):
         # ...user's full show_working_mode code here...
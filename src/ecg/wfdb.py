@@ -0,0 +1,231 @@
+import os
+import datetime
+import numpy as np
+from ecg.session_store import SessionWriter
+from ecg.session_index import SessionIndex, index_path, EVENT_ANNOTATION, EVENT_ARRHYTHMIA, EVENT_BEAT
+
+# --- WFDB (https://physionet.org/physiotools/wag/) ---
+# <record>.hea  text header: record line + one line per signal
+# <record>.dat  format 16: interleaved little-endian int16 frames, exactly
+#               the session store's layout transposed, so blocks stream
+#               straight through
+# <record>.atr  MIT annotation file: 16-bit words, 6-bit type + 10-bit
+#               sample delta; SKIP/AUX pseudo-annotations for long gaps
+#               and rhythm/comment text
+
+NORMAL = 1
+NOTE = 22
+RHYTHM = 28
+SKIP = 59
+AUX = 63
+MAX_DELTA = 1023
+
+
+def record_paths(record):
+    """(header, signal, annotation) paths for a record path without extension."""
+    return record + ".hea", record + ".dat", record + ".atr"
+
+
+class WFDBWriter:
+    """
+    Streaming WFDB format 16 writer. The header is written on close, once
+    the sample count and per-lead checksums are known.
+    Args:
+        record: Output path without extension
+        leads: Signal names
+        fs: Sampling frequency
+        gain: ADC counts per mV
+    """
+    def __init__(self, record, leads, fs, gain=1.0, start_time=None):
+        self.record = record
+        self.name = os.path.basename(record)
+        self.leads = list(leads)
+        self.fs = fs
+        self.gain = gain
+        self.start = datetime.datetime.fromtimestamp(start_time) if start_time else None
+        self.n_samples = 0
+        self._checksum = np.zeros(len(self.leads), dtype=np.int64)
+        self._initial = None
+        self._file = open(record_paths(record)[1], "wb")
+
+    def write_block(self, block):
+        block = np.asarray(block, dtype="<i2")
+        if not block.shape[1]:
+            return
+        if self._initial is None:
+            self._initial = block[:, 0].copy()
+        self._file.write(np.ascontiguousarray(block.T).tobytes())
+        self._checksum += block.sum(axis=1, dtype=np.int64)
+        self.n_samples += block.shape[1]
+
+    def close(self):
+        self._file.close()
+        initial = self._initial if self._initial is not None else np.zeros(len(self.leads), dtype=np.int16)
+        checksum = ((self._checksum + 32768) % 65536) - 32768  # 16-bit two's complement sum
+        fs = f"{self.fs:g}"
+        line = f"{self.name} {len(self.leads)} {fs} {self.n_samples}"
+        if self.start:
+            line += f" {self.start:%H:%M:%S} {self.start:%d/%m/%Y}"
+        lines = [line]
+        for i, lead in enumerate(self.leads):
+            lines.append(f"{self.name}.dat 16 {self.gain:g}(0)/mV 16 0 {int(initial[i])} {int(checksum[i])} 0 {lead}")
+        with open(record_paths(self.record)[0], "w") as f:
+            f.write("\n".join(lines) + "\n")
+
+    def abort(self):
+        """Close without writing the header (the caller removes the .dat)."""
+        self._file.close()
+
+
+def write_annotations(path, annotations):
+    """
+    Write an MIT format annotation file.
+    Args:
+        annotations: (sample, code, aux text or None) tuples, any order
+    """
+    words = []
+    last = 0
+    for sample, code, aux in sorted(annotations, key=lambda a: a[0]):
+        delta = int(sample) - last
+        if delta > MAX_DELTA:
+            words.append(SKIP << 10)
+            words.extend([(delta >> 16) & 0xFFFF, delta & 0xFFFF])
+            delta = 0
+        words.append((code << 10) | delta)
+        if aux:
+            raw = aux.encode("utf-8")[:255]
+            words.append((AUX << 10) | len(raw))
+            if len(raw) % 2:
+                raw += b"\x00"
+            words.extend(np.frombuffer(raw, dtype="<u2").tolist())
+        last = int(sample)
+    words.append(0)
+    np.array(words, dtype="<u2").tofile(path)
+
+
+def read_annotations(path):
+    """Read an MIT annotation file into (sample, code, aux) tuples."""
+    words = np.fromfile(path, dtype="<u2")
+    out = []
+    sample = 0
+    i = 0
+    while i < len(words):
+        code, value = int(words[i]) >> 10, int(words[i]) & MAX_DELTA
+        i += 1
+        if code == 0 and value == 0:
+            break
+        if code == SKIP:
+            sample += (int(words[i]) << 16) | int(words[i + 1])
+            i += 2
+        elif code == AUX:
+            raw = words[i:i + (value + 1) // 2].tobytes()[:value]
+            i += (value + 1) // 2
+            if out:
+                out[-1] = (out[-1][0], out[-1][1], raw.decode("utf-8", "replace"))
+        else:
+            sample += value
+            out.append((sample, code, None))
+    return out
+
+
+class WFDBReader:
+    """Format 16 record reader; read() pulls frames through a memmap of the .dat file."""
+    def __init__(self, record):
+        self.record = record
+        header, dat, self.annotation_path = record_paths(record)
+        with open(header) as f:
+            lines = [l.strip() for l in f if l.strip() and not l.startswith("#")]
+        fields = lines[0].split()
+        n_sig = int(fields[1])
+        self.fs = float(fields[2].split("/")[0])
+        self.start = None
+        if len(fields) >= 6:
+            self.start = datetime.datetime.strptime(f"{fields[5]} {fields[4].split('.')[0]}", "%d/%m/%Y %H:%M:%S")
+        self.leads = []
+        gains = []
+        for line in lines[1:1 + n_sig]:
+            parts = line.split()
+            if parts[1] != "16":
+                raise ValueError(f"Only WFDB format 16 is supported (got {parts[1]})")
+            gains.append(float(parts[2].split("(")[0].split("/")[0]) if len(parts) > 2 else 200.0)
+            self.leads.append(parts[8] if len(parts) > 8 else f"sig{len(self.leads)}")
+        self.gain = gains[0] or 200.0
+        size = os.path.getsize(dat)
+        self.n_samples = size // (2 * n_sig)
+        self._data = np.memmap(dat, dtype="<i2", mode="r", shape=(self.n_samples, n_sig)) if self.n_samples else None
+
+    def read(self, start=0, stop=None, leads=None):
+        stop = self.n_samples if stop is None else min(stop, self.n_samples)
+        rows = list(range(len(self.leads))) if leads is None else [self.leads.index(l) for l in leads]
+        if self._data is None or start >= stop:
+            return np.zeros((len(rows), 0), dtype=np.int16)
+        return np.ascontiguousarray(self._data[start:stop, rows].T)
+
+    def iter_blocks(self, block_samples):
+        for start in range(0, self.n_samples, block_samples):
+            yield start, self.read(start, start + block_samples)
+
+    def annotations(self):
+        return read_annotations(self.annotation_path) if os.path.exists(self.annotation_path) else []
+
+    def close(self):
+        self._data = None
+
+
+def export_wfdb(reader, record, index=None, beats=None, block_samples=None, progress=None):
+    """
+    Convert a session to a WFDB record (.hea/.dat, plus .atr when there
+    are beats or events) chunk by chunk. progress(done, total) may raise to abort.
+    """
+    writer = WFDBWriter(record, reader.leads, reader.fs, gain=reader.gain, start_time=reader.start_time)
+    total = reader.n_samples
+    try:
+        for start, block in reader.iter_blocks(block_samples):
+            writer.write_block(block)
+            if progress:
+                progress(min(start + block.shape[1], total), total)
+    except BaseException:
+        writer.abort()
+        raise
+    writer.close()
+    annotations = [(int(b), NORMAL, None) for b in (beats if beats is not None else [])]
+    for ev in index.events if index is not None else []:
+        if ev["kind"] == EVENT_BEAT:
+            annotations.append((ev["start"], NORMAL, None))
+        elif ev["kind"] == EVENT_ARRHYTHMIA:
+            # Rhythm changes: "(label" at the onset, "(N" when the episode ends
+            annotations.append((ev["start"], RHYTHM, "(" + ev["label"]))
+            annotations.append((ev["end"], RHYTHM, "(N"))
+        else:
+            annotations.append((ev["start"], NOTE, ev["label"]))
+    if annotations:
+        write_annotations(record_paths(record)[2], annotations)
+
+
+def import_wfdb(record, session_path, codec="raw", block_samples=50000):
+    """Convert a format 16 WFDB record (and its .atr, if any) into a session."""
+    wf = WFDBReader(record)
+    start_time = wf.start.timestamp() if wf.start else None
+    writer = SessionWriter(session_path, wf.leads, fs=wf.fs, gain=wf.gain, start_time=start_time, codec=codec)
+    t0 = writer.header["start_time"]
+    for start, block in wf.iter_blocks(block_samples):
+        writer.append_block(block, t0 + start / wf.fs)
+    writer.close()
+    wf.close()
+    events = []
+    episode = None
+    for sample, code, aux in wf.annotations():
+        if code == RHYTHM and aux:
+            if episode:
+                events.append({"start": episode[0], "end": sample, "kind": EVENT_ARRHYTHMIA, "label": episode[1]})
+                episode = None
+            if aux != "(N":
+                episode = (sample, aux.lstrip("("))
+        elif code == NOTE:
+            events.append({"start": sample, "end": sample, "kind": EVENT_ANNOTATION, "label": aux or ""})
+        else:
+            events.append({"start": sample, "end": sample, "kind": EVENT_BEAT, "label": "N"})
+    if episode:
+        events.append({"start": episode[0], "end": wf.n_samples, "kind": EVENT_ARRHYTHMIA, "label": episode[1]})
+    SessionIndex(writer.chunk_table(), writer.fs, events).save(index_path(session_path))
+    return session_path
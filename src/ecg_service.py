@@ -0,0 +1,73 @@
+"""
+Headless acquisition and analysis service.
+
+Run from src/:
+    python ecg_service.py --port /dev/ttyUSB0 --baud 115200 [--patient NAME] [--socket PATH]
+    python ecg_service.py --simulated [--no-record]
+
+Owns the device: reads it, derives the 12 leads, records the session and
+analyses Lead II, with no Qt or display. The 12-lead page (or any other
+client of ecg.acquisition_service) attaches through the Unix socket,
+"Acquisition service" in its port list, and can detach again without
+interrupting the recording. Stops cleanly on Ctrl+C or SIGTERM.
+"""
+import sys
+import signal
+import argparse
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Acquire, record and analyse ECG without the GUI")
+    device = parser.add_mutually_exclusive_group(required=True)
+    device.add_argument("--port", help="serial port of the acquisition board")
+    device.add_argument("--simulated", action="store_true", help="use a synthetic device (ecg.synthetic)")
+    parser.add_argument("--baud", type=int, default=115200, help="baud rate of the serial port")
+    parser.add_argument("--socket", help="socket path clients connect to (default: $ECG_SERVICE_SOCKET or the temp dir)")
+    parser.add_argument("--patient", default="", help="patient id stored with the session")
+    parser.add_argument("--no-record", action="store_true", help="publish only, do not write a session file")
+    args = parser.parse_args(argv)
+
+    from ecg.journal import recover_journals
+    from ecg.catalog import default_catalog
+    from ecg.session_store import RECORDINGS_DIR
+    from ecg.acquisition_service import AcquisitionService, service_running, service_socket
+    from utils.logs import get_logger
+    log = get_logger("service")
+    # Before any housekeeping: a running service owns its session and journal
+    socket_path = args.socket or service_socket()
+    if service_running(socket_path):
+        log.error("An acquisition service is already running on %s", socket_path)
+        return 1
+    # Same housekeeping as the app's startup (main.prepare_recordings): sessions cut short by a crash
+    recover_journals(RECORDINGS_DIR)
+    try:
+        default_catalog().scan(RECORDINGS_DIR)
+    except Exception as e:
+        log.warning("Could not update session catalog: %s", e)
+
+    if args.simulated:
+        from ecg.synthetic import SimulatedSerial
+        ser = SimulatedSerial(seed=0)
+    else:
+        import serial
+        ser = serial.Serial(args.port, args.baud, timeout=1)
+    service = AcquisitionService(ser, socket_path=socket_path, patient_id=args.patient, record=not args.no_record)
+    try:
+        service.start()
+    except (OSError, RuntimeError) as e:
+        log.error("Could not start the acquisition service: %s", e)
+        ser.close()
+        return 1
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: service.stop())
+    print(f"Acquiring; clients connect to {service.socket_path} (Ctrl+C to stop)")
+    if service.recording is not None:
+        print(f"Recording to {service.recording.session_path}")
+    while not service.wait(1.0):
+        pass
+    print(f"Stopped after {service.sample_index} samples")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,16 +1,24 @@
 import sys
+# Startup tracing (ECG_STARTUP_TRACE=file or --trace) has to be on before the
+# other imports so they show up in the timeline
+from utils import startup_trace
+startup_trace.enable_from_env_or_argv()
 import os
 import json
+import time
 from PyQt5.QtWidgets import (
     QApplication, QDialog, QLabel, QLineEdit, QPushButton, QVBoxLayout, QHBoxLayout, QMessageBox, QStackedWidget, QWidget, QInputDialog, QSizePolicy
 )
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QThread, pyqtSignal
 from PyQt5.QtGui import QFont, QPixmap
 from auth.sign_in import SignIn
 from auth.sign_out import SignOut
-from dashboard.dashboard import Dashboard
 from splash_screen import SplashScreen
-from ecg.pan_tompkins import pan_tompkins
+from utils.logs import get_logger
+# Dashboard (matplotlib) and the ECG analysis stack (SciPy) are imported
+# after sign-in, so the splash and login dialog come up on PyQt alone.
+
+log = get_logger("main")
 
 
 def resource_path(relative_path):
@@ -22,6 +30,24 @@ def resource_path(relative_path):
 
 USER_DATA_FILE = resource_path("users.json")
 
+# Startup budget in seconds, checked on every launch (and by bench.startup)
+STARTUP_BUDGET = {
+    "splash_to_login": 1.0,
+    "login_to_dashboard": 2.0,
+}
+
+
+def check_budget(phase, seconds):
+    """Log a startup phase duration, as a warning when it is over STARTUP_BUDGET."""
+    budget = STARTUP_BUDGET.get(phase)
+    over = budget is not None and seconds > budget
+    if over:
+        log.warning("Startup: %s %.2f s (over %.1f s budget)", phase, seconds, budget)
+    else:
+        log.info("Startup: %s %.2f s", phase, seconds)
+    startup_trace.mark(phase, seconds=seconds, budget=budget)
+    return not over
+
 
 def load_users():
     if os.path.exists(USER_DATA_FILE):
@@ -60,6 +86,7 @@ class LoginRegisterDialog(QDialog):
         from auth.sign_in import SignIn
         self.sign_in_logic = SignIn()
         self.init_ui()
+        startup_trace.first_paint(self)
         self.result = False
         self.username = None
         self.user_details = {}
@@ -71,6 +98,7 @@ class LoginRegisterDialog(QDialog):
         qr.moveCenter(cp)
         self.move(qr.topLeft())
 
+    @startup_trace.traced
     def init_ui(self):
         # Set up GIF background
         self.bg_label = QLabel(self)
@@ -347,6 +375,7 @@ class LoginRegisterDialog(QDialog):
 def plot_ecg_with_peaks(ax, ecg_signal, sampling_rate=500, arrhythmia_result=None, r_peaks=None, use_pan_tompkins=False):
     import numpy as np
     from scipy.signal import find_peaks
+    from ecg.pan_tompkins import pan_tompkins
     # Use only the last 500 samples for live effect (1 second at 500Hz)
     window_size = 500
     if len(ecg_signal) > window_size:
@@ -423,22 +452,77 @@ def plot_ecg_with_peaks(ax, ecg_signal, sampling_rate=500, arrhythmia_result=Non
     ax.grid(False)
 
 
+@startup_trace.traced
+def prepare_recordings(journals=None):
+    """Startup housekeeping for the recordings directory; returns recovered session paths."""
+    # Replay acquisitions interrupted by a crash into proper session files
+    from ecg.journal import recover_journals
+    from ecg.session_store import RECORDINGS_DIR
+    recovered = recover_journals(RECORDINGS_DIR, journals=journals)
+    # Catalog recovered sessions and any recorded before the catalog existed
+    from ecg.catalog import default_catalog
+    try:
+        default_catalog().scan(RECORDINGS_DIR)
+    except Exception as e:
+        log.warning("Could not update session catalog: %s", e)
+    return recovered
+
+
+class RecordingsWorker(QThread):
+    """
+    Runs prepare_recordings() off the GUI thread, so a large recordings
+    directory does not hold up the login window. The journals to replay are
+    listed when the worker is created: a recording started meanwhile writes
+    its own journal, which must not be "recovered".
+    """
+    recovered = pyqtSignal(list)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        from ecg.journal import find_journals
+        from ecg.session_store import RECORDINGS_DIR
+        self.journals = find_journals(RECORDINGS_DIR)
+
+    def run(self):
+        self.recovered.emit(prepare_recordings(self.journals))
+
+
+def show_recovered(paths):
+    if paths:
+        QMessageBox.information(QApplication.activeWindow(), "Recovered ECG",
+                                "Recovered interrupted recording(s):\n" + "\n".join(paths))
+
+
 def main():
     app = QApplication(sys.argv)
     splash = SplashScreen()
     splash.show()
     app.processEvents()
+    t_splash = time.perf_counter()
     login = LoginRegisterDialog()
+    # finish() waits (up to 1 s) for the window to be exposed, so show it first
+    login.show()
     splash.finish(login)
+    check_budget("splash_to_login", time.perf_counter() - t_splash)
+    # Crash recovery and the catalog scan run once the login window is up
+    recordings = RecordingsWorker()
+    recordings.recovered.connect(show_recovered)
+    recordings.start()
     while True:
         if login.exec_() == QDialog.Accepted and login.result:
+            t_login = time.perf_counter()
+            from dashboard.dashboard import Dashboard
             dashboard = Dashboard(username=login.username, role=None)
             dashboard.show()
+            app.processEvents()
+            check_budget("login_to_dashboard", time.perf_counter() - t_login)
+            startup_trace.save()
             app.exec_()
             # After dashboard closes (sign out), show login again (reuse dialog)
             login = LoginRegisterDialog()
         else:
             break
+    recordings.wait()
 
 
 if __name__ == "__main__":
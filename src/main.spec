@@ -5,7 +5,7 @@ a = Analysis(
     ['main.py'],
     pathex=[],
     binaries=[],
-    datas=[('../assets', 'assets'), ('../users.json', '.')],
+    datas=[('../assets', 'assets'), ('../users.json', '.'), ('ecg/templates', 'ecg/templates')],
     hiddenimports=[],
     hookspath=[],
     hooksconfig={},
@@ -0,0 +1,106 @@
+import os
+import time
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+from PyQt5.QtNetwork import QTcpSocket
+from utils.logs import get_logger
+
+log = get_logger("connectivity")
+
+# --- Connectivity probe ---
+# A TCP connect to a well-known endpoint, done with QTcpSocket on the Qt
+# event loop so the GUI thread never blocks on the network. While offline
+# the interval between probes doubles up to max_interval_ms; the first
+# success goes back to interval_ms.
+#
+# The target comes from ECG_CONNECTIVITY_PROBE=host:port (default
+# 8.8.8.8:53). For testing, point it at any local listener, e.g.
+#   python -m http.server 8053 &
+#   ECG_CONNECTIVITY_PROBE=127.0.0.1:8053 python main.py
+
+PROBE_ENV = "ECG_CONNECTIVITY_PROBE"
+DEFAULT_TARGET = ("8.8.8.8", 53)
+
+
+def probe_target():
+    """(host, port) from ECG_CONNECTIVITY_PROBE, or the default."""
+    value = os.environ.get(PROBE_ENV, "").strip()
+    if not value:
+        return DEFAULT_TARGET
+    host, _, port = value.rpartition(":")
+    try:
+        return (host or value).strip("[]"), int(port)
+    except ValueError:
+        log.warning("Ignoring %s=%r: expected host:port", PROBE_ENV, value)
+        return DEFAULT_TARGET
+
+
+class ConnectivityProbe(QObject):
+    """
+    Periodic, non-blocking reachability check.
+    Args:
+        host, port: Endpoint to connect to (default: probe_target())
+        interval_ms: Time between probes while online
+        timeout_ms: A connect that takes longer counts as offline
+        max_interval_ms: Backoff ceiling while offline
+    """
+    checked = pyqtSignal(bool, float)  # online, connect time in ms (or -1)
+    status_changed = pyqtSignal(bool)
+
+    def __init__(self, host=None, port=None, interval_ms=3000, timeout_ms=2000, max_interval_ms=60000,
+                 parent=None):
+        super().__init__(parent)
+        default_host, default_port = probe_target()
+        self.host = host or default_host
+        self.port = port or default_port
+        self.interval_ms = interval_ms
+        self.timeout_ms = timeout_ms
+        self.max_interval_ms = max_interval_ms
+        self.online = None  # unknown until the first probe finishes
+        self.next_interval_ms = interval_ms
+        self._socket = None
+        self._started = 0.0
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self.check)
+        self._deadline = QTimer(self)
+        self._deadline.setSingleShot(True)
+        self._deadline.timeout.connect(lambda: self._finish(False))
+
+    def start(self):
+        """Probe now, then keep probing on the backoff schedule."""
+        self._timer.start(0)
+
+    def stop(self):
+        self._timer.stop()
+        self._deadline.stop()
+        if self._socket is not None:
+            self._socket.abort()
+            self._socket.deleteLater()
+            self._socket = None
+
+    def check(self):
+        """Start one probe unless one is already in flight; the result arrives via checked."""
+        if self._socket is not None:
+            return
+        self._socket = QTcpSocket(self)
+        self._socket.connected.connect(lambda: self._finish(True))
+        self._socket.errorOccurred.connect(lambda _err: self._finish(False))
+        self._started = time.perf_counter()
+        self._deadline.start(self.timeout_ms)
+        self._socket.connectToHost(self.host, self.port)
+
+    def _finish(self, ok):
+        if self._socket is None:
+            return
+        self._deadline.stop()
+        elapsed = (time.perf_counter() - self._started) * 1000 if ok else -1.0
+        sock, self._socket = self._socket, None
+        sock.abort()
+        sock.deleteLater()
+        changed = ok != self.online
+        self.online = ok
+        self.next_interval_ms = self.interval_ms if ok else min(self.next_interval_ms * 2, self.max_interval_ms)
+        self._timer.start(self.next_interval_ms)
+        self.checked.emit(ok, elapsed)
+        if changed:
+            self.status_changed.emit(ok)
@@ -1,34 +1,138 @@
+import time
+import numpy as np
 from PyQt5.QtWidgets import QLabel
 from PyQt5.QtGui import QPixmap
-from PyQt5.QtCore import Qt, QPropertyAnimation, pyqtProperty
-
-class HeartbeatLabel(QLabel):
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self._scale = 1.0
-        self._pixmap = QPixmap(r"assets/vheart2.png")
-        if not self._pixmap.isNull():
-            self.setPixmap(self._pixmap.scaledToWidth(120, Qt.SmoothTransformation))
+from PyQt5.QtCore import Qt, QTimer
+
+# --- Heartbeat animation ---
+# Smooth-scaling a pixmap on every animation tick costs a full resample of
+# the image 30+ times a second on the GUI thread. Instead one beat cycle of
+# pre-scaled frames is rendered once (again only when the size or the
+# screen's device pixel ratio changes) and the timer just picks the frame
+# for the current point in the cycle; a tick that lands on the frame
+# already shown does nothing.
+#
+# The cycle is free-running at period seconds until sync_to_beat() is fed
+# detected R-peaks, after which each cycle starts on the latest R-peak and
+# lasts one RR interval.
+
+FRAME_MS = 30  # ~33 FPS
+
+
+def dashboard_beat(n):
+    """Scale factors of the dashboard's double-bump beat, peak first."""
+    phase = np.arange(n) * 2 * np.pi / n
+    scales = 1 + 0.13 * np.sin(phase) + 0.07 * np.sin(2 * phase)
+    return np.roll(scales, -int(np.argmax(scales)))
+
+
+def pulse_beat(n, peak=1.18):
+    """Scale factors of a linear 1 -> peak -> 1 pulse, peak first."""
+    t = np.arange(n) / n
+    return np.roll(1 + (peak - 1) * (1 - np.abs(2 * t - 1)), -(n // 2))
+
+
+def heartbeat_frames(pixmap, base_size, scales, dpr=1.0):
+    """
+    Pre-scaled copies of pixmap, one per scale factor.
+    Args:
+        base_size: Logical size (px) at scale 1.0
+        scales: Scale factor of each frame
+        dpr: Device pixel ratio; frames are rendered at physical resolution
+    Returns:
+        list of QPixmap
+    """
+    frames = []
+    for scale in scales:
+        size = max(1, int(round(base_size * scale * dpr)))
+        frame = pixmap.scaled(size, size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        frame.setDevicePixelRatio(dpr)
+        frames.append(frame)
+    return frames
+
+
+class BeatingHeart(QLabel):
+    """
+    Label that shows an image pulsing with the heartbeat.
+    Args:
+        image: Path of the heart image
+        base_size: Logical size (px) at rest
+        scales: Scale factor per frame for one beat (peak first)
+        period: Seconds per beat while not synced to R-peaks
+    """
+    def __init__(self, image, base_size=220, scales=None, period=1.05, parent=None):
+        super().__init__(parent)
+        self._pixmap = QPixmap(image)
+        self.base_size = base_size
+        self.scales = dashboard_beat(35) if scales is None else np.asarray(scales, dtype=float)
+        self.period = period
+        self._frames = []
+        self._frames_key = None
+        self._index = -1
+        self._anchor = time.monotonic()  # start of the current beat
+        self._last_beat = float("-inf")  # last R-peak passed to sync_to_beat()
+        self.setAlignment(Qt.AlignCenter)
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self.tick)  # runs while the label is visible
+
+    def set_base_size(self, base_size):
+        self.base_size = base_size
+        self._frames_key = None
+
+    def _ensure_frames(self):
+        dpr = self.devicePixelRatioF()
+        key = (self.base_size, dpr)
+        if key != self._frames_key:
+            self._frames = heartbeat_frames(self._pixmap, self.base_size, self.scales, dpr) \
+                if not self._pixmap.isNull() else []
+            self._frames_key = key
+            self._index = -1
+
+    def frame_index(self, now=None):
+        """Frame for the current point in the beat cycle."""
+        now = time.monotonic() if now is None else now
+        elapsed = (now - self._anchor) % self.period
+        return min(len(self.scales) - 1, int(elapsed / self.period * len(self.scales)))
+
+    def tick(self):
+        self._ensure_frames()
+        if not self._frames:
+            return
+        index = self.frame_index()
+        if index != self._index:
+            self._index = index
+            self.setPixmap(self._frames[index])
+
+    def sync_to_beat(self, seconds_ago, heart_rate=None):
+        """
+        Line the animation up with the live ECG.
+        Args:
+            seconds_ago: Age of the most recently detected R-peak
+            heart_rate: Current heart rate (bpm); sets the beat period
+        """
+        if heart_rate and 20 <= heart_rate <= 300:
+            self.period = 60.0 / heart_rate
+        beat = time.monotonic() - seconds_ago
+        # The same R-peak is reported again on every update as the analysis
+        # window slides; only a peak well away from the last one starts a beat.
+        if abs(beat - self._last_beat) > 0.25 * self.period:
+            self._anchor = self._last_beat = beat
+
+    def showEvent(self, event):
+        self._timer.start(FRAME_MS)
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self._timer.stop()
+        super().hideEvent(event)
+
+
+class HeartbeatLabel(BeatingHeart):
+    def __init__(self, parent=None):
+        super().__init__(r"assets/vheart2.png", base_size=120, scales=pulse_beat(24), period=0.7, parent=parent)
         self.setAlignment(Qt.AlignHCenter | Qt.AlignBottom)
         self.setStyleSheet("margin-top: 16px; margin-bottom: 0; filter: drop-shadow(0px 0px 12px #ff6600);")
-        self.anim = QPropertyAnimation(self, b"scale")
-        self.anim.setDuration(700)
-        self.anim.setStartValue(1.0)
-        self.anim.setKeyValueAt(0.5, 1.18)
-        self.anim.setEndValue(1.0)
-        self.anim.setLoopCount(-1)
-        self.anim.start()
-
-    def getScale(self):
-        return self._scale
-
-    def setScale(self, scale):
-        self._scale = scale
-        if not self._pixmap.isNull():
-            size = int(120 * scale)
-            self.setPixmap(self._pixmap.scaled(size, size, Qt.KeepAspectRatio, Qt.SmoothTransformation))
-
-    scale = pyqtProperty(float, fget=getScale, fset=setScale)
+
 
 def heartbeat_image_widget():
     return HeartbeatLabel()
@@ -0,0 +1,197 @@
+import os
+import csv
+import time
+import atexit
+import collections
+import numpy as np
+from PyQt5.QtWidgets import QLabel
+from PyQt5.QtCore import Qt, QObject, QEvent, QTimer
+
+# --- Sample-to-pixel latency ---
+# Opt-in tracing of how long a sample takes from the serial port to the
+# screen. Every batch of samples read from the device is stamped with
+# time.perf_counter() (monotonic) when it is received, and then with the
+# time it passes each stage of the live pipeline:
+#   parse     line decoded and appended to the lead buffers
+#   filter    display conditioning (baseline removal) done, traces updated
+#   analysis  fiducials/metrics computed (detailed Lead II view only)
+#   schedule  redraw of the canvas showing it requested (draw_idle)
+#   paint     first paint event of a watched canvas after the schedule
+# A stage's latency is its stamp minus the receive stamp. With a device that
+# knows when it sent a frame (ecg.synthetic.SimulatedSerial) the time spent
+# in the input buffer is reported too, as "device", and "total" runs from
+# the send time to the paint.
+#
+# Enable with ECG_LATENCY_TRACE=<file.csv> (one row per painted batch is
+# written there at exit, or by save()), or with Ctrl+Shift+L on the 12-lead
+# page, which also shows the overlay. When disabled every hook is a no-op.
+
+TRACE_ENV = "ECG_LATENCY_TRACE"
+DEFAULT_TRACE_FILE = "latency_trace.csv"
+STAGES = ["parse", "filter", "analysis", "schedule", "paint"]
+REPORTED = ["device"] + STAGES + ["total"]
+WINDOW = 2000  # batches the percentiles are computed over
+MAX_LOG = 200000  # painted batches kept for save()
+
+_open = None  # batches received and not painted yet, while enabled
+_recent = None
+_log = None
+_path = None
+
+
+def enabled():
+    return _open is not None
+
+
+def enable(path=DEFAULT_TRACE_FILE):
+    """Start stamping batches; the log is written to path at exit (or by save())."""
+    global _open, _recent, _log, _path
+    if _open is not None:
+        return
+    _open = []
+    _recent = collections.deque(maxlen=WINDOW)
+    _log = collections.deque(maxlen=MAX_LOG)
+    _path = path
+    atexit.register(save)
+
+
+def enable_from_env():
+    path = os.environ.get(TRACE_ENV)
+    if path:
+        enable(path)
+
+
+def received(source_time=None, now=None):
+    """
+    Stamp a batch just read from the device.
+    Args:
+        source_time: perf_counter() time the device sent it, if known
+    """
+    if _open is not None:
+        if len(_open) >= MAX_LOG:  # nothing is being painted (e.g. minimised); keep the newest
+            del _open[:len(_open) // 2]
+        batch = {"receive": time.perf_counter() if now is None else now}
+        if source_time is not None:
+            batch["source"] = source_time
+        _open.append(batch)
+
+
+def mark(stage, now=None):
+    """Every open batch that has not passed stage yet passes it now."""
+    if _open:
+        now = time.perf_counter() if now is None else now
+        for batch in _open:
+            batch.setdefault(stage, now)
+
+
+def painted(now=None):
+    """A watched canvas was painted: batches whose redraw was scheduled are on screen."""
+    global _open
+    if not _open:
+        return
+    now = time.perf_counter() if now is None else now
+    still_open = []
+    for batch in _open:
+        if "schedule" not in batch:
+            still_open.append(batch)
+            continue
+        batch["paint"] = now
+        _recent.append(batch)
+        _log.append(batch)
+    _open = still_open
+
+
+class _PaintWatcher(QObject):
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint:
+            painted()
+        return False
+
+
+def watch_paint(widget):
+    """Count paints of widget (a canvas showing live samples) as the end of the pipeline."""
+    if not hasattr(widget, "_latency_paint_watcher"):
+        widget._latency_paint_watcher = _PaintWatcher(widget)
+        widget.installEventFilter(widget._latency_paint_watcher)
+
+
+def stage_latencies(batches, stage):
+    """Latency (ms) of stage for every batch that has it."""
+    if stage == "device":
+        return [(b["receive"] - b["source"]) * 1000 for b in batches if "source" in b]
+    if stage == "total":
+        return [(b["paint"] - b.get("source", b["receive"])) * 1000 for b in batches if "paint" in b]
+    return [(b[stage] - b["receive"]) * 1000 for b in batches if stage in b]
+
+
+def stats():
+    """stage -> {"p50", "p95", "p99", "n"} in ms over the last WINDOW painted batches (empty if disabled)."""
+    if _recent is None:
+        return {}
+    batches = list(_recent)
+    out = {}
+    for stage in REPORTED:
+        values = stage_latencies(batches, stage)
+        if values:
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            out[stage] = {"p50": round(float(p50), 2), "p95": round(float(p95), 2), "p99": round(float(p99), 2),
+                          "n": len(values)}
+    return out
+
+
+def save(path=None):
+    """Write the painted batches as CSV (ms relative to receive per stage); returns the path."""
+    path = path or _path
+    if _log is None or not path:
+        return None
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["receive_s"] + REPORTED)
+        for batch in list(_log):
+            row = [round(batch["receive"], 6)]
+            for stage in REPORTED:
+                value = stage_latencies([batch], stage)
+                row.append(round(value[0], 3) if value else "")
+            writer.writerow(row)
+    return path
+
+
+class LatencyOverlay(QLabel):
+    """Debug overlay with the latency percentiles of each stage, refreshed twice a second."""
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.setAttribute(Qt.WA_TransparentForMouseEvents)
+        self.setStyleSheet("background: rgba(0, 0, 0, 170); color: #0f0; font-family: monospace; font-size: 11px;"
+                           " padding: 6px; border-radius: 6px;")
+        self.setTextFormat(Qt.PlainText)
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self.refresh)
+        self.hide()
+
+    def toggle(self):
+        """Show or hide the overlay; showing it turns tracing on."""
+        if self.isVisible():
+            self.hide()
+            return
+        enable()
+        self.refresh()
+        self.show()
+        self.raise_()
+
+    def refresh(self):
+        lines = [f"{'latency ms':<10}{'p50':>8}{'p95':>8}{'p99':>8}{'n':>7}"]
+        for stage, s in stats().items():
+            lines.append(f"{stage:<10}{s['p50']:>8.1f}{s['p95']:>8.1f}{s['p99']:>8.1f}{s['n']:>7}")
+        if len(lines) == 1:
+            lines.append("waiting for samples...")
+        self.setText("\n".join(lines))
+        self.adjustSize()
+        self.move(self.parent().width() - self.width() - 12, 12)
+
+    def showEvent(self, event):
+        self._timer.start(500)
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self._timer.stop()
+        super().hideEvent(event)
@@ -0,0 +1,245 @@
+import os
+import sys
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+import multiprocessing
+import collections
+import logging.handlers
+
+# --- Logging ---
+# Hot paths (serial parsing, 30 ms plot loops) must never block on stdout
+# or a file, and must not flood the log when the same thing goes wrong 500
+# times a second. So:
+#   - records are only put on a queue in the calling thread; a listener
+#     thread formats them and writes to stderr (WARNING and up) and to a
+#     rotating file of JSON lines (INFO and up)
+#   - each message type (logger, level and message template) gets BURST
+#     records per INTERVAL; the rest are counted and reported as one record,
+#     e.g. "412 more 'Error parsing ECG data: %s' in the last 10 s"
+#   - raw device lines go to an in-memory ring (record_raw) instead of the
+#     log; dump_raw() writes it out for debugging
+#
+# Log with %-style arguments, not f-strings, so messages of one type share
+# a template: log.warning("ECG analysis error in lead %s: %s", lead, e).
+# Extra structured fields go in extra={"fields": {...}}.
+#
+# ECG_LOG_FILE sets the file (default logs/ecg.log, "" for none) and
+# ECG_LOG_LEVEL the level (default INFO).
+#
+# Only one process may own the rotating file. Worker processes (e.g. the
+# batch_report pool) call configure_worker() with the parent's
+# worker_queue(), and their records are written by the parent.
+
+FILE_ENV = "ECG_LOG_FILE"
+LEVEL_ENV = "ECG_LOG_LEVEL"
+DEFAULT_LOG_FILE = os.path.join("logs", "ecg.log")
+BURST = 5  # records per message type per interval
+INTERVAL = 10.0  # s
+RAW_LINES = 2000  # device lines kept by record_raw()
+
+_raw = collections.deque(maxlen=RAW_LINES)
+_handler = None
+_listener = None
+_forwarder = None  # parent side of worker_queue()
+_lock = threading.Lock()
+
+
+def record_raw(line):
+    """Keep a raw device line in the ring (cheap enough for every sample)."""
+    _raw.append((time.time(), line))
+
+
+def recent_raw(n=None):
+    """The last n (time, line) pairs from the ring, oldest first."""
+    lines = list(_raw)
+    return lines if n is None else lines[-n:]
+
+
+def dump_raw(path):
+    """Write the ring to path, one "<unix time> <line>" per row; returns the path."""
+    with open(path, "w") as f:
+        for t, line in list(_raw):
+            f.write(f"{t:.6f} {line}\n")
+    return path
+
+
+class RateLimitedQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that passes at most burst records of each message type per
+    interval and replaces the rest with a count.
+    """
+    def __init__(self, q, burst=BURST, interval=INTERVAL):
+        super().__init__(q)
+        self.burst = burst
+        self.interval = interval
+        self._windows = {}  # message type -> [window start, passed, suppressed, last record]
+        self._windows_lock = threading.Lock()
+
+    @staticmethod
+    def _key(record):
+        return record.name, record.levelno, record.msg if isinstance(record.msg, str) else type(record.msg)
+
+    def handle(self, record):
+        now = time.monotonic()
+        key = self._key(record)
+        with self._windows_lock:
+            window = self._windows.get(key)
+            summary = None
+            if window is None or now - window[0] >= self.interval:
+                if window is not None and window[2]:
+                    summary = self._summary(window, now)
+                window = self._windows[key] = [now, 0, 0, None]
+            if window[1] < self.burst:
+                window[1] += 1
+                passed = True
+            else:
+                window[2] += 1
+                window[3] = record
+                passed = False
+        if summary is not None:
+            super().handle(summary)
+        return super().handle(record) if passed else False
+
+    def _summary(self, window, now):
+        record = window[3]
+        template = record.msg if isinstance(record.msg, str) else repr(record.msg)
+        summary = logging.LogRecord(record.name, record.levelno, record.pathname, record.lineno,
+                                    "%d more %r in the last %.0f s", (window[2], template, now - window[0]),
+                                    None)
+        summary.fields = {"suppressed": window[2]}
+        return summary
+
+    def flush_suppressed(self, force=False):
+        """Report the counts of windows that are over (all windows if force)."""
+        now = time.monotonic()
+        with self._windows_lock:
+            due = [(key, window) for key, window in self._windows.items()
+                   if window[2] and (force or now - window[0] >= self.interval)]
+            summaries = [self._summary(window, now) for _, window in due]
+            for key, _ in due:
+                del self._windows[key]
+        for summary in summaries:
+            super().handle(summary)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, message and any extra fields."""
+    def format(self, record):
+        entry = {
+            "time": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Plain console lines with the extra fields appended as key=value."""
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s", "%H:%M:%S")
+
+    def format(self, record):
+        text = super().format(record)
+        fields = getattr(record, "fields", None)
+        if fields:
+            text += " " + " ".join(f"{k}={v!r}" for k, v in fields.items())
+        return text
+
+
+def _flush_loop(handler):
+    while True:
+        time.sleep(handler.interval)
+        handler.flush_suppressed()
+
+
+def configure(path=None, level=None):
+    """Set up the queue, listener thread and handlers for the "ecg" loggers (once per process)."""
+    global _handler, _listener
+    with _lock:
+        if _handler is not None:
+            return
+        path = os.environ.get(FILE_ENV, DEFAULT_LOG_FILE) if path is None else path
+        level = level or os.environ.get(LEVEL_ENV, "INFO").upper()
+        console = logging.StreamHandler(sys.stderr)
+        console.setLevel(logging.WARNING)
+        console.setFormatter(TextFormatter())
+        handlers = [console]
+        if path:
+            try:
+                if os.path.dirname(path):
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                file_handler = logging.handlers.RotatingFileHandler(path, maxBytes=5_000_000, backupCount=3,
+                                                                    encoding="utf-8")
+                file_handler.setFormatter(JsonFormatter())
+                handlers.append(file_handler)
+            except OSError as e:
+                print(f"Logging to stderr only, could not open {path}: {e}")
+        q = queue.SimpleQueue()
+        _listener = logging.handlers.QueueListener(q, *handlers, respect_handler_level=True)
+        _listener.start()
+        _handler = RateLimitedQueueHandler(q)
+        root = logging.getLogger("ecg")
+        root.addHandler(_handler)
+        root.setLevel(level)
+        root.propagate = False
+        threading.Thread(target=_flush_loop, args=(_handler,), name="log-flush", daemon=True).start()
+        atexit.register(shutdown)
+
+
+def worker_queue():
+    """
+    Queue for records from worker processes; a listener thread hands them to
+    this process's handlers. Pass it to configure_worker() in each worker
+    (e.g. through a ProcessPoolExecutor initializer).
+    """
+    global _forwarder
+    configure()
+    with _lock:
+        if _forwarder is None:
+            _forwarder = logging.handlers.QueueListener(multiprocessing.Queue(), _handler)
+            _forwarder.start()
+        return _forwarder.queue
+
+
+def configure_worker(q, level=None):
+    """In a worker process: send the "ecg" records to the parent's worker_queue() instead of the log file."""
+    global _handler, _listener
+    with _lock:
+        root = logging.getLogger("ecg")
+        if _handler is not None:
+            root.removeHandler(_handler)  # inherited through fork without its listener thread
+        _listener = None
+        _handler = RateLimitedQueueHandler(q)
+        root.addHandler(_handler)
+        root.setLevel(level or os.environ.get(LEVEL_ENV, "INFO").upper())
+        root.propagate = False
+        threading.Thread(target=_flush_loop, args=(_handler,), name="log-flush", daemon=True).start()
+
+
+def shutdown():
+    """Report pending counts and write out everything still queued."""
+    global _handler, _listener, _forwarder
+    if _handler is None:
+        return
+    if _forwarder is not None:
+        _forwarder.stop()
+        _forwarder = None
+    _handler.flush_suppressed(force=True)
+    logging.getLogger("ecg").removeHandler(_handler)
+    if _listener is not None:
+        _listener.stop()
+    _handler = _listener = None
+
+
+def get_logger(name):
+    """Logger "ecg.<name>", configuring logging on first use."""
+    configure()
+    return logging.getLogger("ecg." + name)
@@ -0,0 +1,79 @@
+import time
+from PyQt5.QtWidgets import QLabel
+from PyQt5.QtCore import Qt, QTimer
+from utils import perf_metrics
+
+# --- Performance HUD ---
+# On-screen view of the metrics in utils/perf_metrics.py: rates are worked
+# out between two refreshes, so the HUD costs nothing while hidden (Ctrl+Shift+P
+# on the 12-lead page, or ECG_PERF_HUD=1 to show it from the start).
+
+REFRESH_MS = 1000
+
+
+def hud_lines(now, before, seconds):
+    """
+    Text lines for two collect() snapshots taken seconds apart.
+    Returns:
+        list of str
+    """
+    def rate(name):
+        return (now.get(name, 0) - before.get(name, 0)) / seconds if seconds > 0 else 0.0
+
+    def mean_ms(name):
+        count = now.get(name + "_count", 0) - before.get(name + "_count", 0)
+        total = now.get(name + "_sum", 0) - before.get(name + "_sum", 0)
+        return total / count * 1000 if count else None
+
+    frame_ms, analysis_ms = mean_ms("ecg_frame_seconds"), mean_ms("ecg_analysis_seconds")
+    return [
+        f"samples    {rate('ecg_samples_received_total'):8.0f}/s   dropped {now.get('ecg_samples_dropped_total', 0):.0f}",
+        f"parse err  {now.get('ecg_parse_errors_total', 0):8.0f}     queue   {now.get('ecg_serial_queue_depth', 0):.0f}",
+        f"serial     {rate('ecg_serial_bytes_total') / 1024:8.1f} KB/s",
+        f"render     {rate('ecg_frame_seconds_count'):8.1f} fps   "
+        + (f"{frame_ms:.1f} ms/frame" if frame_ms is not None else "-- ms/frame"),
+        "analysis   " + (f"{analysis_ms:8.2f} ms/batch" if analysis_ms is not None else "      -- ms/batch"),
+        f"buffers    {now.get('ecg_buffer_bytes', 0) / 1e6:8.2f} MB",
+        f"cpu        {100 * rate('process_cpu_seconds_total'):8.0f} %     rss {now.get('process_resident_memory_bytes', 0) / 1e6:.0f} MB",
+    ]
+
+
+class PerfOverlay(QLabel):
+    """Performance HUD in the top-left corner of its parent."""
+    def __init__(self, parent, registry=perf_metrics.REGISTRY):
+        super().__init__(parent)
+        self.registry = registry
+        self.setAttribute(Qt.WA_TransparentForMouseEvents)
+        self.setStyleSheet("background: rgba(0, 0, 0, 170); color: #ff0; font-family: monospace; font-size: 11px;"
+                           " padding: 6px; border-radius: 6px;")
+        self.setTextFormat(Qt.PlainText)
+        self._last = None
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self.refresh)
+        self.hide()
+
+    def toggle(self):
+        if self.isVisible():
+            self.hide()
+            return
+        self._last = (time.perf_counter(), self.registry.collect())
+        self.setText("collecting...")
+        self.adjustSize()
+        self.move(12, 12)
+        self.show()
+        self.raise_()
+
+    def refresh(self):
+        now = (time.perf_counter(), self.registry.collect())
+        if self._last is not None:
+            self.setText("\n".join(hud_lines(now[1], self._last[1], now[0] - self._last[0])))
+            self.adjustSize()
+        self._last = now
+
+    def showEvent(self, event):
+        self._timer.start(REFRESH_MS)
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self._timer.stop()
+        super().hideEvent(event)
@@ -0,0 +1,224 @@
+import os
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from utils.logs import get_logger
+
+log = get_logger("perf_metrics")
+
+# --- Performance metrics ---
+# Process-wide counters, gauges and summaries that are cheap enough to stay
+# on in production: updating one is a Python attribute increment, with no
+# lock (a lost update under thread contention only skews a rate) and no
+# I/O. They are turned into Prometheus text format only when something
+# asks: the on-screen HUD (utils/perf_hud.py), a scrape of the localhost
+# endpoint or the periodic metrics file.
+#
+#   ECG_METRICS_ADDR=127.0.0.1:9464   serve http://127.0.0.1:9464/metrics
+#   ECG_METRICS_FILE=ecg.prom         rewrite the file every 5 s (for a
+#                                     node_exporter textfile collector)
+
+ADDR_ENV = "ECG_METRICS_ADDR"
+FILE_ENV = "ECG_METRICS_FILE"
+FILE_INTERVAL = 5.0  # s
+
+
+class Counter:
+    """
+    Monotonically increasing count: inc() it, or give it fn to read the
+    value when the metrics are collected.
+    """
+    kind = "counter"
+
+    def __init__(self, name, help, fn=None):
+        self.name = name
+        self.help = help
+        self.value = 0
+        self.fn = fn
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def samples(self):
+        if self.fn is not None:
+            try:
+                return [(self.name, self.fn())]
+            except Exception:
+                return []
+        return [(self.name, self.value)]
+
+
+class Gauge(Counter):
+    """Value that goes up and down: set() it, or give it fn to read the value when collected."""
+    kind = "gauge"
+
+    def set(self, value):
+        self.value = value
+
+
+class Summary:
+    """Count and sum of observations (e.g. durations), plus the last one as <name>_last."""
+    kind = "summary"
+
+    def __init__(self, name, help):
+        self.name = name
+        self.help = help
+        self.count = 0
+        self.sum = 0.0
+        self.last = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        self.last = value
+
+    def time(self):
+        """Context manager observing the duration of its block in seconds."""
+        return _Timer(self)
+
+    def samples(self):
+        return [(self.name + "_count", self.count), (self.name + "_sum", self.sum), (self.name + "_last", self.last)]
+
+
+class _Timer:
+    def __init__(self, summary):
+        self.summary = summary
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.summary.observe(time.perf_counter() - self.start)
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+
+    def _get(self, cls, name, help, **kwargs):
+        metric = self.metrics.get(name)
+        if metric is None:
+            metric = self.metrics[name] = cls(name, help, **kwargs)
+        elif type(metric) is not cls:
+            raise ValueError(f"Metric {name} is already registered as a {metric.kind}")
+        return metric
+
+    def counter(self, name, help, fn=None):
+        return self._get_read(Counter, name, help, fn)
+
+    def gauge(self, name, help, fn=None):
+        """The gauge called name; fn replaces the reader of an existing one (e.g. a new page's buffers)."""
+        return self._get_read(Gauge, name, help, fn)
+
+    def _get_read(self, cls, name, help, fn):
+        metric = self._get(cls, name, help)
+        if fn is not None:
+            metric.fn = fn
+        return metric
+
+    def summary(self, name, help):
+        return self._get(Summary, name, help)
+
+    def collect(self):
+        """{sample name: value} of every metric right now."""
+        return {name: value for metric in list(self.metrics.values()) for name, value in metric.samples()}
+
+    def render(self):
+        """All metrics in Prometheus text exposition format."""
+        lines = []
+        for metric in list(self.metrics.values()):
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {'untyped' if metric.kind == 'summary' else metric.kind}")
+            for name, value in metric.samples():
+                lines.append(f"{name} {float(value):.10g}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+summary = REGISTRY.summary
+
+
+def _rss_bytes():
+    with open("/proc/self/statm") as f:  # Linux; the gauge is left out elsewhere
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+# Process-level metrics under their usual Prometheus names
+counter("process_cpu_seconds_total", "User and system CPU time of the process", fn=time.process_time)
+gauge("process_resident_memory_bytes", "Resident set size of the process", fn=_rss_bytes)
+
+
+# --- Exposition ---
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = self.server.registry.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # no line on stderr per scrape
+
+
+def serve(host="127.0.0.1", port=9464, registry=REGISTRY):
+    """Serve /metrics from a daemon thread; returns the server (server.shutdown() stops it)."""
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    server.registry = registry
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+class MetricsFileWriter(threading.Thread):
+    """Rewrites path with the current metrics every interval seconds (atomically, via a temporary file)."""
+    def __init__(self, path, interval=FILE_INTERVAL, registry=REGISTRY):
+        super().__init__(name="metrics-file", daemon=True)
+        self.path = path
+        self.interval = interval
+        self.registry = registry
+        self._stopped = threading.Event()
+
+    def write(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            f.write(self.registry.render())
+        os.replace(tmp, self.path)
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.write()
+            except OSError as e:
+                log.warning("Could not write metrics to %s: %s", self.path, e)
+
+    def stop(self):
+        self._stopped.set()
+
+
+_exporters = []
+
+
+def start_from_env():
+    """Start the endpoint and/or file writer configured in the environment (once per process)."""
+    if _exporters:
+        return
+    addr = os.environ.get(ADDR_ENV, "").strip()
+    if addr:
+        host, _, port = addr.rpartition(":")
+        try:
+            _exporters.append(serve(host or "127.0.0.1", int(port)))
+        except (ValueError, OSError) as e:
+            log.warning("Not serving metrics on %s=%r: %s", ADDR_ENV, addr, e)
+    path = os.environ.get(FILE_ENV, "").strip()
+    if path:
+        writer = MetricsFileWriter(path)
+        writer.start()
+        _exporters.append(writer)
@@ -0,0 +1,147 @@
+import os
+import sys
+import json
+import time
+import atexit
+import builtins
+import threading
+import functools
+
+# --- Startup trace ---
+# Opt-in timeline of where startup time goes, written as Chrome trace JSON
+# (open in chrome://tracing or https://ui.perfetto.dev, or diff two files
+# from different builds):
+#   - one span per module import, nested the way the imports nest
+#   - spans for functions marked with @traced (widget construction)
+#   - first-paint instants for windows passed to first_paint()
+#   - startup phase instants from mark()
+#
+# Enable with ECG_STARTUP_TRACE=<file.json> or `python main.py --trace[=file.json]`.
+# When disabled every hook here is a no-op.
+
+TRACE_ENV = "ECG_STARTUP_TRACE"
+DEFAULT_TRACE_FILE = "startup_trace.json"
+
+_events = None  # list of trace events while enabled
+_path = None
+_t0 = 0.0
+_original_import = builtins.__import__
+
+
+def _now_us():
+    return (time.perf_counter() - _t0) * 1e6
+
+
+def _add(event):
+    event.setdefault("pid", os.getpid())
+    event.setdefault("tid", threading.get_ident())
+    _events.append(event)
+
+
+def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    if level == 0 and name in sys.modules:
+        return _original_import(name, globals, locals, fromlist, level)
+    before = len(sys.modules)
+    start = _now_us()
+    try:
+        return _original_import(name, globals, locals, fromlist, level)
+    finally:
+        if len(sys.modules) != before:
+            if level:
+                name = f"{(globals or {}).get('__package__') or ''}.{name}".strip(".")
+            _add({"name": name, "cat": "import", "ph": "X", "ts": start, "dur": _now_us() - start})
+
+
+def enabled():
+    return _events is not None
+
+
+def enable(path=DEFAULT_TRACE_FILE):
+    """Start recording; the trace is written to path at exit (or by save())."""
+    global _events, _path, _t0
+    if _events is not None:
+        return
+    _t0 = time.perf_counter()
+    _events = []
+    _path = path
+    builtins.__import__ = _timed_import
+    atexit.register(save)
+    mark("trace start", argv=sys.argv)
+
+
+def enable_from_env_or_argv(argv=None):
+    """
+    Turn tracing on when ECG_STARTUP_TRACE is set or --trace[=path] is on the
+    command line (the flag is removed from argv so Qt does not see it).
+    """
+    argv = sys.argv if argv is None else argv
+    path = os.environ.get(TRACE_ENV)
+    for arg in list(argv[1:]):
+        if arg == "--trace" or arg.startswith("--trace="):
+            path = arg.partition("=")[2] or path or DEFAULT_TRACE_FILE
+            argv.remove(arg)
+    if path:
+        enable(path)
+
+
+def mark(name, **args):
+    """Instant event (a point on the timeline), e.g. a startup phase finishing."""
+    if _events is not None:
+        _add({"name": name, "cat": "mark", "ph": "i", "s": "p", "ts": _now_us(), "args": args})
+
+
+class span:
+    """Context manager recording a named span: `with span("load users"): ...`"""
+    def __init__(self, name, cat="span"):
+        self.name = name
+        self.cat = cat
+
+    def __enter__(self):
+        self.start = _now_us() if _events is not None else None
+        return self
+
+    def __exit__(self, *exc):
+        if self.start is not None and _events is not None:
+            _add({"name": self.name, "cat": self.cat, "ph": "X", "ts": self.start, "dur": _now_us() - self.start})
+
+
+def traced(fn):
+    """Decorator: record a span named after the function's qualified name on every call."""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if _events is None:
+            return fn(*args, **kwargs)
+        with span(fn.__qualname__, cat="widget"):
+            return fn(*args, **kwargs)
+    return wrapper
+
+
+def first_paint(widget, name=None):
+    """Record an instant when widget is painted for the first time."""
+    if _events is None:
+        return
+    from PyQt5.QtCore import QObject, QEvent
+
+    class _FirstPaint(QObject):
+        def eventFilter(self, obj, event):
+            if event.type() == QEvent.Paint:
+                mark(f"first paint {name or type(widget).__name__}")
+                obj.removeEventFilter(self)
+            return False
+    widget._first_paint_filter = _FirstPaint(widget)
+    widget.installEventFilter(widget._first_paint_filter)
+
+
+def save(path=None):
+    """Write the events recorded so far as Chrome trace JSON; returns the path."""
+    path = path or _path
+    if _events is None or not path:
+        return None
+    trace = {
+        "traceEvents": list(_events),
+        "displayTimeUnit": "ms",
+        "otherData": {"argv": sys.argv, "python": sys.version.split()[0], "platform": sys.platform},
+    }
+    with open(path, "w") as f:
+        json.dump(trace, f)
+    return path